@@ -0,0 +1,77 @@
+"""
+مقارنة أداء فهرس التغريدات المرسلة
+يقارن المجموعة القديمة Set[str] مع SortedIdSet المضغوط عند مليون معرف
+
+الاستخدام:
+    python benchmarks/bench_dedup.py [عدد المعرفات]
+"""
+
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dedup import SortedIdSet
+
+# بداية نطاق معرفات snowflake حقيقي تقريباً
+BASE_ID = 1_700_000_000_000_000_000
+
+def generate_ids(count: int) -> list:
+    """توليد معرفات متزايدة مع فجوات عشوائية كما في تويتر"""
+    ids = []
+    current = BASE_ID
+    for _ in range(count):
+        current += random.randint(1, 1 << 22)
+        ids.append(current)
+    return ids
+
+def measure(label: str, build, ids: list, lookups: list):
+    """قياس وقت البناء والذاكرة وسرعة البحث"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    container, contains = build(ids)
+    build_time = time.perf_counter() - started
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    hits = sum(1 for key in lookups if contains(container, key))
+    lookup_time = time.perf_counter() - started
+
+    print(f"{label:<32} بناء: {build_time:7.3f}ث  ذاكرة: {memory / 1024 / 1024:8.2f}MB  "
+          f"بحث: {len(lookups) / lookup_time / 1e6:6.2f}M/ث  ({hits} موجود)")
+
+def build_str_set(ids):
+    container = set()
+    for tweet_id in ids:
+        container.add(str(tweet_id))
+    return container, lambda c, key: str(key) in c
+
+def build_sorted(capacity):
+    def build(ids):
+        container = SortedIdSet(capacity)
+        watermark = 0
+        for tweet_id in ids:
+            evicted = container.add(tweet_id)
+            if evicted is not None:
+                watermark = max(watermark, evicted)
+        state = {'watermark': watermark}
+        return container, lambda c, key: key <= state['watermark'] or key in c
+    return build
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    random.seed(42)
+    ids = generate_ids(count)
+    lookups = random.sample(ids, 50_000) + [tweet_id + 1 for tweet_id in random.sample(ids, 50_000)]
+
+    print(f"عدد المعرفات: {count:,}")
+    measure("Set[str] (القديم)", build_str_set, ids, lookups)
+    measure("SortedIdSet بدون حد", build_sorted(count), ids, lookups)
+    measure("SortedIdSet + watermark (5000)", build_sorted(5000), ids, lookups)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+قياس أداء البوت من الجلب حتى الإرسال باستخدام خوادم محلية بديلة
+يشغل TwitterDiscordBot كاملاً ضد fake_services ويعرض معدل الإرسال وزمن كل مرحلة والذاكرة
+
+الاستخدام:
+    python benchmarks/bench_e2e.py --accounts 50 --rate 2 --duration 30 --interval 5
+    python benchmarks/bench_e2e.py --latency-ms 80 --twitter-429 0.05 --discord-limit 5 --coalesce 0.5
+    python benchmarks/bench_e2e.py --mode stream --interval 60
+    python benchmarks/bench_e2e.py --media-kb 512 --destinations 3
+    python benchmarks/bench_e2e.py --accounts 5 --rate 10 --outage 10 --backfill-pages 5
+"""
+
+import argparse
+import asyncio
+import logging
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import metrics
+from config import BotConfig
+from main import TwitterDiscordBot
+from fake_services import FakeDiscord, FakeTwitter, start_services
+
+def percentiles(values: List[float]) -> str:
+    """p50/p90/p99/max بالمللي ثانية"""
+    if not values:
+        return "لا توجد قياسات"
+    values = sorted(values)
+
+    def pick(q: float) -> float:
+        return values[min(len(values) - 1, int(q * len(values)))] * 1000
+
+    return (f"p50 {pick(0.50):8.1f}  p90 {pick(0.90):8.1f}  "
+            f"p99 {pick(0.99):8.1f}  max {values[-1] * 1000:8.1f} ms  (n={len(values)})")
+
+def instrument(bot: TwitterDiscordBot, samples: Dict[str, List[float]], enqueued: Dict[str, float]) -> None:
+    """تغليف مراحل البوت لقياس زمن كل منها دون تعديل الكود"""
+    for name in ('get_timeline_page', 'search_recent_tweets'):
+        fetch = getattr(bot.twitter_api, name)
+
+        async def timed_fetch(*args, fetch=fetch, **kwargs):
+            started = time.monotonic()
+            try:
+                return await fetch(*args, **kwargs)
+            finally:
+                samples['fetch'].append(time.monotonic() - started)
+
+        setattr(bot.twitter_api, name, timed_fetch)
+
+    enqueue = bot.enqueue_tweet
+
+    def timed_enqueue(username, user_info, tweet, media_info, is_startup=False, backfill=False):
+        queued = enqueue(username, user_info, tweet, media_info, is_startup, backfill)
+        if queued:
+            enqueued.setdefault(tweet['id'], time.monotonic())
+        return queued
+
+    bot.enqueue_tweet = timed_enqueue
+
+    for worker in bot.deliveries.values():
+        send = worker.send
+
+        async def timed_send(payload, send=send):
+            started = time.monotonic()
+            try:
+                return await send(payload)
+            finally:
+                samples['discord'].append(time.monotonic() - started)
+
+        worker.send = timed_send
+
+async def run(args) -> None:
+    accounts = [f"bench{i}" for i in range(args.accounts)]
+    twitter = FakeTwitter(accounts, args.rate, args.latency_ms / 1000, args.twitter_429,
+                          media_size=int(args.media_kb * 1024))
+    discord = FakeDiscord(args.latency_ms / 1000, args.discord_429, args.discord_limit, args.discord_window)
+    runner = await start_services(twitter, discord, port=args.port)
+
+    base = f"http://127.0.0.1:{args.port}"
+    # BotConfig يُبنى مباشرة لأن ConfigLoader يقبل روابط discord.com فقط
+    config = BotConfig(
+        twitter_bearer_token="AAAAAAAAAAbenchmark",
+        discord_webhook_url=f"{base}/api/webhooks/1/bench",
+        twitter_username=accounts[0],
+        twitter_usernames=accounts,
+        check_interval=args.interval,
+        data_dir=tempfile.mkdtemp(prefix="bench_e2e_"),
+        max_concurrent_polls=args.concurrency,
+        ingestion_mode=args.mode,
+        coalesce_window=args.coalesce,
+        twitter_api_base_url=f"{base}/2",
+        metrics_port=0,
+        account_webhooks={
+            account: [f"{base}/api/webhooks/{i + 1}/bench" for i in range(args.destinations)]
+            for account in accounts
+        } if args.destinations > 1 else {},
+        media_upload=args.media_kb > 0,
+        backfill_max_pages=args.backfill_pages,
+        backfill_rate=args.backfill_rate
+    )
+
+    tracemalloc.start()
+    bot = TwitterDiscordBot(config)
+    samples: Dict[str, List[float]] = {'fetch': [], 'discord': []}
+    enqueued: Dict[str, float] = {}
+    instrument(bot, samples, enqueued)
+
+    bot_task = asyncio.create_task(bot.run())
+    started = time.monotonic()
+    outage_end = None
+    if args.outage:
+        # انقطاع في منتصف التوليد: التغريدات تتراكم ثم تُستعاد بعد عودة الخدمة
+        outage_end = started + (args.duration + args.outage) / 2
+        asyncio.get_running_loop().call_later(
+            (args.duration - args.outage) / 2, setattr, twitter, 'down_until', outage_end)
+    await twitter.generate(args.duration)
+
+    # انتظار وصول ما تم توليده (أو انتهاء مهلة التفريغ)
+    drain_deadline = time.monotonic() + args.interval * 2 + 10
+    if args.outage and args.backfill_rate:
+        # التغريدات المستعادة تُرسل بمعدل محدد لكل وجهة
+        drain_deadline += args.rate * args.outage / args.backfill_rate
+    while time.monotonic() < drain_deadline:
+        delivered = {tweet_id for tweet_id, _, _ in discord.received}
+        if all(tweet_id in delivered for tweet_id in twitter.created):
+            break
+        await asyncio.sleep(0.2)
+    elapsed = time.monotonic() - started
+
+    bot.shutdown()
+    await bot_task
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    await runner.cleanup()
+
+    first_delivery: Dict[str, float] = {}
+    for tweet_id, received_at, _ in discord.received:
+        first_delivery.setdefault(tweet_id, received_at)
+
+    detect = [enqueued[t] - twitter.created[t] for t in enqueued if t in twitter.created]
+    queue = [first_delivery[t] - enqueued[t] for t in enqueued if t in first_delivery]
+    end_to_end = [first_delivery[t] - twitter.created[t] for t in first_delivery if t in twitter.created]
+    missed = len(twitter.created) - len(end_to_end)
+
+    print(f"الحسابات: {args.accounts}  الوضع: {args.mode}  فترة الفحص: {args.interval}ث  "
+          f"تأخير الشبكة: {args.latency_ms:.0f}ms  المدة: {elapsed:.1f}ث")
+    print(f"تغريدات مولدة: {len(twitter.created)}  وصلت: {len(end_to_end)}  مفقودة: {missed}")
+    print(f"معدل الإرسال: {len(end_to_end) / elapsed:.2f} تغريدة/ث  "
+          f"({len(discord.received)} embed في {discord.requests - discord.rate_limited} رسالة)")
+    print(f"طلبات Twitter: {twitter.requests} (429: {twitter.rate_limited}، تغريدات مرجعة: {twitter.tweets_served})  "
+          f"طلبات Discord: {discord.requests} (429: {discord.rate_limited})")
+    if args.media_kb:
+        print(f"تنزيلات الميديا: {twitter.media_requests}  ملفات مرفوعة: {discord.files} "
+              f"({discord.uploaded_bytes / 1024 / 1024:.1f}MB)")
+    print(f"{'جلب التغريدات':<18} {percentiles(samples['fetch'])}")
+    print(f"{'إنشاء ← الطابور':<18} {percentiles(detect)}")
+    print(f"{'الطابور ← Discord':<18} {percentiles(queue)}")
+    print(f"{'طلب Discord':<18} {percentiles(samples['discord'])}")
+    print(f"{'إنشاء ← Discord':<18} {percentiles(end_to_end)}")
+    if outage_end is not None:
+        # التغريدات الجديدة بعد عودة الخدمة لا يجب أن تنتظر خلف المستعادة
+        live = [first_delivery[t] - created for t, created in twitter.created.items()
+                if created > outage_end and t in first_delivery]
+        recovered = sum(metrics.BACKFILL_TWEETS.values.values())
+        print(f"{'بعد الانقطاع':<18} {percentiles(live)}")
+        print(f"تغريدات مستعادة من الصفحات الأقدم: {recovered:.0f}")
+    print(f"ذاكرة Python القصوى: {peak / 1024 / 1024:.2f}MB  "
+          f"RSS القصوى: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f}MB")
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس أداء البوت ضد خوادم محلية")
+    parser.add_argument('--accounts', type=int, default=20)
+    parser.add_argument('--rate', type=float, default=1.0, help='تغريدات/ث لكل الحسابات')
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--interval', type=int, default=2, help='CHECK_INTERVAL بالثواني')
+    parser.add_argument('--concurrency', type=int, default=5)
+    parser.add_argument('--mode', choices=['timeline', 'search', 'stream'], default='timeline')
+    parser.add_argument('--coalesce', type=float, default=0.0, help='COALESCE_WINDOW بالثواني')
+    parser.add_argument('--latency-ms', type=float, default=20)
+    parser.add_argument('--twitter-429', type=float, default=0.0, help='نسبة طلبات Twitter التي ترجع 429')
+    parser.add_argument('--discord-429', type=float, default=0.0, help='نسبة طلبات Discord التي ترجع 429')
+    parser.add_argument('--discord-limit', type=int, default=5, help='رسائل لكل نافذة لكل webhook')
+    parser.add_argument('--discord-window', type=float, default=2.0)
+    parser.add_argument('--media-kb', type=float, default=0, help='صورة بهذا الحجم مع كل تغريدة ورفعها كمرفق (MEDIA_UPLOAD)')
+    parser.add_argument('--destinations', type=int, default=1, help='عدد webhooks لكل حساب')
+    parser.add_argument('--outage', type=float, default=0, help='ثوانٍ يرجع فيها Twitter خطأ 503 في منتصف المدة')
+    parser.add_argument('--backfill-pages', type=int, default=5, help='BACKFILL_MAX_PAGES')
+    parser.add_argument('--backfill-rate', type=float, default=0.5, help='BACKFILL_RATE رسالة/ث لكل وجهة')
+    parser.add_argument('--port', type=int, default=18080)
+    parser.add_argument('--log-level', default='ERROR')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.ERROR),
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
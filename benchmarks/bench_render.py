@@ -0,0 +1,76 @@
+"""
+قياس سرعة تنسيق رسائل التغريدات (embeds/ث)
+يقيس ثلاثة أنواع من التغريدات مع الأجزاء الثابتة المخزنة وبدونها
+
+الاستخدام:
+    python benchmarks/bench_render.py [عدد التكرارات]
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from render import EmbedRenderer
+
+USER_INFO = {
+    'id': '12345',
+    'name': 'PlayStation',
+    'username': 'PlayStation',
+    'profile_image_url': 'https://pbs.twimg.com/profile_images/1/abc_normal.jpg',
+    'verified': True
+}
+
+MEDIA_INFO = {
+    '3_1': {'type': 'photo', 'url': 'https://pbs.twimg.com/media/a.jpg'},
+    '7_2': {'type': 'video', 'preview_image_url': 'https://pbs.twimg.com/media/b.jpg'}
+}
+
+WORDS = ["new", "update", "trailer", "launch", "today", "available", "play", "now", "watch", "live"]
+
+def make_tweet(tweet_id: int, kind: str) -> dict:
+    """توليد تغريدة تجريبية من نوع محدد"""
+    text = " ".join(random.choice(WORDS) for _ in range(random.randint(10, 40)))
+    tweet = {
+        'id': str(tweet_id),
+        'text': f"{text} https://t.co/{tweet_id:x}",
+        'created_at': '2026-03-01T18:30:00.000Z',
+        'public_metrics': {'like_count': random.randint(0, 2_000_000), 'retweet_count': random.randint(0, 50_000), 'reply_count': random.randint(0, 900)}
+    }
+    if kind == 'hashtags':
+        tags = [f"tag{random.randint(0, 99)}" for _ in range(5)]
+        tweet['text'] += " " + " ".join(f"#{tag}" for tag in tags)
+        tweet['entities'] = {
+            'hashtags': [{'tag': tag} for tag in tags],
+            'mentions': [{'username': 'Xbox'}, {'username': 'Nintendo'}]
+        }
+    elif kind == 'media':
+        tweet['attachments'] = {'media_keys': [random.choice(list(MEDIA_INFO)), '7_2']}
+    return tweet
+
+def measure(label: str, tweets: list, cached: bool):
+    """قياس عدد الرسائل المنسقة في الثانية"""
+    renderer = EmbedRenderer(mention_everyone=True)
+    started = time.perf_counter()
+    for tweet in tweets:
+        if not cached:
+            # محاكاة السلوك السابق: حساب أجزاء الحساب مع كل تغريدة
+            renderer.invalidate()
+        renderer.render_message(tweet, 'PlayStation', USER_INFO, MEDIA_INFO)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {len(tweets) / elapsed:12,.0f} embed/ث  ({elapsed * 1e6 / len(tweets):6.2f} µs/embed)")
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    random.seed(42)
+
+    print(f"عدد التغريدات لكل قياس: {count:,}")
+    for kind, label in (('text', 'نص فقط'), ('hashtags', 'هاشتاغات كثيرة'), ('media', 'ميديا')):
+        tweets = [make_tweet(1_800_000_000_000_000_000 + i, kind) for i in range(count)]
+        measure(f"{label} (بدون تخزين)", tweets, cached=False)
+        measure(f"{label} (مع التخزين)", tweets, cached=True)
+
+if __name__ == "__main__":
+    main()
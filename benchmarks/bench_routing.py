@@ -0,0 +1,117 @@
+"""
+قياس سرعة مطابقة قواعد التوجيه (تغريدة/ث) مع زيادة عدد القواعد
+يقارن Router المجمع (Aho-Corasick) بفحص كل قاعدة على حدة، ويتحقق أن النتائج متطابقة
+
+الاستخدام:
+    python benchmarks/bench_routing.py [أكبر عدد قواعد] [عدد التغريدات]
+"""
+
+import random
+import re
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from render import clean_tweet_text
+from routing import Router, RoutingRule, _is_word
+
+WEBHOOK = "https://discord.com/api/webhooks/1/token"
+
+def random_word(length: int) -> str:
+    return ''.join(random.choice(string.ascii_lowercase) for _ in range(length))
+
+def generate(rule_count: int, tweet_count: int):
+    """قواعد بكلمات وعبارات وهاشتاقات وبعض التعابير النمطية، وتغريدات يطابق بعضها"""
+    words = list({random_word(random.randint(3, 9)) for _ in range(40_000)})
+    # كلمات القواعد غير كلمات النص العادي، فنسبة التغريدات المطابقة لا تزيد بعدد القواعد
+    vocabulary, filler = words[:20_000], words[20_000:]
+    rules = []
+    for index in range(rule_count):
+        keywords = [' '.join(random.sample(vocabulary, random.randint(1, 2))) for _ in range(5)]
+        rule = RoutingRule(name=f"rule-{index}", keywords=keywords,
+                           hashtags=[random.choice(vocabulary) for _ in range(2)],
+                           webhooks=[WEBHOOK], action='drop' if index % 50 == 0 else 'route')
+        # التعابير النمطية قليلة عادة ولا تدخل في المطابق المجمع
+        if index % 200 == 0:
+            rule.regex = [rf"\b{random_word(3)}\d+\b"]
+        rules.append(rule)
+
+    keywords = [keyword for rule in rules for keyword in rule.keywords]
+    tweets = []
+    for index in range(tweet_count):
+        text_words = random.sample(filler, 25)
+        hashtags = [{'tag': random.choice(filler)} for _ in range(2)]
+        if index % 4 == 0:
+            text_words.insert(random.randrange(len(text_words)), random.choice(keywords))
+        elif index % 4 == 1:
+            hashtags[0]['tag'] = random.choice(rules).hashtags[0]
+        text = ' '.join(text_words) + f" https://t.co/{random_word(10)}"
+        tweets.append({'id': str(index), 'text': text, 'entities': {'hashtags': hashtags}})
+    return rules, tweets
+
+def naive_match(rules, patterns, username: str, tweet: dict) -> list:
+    """الطريقة المباشرة: كل كلمة في كل قاعدة بحث منفصل في النص"""
+    text = tweet.get('text', '')
+    text = clean_tweet_text(text, len(text))
+    folded = text.casefold()
+    tags = {entity['tag'].casefold() for entity in tweet.get('entities', {}).get('hashtags', [])}
+    matched = []
+    for index, rule in enumerate(rules):
+        if not rule.applies_to(username):
+            continue
+        found = any(tag.casefold() in tags for tag in rule.hashtags)
+        for keyword in rule.keywords:
+            if found:
+                break
+            keyword = keyword.casefold()
+            start = folded.find(keyword)
+            while start != -1:
+                end = start + len(keyword)
+                left = rule.substring or not _is_word(keyword[0]) or start == 0 or not _is_word(folded[start - 1])
+                right = rule.substring or not _is_word(keyword[-1]) or end == len(folded) or not _is_word(folded[end])
+                if left and right:
+                    found = True
+                    break
+                start = folded.find(keyword, start + 1)
+        if not found and any(pattern.search(text) for pattern in patterns[index]):
+            found = True
+        if found:
+            matched.append(index)
+    return matched
+
+def measure(label: str, match, tweets: list) -> float:
+    started = time.perf_counter()
+    hits = sum(1 for tweet in tweets if match(tweet))
+    elapsed = time.perf_counter() - started
+    rate = len(tweets) / elapsed
+    print(f"  {label:<24} {rate:12,.0f} تغريدة/ث  ({hits} مطابقة من {len(tweets)})")
+    return rate
+
+def main():
+    max_rules = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    tweet_count = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    random.seed(42)
+
+    for rule_count in sorted({100, 1000, max_rules}):
+        if rule_count > max_rules:
+            continue
+        rules, tweets = generate(rule_count, tweet_count)
+        patterns = [[re.compile(pattern, re.IGNORECASE) for pattern in rule.regex] for rule in rules]
+
+        started = time.perf_counter()
+        router = Router(rules)
+        build_time = time.perf_counter() - started
+        print(f"{rule_count:,} قاعدة ({len(router._keywords):,} كلمة مفتاحية)، التجميع: {build_time * 1000:.0f}ms")
+
+        # الطريقة المباشرة بطيئة مع آلاف القواعد، فتُقاس على عينة
+        sample = tweets[:max(50, tweet_count * 100 // rule_count)]
+        mismatches = sum(1 for tweet in sample if router.match('account', tweet) != naive_match(rules, patterns, 'account', tweet))
+        compiled = measure("Router (Aho-Corasick)", lambda tweet: router.match('account', tweet), tweets)
+        naive = measure("كل قاعدة على حدة", lambda tweet: naive_match(rules, patterns, 'account', tweet), sample)
+        print(f"  التسريع: {compiled / naive:.1f}x، نتائج مختلفة: {mismatches}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+فحص FilteredStream ضد خادم Twitter البديل
+يتحقق من مزامنة القواعد، وإعادة الاتصال ومدة الانتظار حسب نوع الخطأ، وكشف الاتصال المعلق،
+وينتهي برمز خطأ عند فشل أي فحص
+
+الاستخدام:
+    python benchmarks/check_stream.py [--port 18090]
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import aiohttp
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import metrics
+from main import TwitterAPI
+from stream import FilteredStream, StreamError
+from fake_services import FakeDiscord, FakeTwitter, start_services
+
+# الانتظار الفعلي جزء من المدة المحسوبة حتى ينتهي الفحص خلال ثوانٍ
+SCALE = 0.001
+
+class RecordingStream(FilteredStream):
+    """FilteredStream يسجل كل قرار انتظار (نوع الخطأ، رقم المحاولة، المدة) وينتظر جزءاً منه فقط"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.backoffs: List[Tuple[str, int, float, float]] = []
+
+    def _backoff(self, error: Exception, attempt: int) -> float:
+        delay = FilteredStream._backoff(error, attempt)
+        kind = f"HTTP {error.status}" if isinstance(error, StreamError) else type(error).__name__
+        self.backoffs.append((kind, attempt, delay, time.monotonic()))
+        return delay * SCALE
+
+async def wait_until(condition: Callable[[], bool], timeout: float, what: str) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError(f"انتهت المهلة: {what}")
+        await asyncio.sleep(0.01)
+
+def ok(message: str) -> None:
+    print(f"  ✓ {message}")
+
+async def check_rules(twitter: FakeTwitter, stream: FilteredStream, watched: List[str]) -> None:
+    """إضافة الناقص وحذف الزائد فقط، دون المساس بقواعد التطبيقات الأخرى"""
+    values = lambda: sorted(rule['value'] for rule in twitter.rules.values())
+    ours = lambda: {rule['value']: rule['id'] for rule in twitter.rules.values() if rule['tag'] == stream.RULE_TAG}
+
+    assert await stream.sync_rules()
+    assert sorted(ours()) == sorted(stream._rule_values()), ours()
+    assert 'from:someone' in values(), "حُذفت قاعدة تطبيق آخر"
+    assert '(from:old) -is:reply -is:retweet' not in values(), "بقيت قاعدة حساب لم يعد مراقباً"
+    ok(f"المزامنة الأولى: {len(ours())} قاعدة للحسابات وبقيت قاعدة التطبيق الآخر")
+
+    requests = twitter.requests
+    assert await stream.sync_rules()
+    assert twitter.requests == requests + 1, "المزامنة دون تغيير يجب أن تكون طلب GET فقط"
+    ok("المزامنة دون تغيير: طلب GET واحد")
+
+    before = ours()
+    watched.append('gamma')
+    assert await stream.sync_rules()
+    after = ours()
+    assert len(after) == 2 and all(after.get(value) == rule_id for value, rule_id in before.items()), after
+    ok("إضافة حساب: قاعدة جديدة والقاعدة الحالية باقية بنفس المعرف")
+
+    watched.remove('gamma')
+    assert await stream.sync_rules()
+    assert ours() == before, ours()
+    ok("إزالة حساب: حُذفت قاعدته فقط")
+
+async def check_connection(twitter: FakeTwitter, stream: RecordingStream,
+                           received: List[Tuple[str, Dict]], connects: List[float]) -> None:
+    alpha = twitter.users['alpha']['id']
+    await wait_until(lambda: stream.connected, 5, "الاتصال الأول")
+    assert len(connects) == 1 and twitter.stream_connections == 1
+
+    tweet_id = twitter.add_tweet(alpha)
+    twitter.add_tweet(alpha, "@someone رد لا يُرسل")
+    await wait_until(lambda: received, 2, "وصول التغريدة عبر الـ stream")
+    await asyncio.sleep(0.1)
+    assert [(username, tweet['id']) for username, tweet in received] == [('alpha', tweet_id)], received
+    ok("وصول التغريدة الأصلية فوراً واستبعاد الرد")
+
+async def check_reconnect(twitter: FakeTwitter, stream: RecordingStream, connects: List[float]) -> None:
+    reconnects = sum(metrics.STREAM_RECONNECTS.values.values())
+    del stream.backoffs[:]
+    twitter.drop_streams()
+    await wait_until(lambda: len(connects) == 2 and stream.connected, 5, "إعادة الاتصال بعد القطع")
+    assert [entry[:3] for entry in stream.backoffs] == [('ConnectionError', 0, 0.25)], stream.backoffs
+    assert sum(metrics.STREAM_RECONNECTS.values.values()) == reconnects + 1
+    ok("قطع الاتصال: إعادة الاتصال بعد 0.25 ثانية (خطأ شبكة) وزيادة stream_reconnects")
+
+    # محاولات مرفوضة متتالية بعد القطع: الانتظار يتضاعف حسب نوع الخطأ ولا يعود للصفر
+    del stream.backoffs[:]
+    twitter.stream_failures.extend([503, 503, 429])
+    twitter.drop_streams()
+    await wait_until(lambda: len(connects) == 3 and stream.connected, 10, "الاتصال بعد الأخطاء المحقونة")
+    expected = [('ConnectionError', 0, 0.25), ('HTTP 503', 1, 10.0), ('HTTP 503', 2, 20.0), ('HTTP 429', 3, 480.0)]
+    assert [entry[:3] for entry in stream.backoffs] == expected, stream.backoffs
+    ok("أخطاء HTTP: 503 تبدأ من 5 ثوانٍ و 429 من دقيقة، وكلاهما يتضاعف مع المحاولات")
+
+    del stream.backoffs[:]
+    twitter.drop_streams()
+    await wait_until(lambda: len(connects) == 4 and stream.connected, 5, "إعادة الاتصال بعد النجاح")
+    assert [entry[:3] for entry in stream.backoffs] == [('ConnectionError', 0, 0.25)], stream.backoffs
+    ok("بعد اتصال ناجح يبدأ عد المحاولات من جديد")
+
+    caps = [FilteredStream._backoff(error, 100) for error in (ConnectionError(), StreamError(503), StreamError(429))]
+    assert caps == [16.0, 320.0, 900.0], caps
+    ok("الحد الأقصى للانتظار: 16 ثانية للشبكة، 320 لأخطاء HTTP، 900 لـ 429")
+
+async def check_stall(twitter: FakeTwitter, stream: RecordingStream, connects: List[float]) -> None:
+    """غياب نبضات keep-alive لأكثر من STALL_TIMEOUT يعني اتصالاً معلقاً يُقطع ويُعاد"""
+    del stream.backoffs[:]
+    started = time.monotonic()
+    twitter.heartbeat = 60
+    await wait_until(lambda: stream.backoffs, 5, "كشف الاتصال المعلق")
+    kind, attempt, _, detected = stream.backoffs[0]
+    assert (kind, attempt) == ('TimeoutError', 0), stream.backoffs
+    # الاتصال قد ينتظر نبضة أخيرة قبل أن يتوقف الخادم عن إرسالها
+    assert stream.STALL_TIMEOUT <= detected - started <= stream.STALL_TIMEOUT + 1, detected - started
+    await wait_until(lambda: len(connects) == 5, 5, "إعادة الاتصال بعد التعليق")
+    ok(f"اتصال معلق: كُشف بعد {detected - started:.2f} ثانية (STALL_TIMEOUT={stream.STALL_TIMEOUT}) وأعيد الاتصال")
+
+async def run(port: int) -> None:
+    twitter = FakeTwitter(['alpha', 'beta', 'gamma'], tweet_rate=0, heartbeat=0.1)
+    # قاعدة لتطبيق آخر بنفس الـ token، وقاعدة قديمة لحساب لم يعد مراقباً
+    twitter.rules['90'] = {'id': '90', 'value': 'from:someone', 'tag': 'other-app'}
+    twitter.rules['91'] = {'id': '91', 'value': '(from:old) -is:reply -is:retweet', 'tag': FilteredStream.RULE_TAG}
+    runner = await start_services(twitter, FakeDiscord(), port=port)
+
+    watched = ['alpha', 'beta']
+    received: List[Tuple[str, Dict]] = []
+    connects: List[float] = []
+
+    async def on_tweet(username: str, tweet: Dict, media_info: Dict) -> None:
+        received.append((username, tweet))
+
+    session = aiohttp.ClientSession()
+    api = TwitterAPI("token", session, base_url=f"{twitter.origin}/2")
+    # حد طول صغير حتى تتوزع الحسابات على أكثر من قاعدة
+    stream = RecordingStream(api, lambda: watched, on_tweet, lambda: connects.append(time.monotonic()),
+                             max_rule_length=60)
+    stream.STALL_TIMEOUT = 0.5
+    task = None
+    try:
+        print("مزامنة القواعد:")
+        await check_rules(twitter, stream, watched)
+        print("الاتصال وإعادة الاتصال:")
+        task = asyncio.create_task(stream.run())
+        await check_connection(twitter, stream, received, connects)
+        await check_reconnect(twitter, stream, connects)
+        await check_stall(twitter, stream, connects)
+    finally:
+        stream.stop()
+        if task:
+            await asyncio.wait_for(task, 5)
+        await session.close()
+        # إنهاء اتصالات الخادم المنتظرة لنبضة بعيدة بعد فحص التعليق
+        twitter.drop_streams()
+        await runner.cleanup()
+    print("نجحت كل الفحوص")
+
+def main():
+    parser = argparse.ArgumentParser(description="فحص FilteredStream ضد خادم Twitter البديل")
+    parser.add_argument('--port', type=int, default=18090)
+    parser.add_argument('--log-level', default='ERROR')
+    args = parser.parse_args()
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.ERROR),
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    try:
+        asyncio.run(run(args.port))
+    except AssertionError as e:
+        print(f"  ✗ فشل الفحص: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
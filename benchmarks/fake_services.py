@@ -0,0 +1,474 @@
+"""
+خوادم محلية بديلة لـ Twitter API و Discord webhook لقياس الأداء دون اتصال
+تدعم تأخيراً قابلاً للضبط، وحقن أخطاء 429، وتوليد تغريدات بمعدل محدد،
+و filtered stream بقواعد واتصال طويل
+
+الاستخدام المنفرد (للتجارب اليدوية مع TWITTER_API_BASE_URL):
+    python benchmarks/fake_services.py --port 18080 --accounts alpha,beta --rate 0.2
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import re
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from aiohttp import web
+
+FROM_RE = re.compile(r'from:(\w+)')
+
+class FakeTwitter:
+    """بديل لـ Twitter API v2 يولد تغريدات لحسابات وهمية"""
+
+    def __init__(self, accounts: List[str], tweet_rate: float = 0.1, latency: float = 0.0,
+                 error_rate: float = 0.0, rate_limit: int = 100000, heartbeat: float = 20.0,
+                 media_size: int = 0):
+        self.latency = latency
+        # حجم صورة مرفقة بكل تغريدة بالبايت (0 بدون ميديا)، تُخدم من /media
+        self.media_size = media_size
+        self.media: Dict[str, Dict] = {}
+        self.media_requests = 0
+        self.origin = ""
+        self.heartbeat = heartbeat
+        # انقطاع مصطنع: كل الطلبات ترجع 503 حتى هذا الوقت (monotonic)
+        self.down_until = 0.0
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.users: Dict[str, Dict] = {}
+        self.timelines: Dict[str, List[Dict]] = {}
+        self.tweets: Dict[str, Dict] = {}
+        # وقت إنشاء كل تغريدة (monotonic) لحساب زمن الاكتشاف
+        self.created: Dict[str, float] = {}
+        self.tweet_rate = tweet_rate
+        self.requests = 0
+        self.rate_limited = 0
+        # التغريدات المرجعة في كل الردود (ما يُحسب من حد القراءة الشهري)
+        self.tweets_served = 0
+        self._ids = itertools.count(1_900_000_000_000_000_000, 4096)
+        # قواعد الـ filtered stream والاتصالات المفتوحة (طابور لكل اتصال)
+        self.rules: Dict[str, Dict] = {}
+        self._rule_ids = itertools.count(1)
+        self._streams: Set[asyncio.Queue] = set()
+        self.stream_connections = 0
+        # رموز حالة تُرجع لمحاولات اتصال الـ stream التالية بالترتيب (مثل 503 أو 429)
+        self.stream_failures: Deque[int] = deque()
+
+        for i, name in enumerate(accounts):
+            user_id = str(10_000 + i)
+            self.users[name.lower()] = {
+                'id': user_id,
+                'name': name.title(),
+                'username': name,
+                'profile_image_url': f'https://pbs.twimg.com/profile_images/{user_id}/a_normal.jpg',
+                'verified': False,
+                'public_metrics': {'followers_count': random.randint(100, 2_000_000)}
+            }
+            self.timelines[user_id] = []
+
+    def add_tweet(self, user_id: str, text: Optional[str] = None) -> str:
+        """إضافة تغريدة جديدة لحساب (الأحدث أولاً)"""
+        tweet_id = str(next(self._ids))
+        tweet = {
+            'id': tweet_id,
+            'author_id': user_id,
+            'text': text or f"tweet {tweet_id} #bench https://t.co/{tweet_id[-8:]}",
+            'created_at': datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
+            'public_metrics': {'like_count': random.randint(0, 5000), 'retweet_count': 0, 'reply_count': 3},
+            'entities': {'hashtags': [{'tag': 'bench'}]}
+        }
+        if self.media_size:
+            media_key = f"3_{tweet_id}"
+            self.media[media_key] = {'media_key': media_key, 'type': 'photo', 'width': 1200, 'height': 675,
+                                     'url': f"{self.origin}/media/{media_key}.jpg"}
+            tweet['attachments'] = {'media_keys': [media_key]}
+        self.timelines[user_id].insert(0, tweet)
+        self.tweets[tweet_id] = tweet
+        # تويتر يتيح آخر 3200 تغريدة فقط من الـ timeline
+        del self.timelines[user_id][3200:]
+        self.created[tweet_id] = time.monotonic()
+        self._publish(self.timelines[user_id][0])
+        return tweet_id
+
+    def delete_tweet(self, tweet_id: str) -> None:
+        """حذف تغريدة كما يحذفها صاحبها (تختفي من الـ timeline والبحث بالمعرف)"""
+        tweet = self.tweets.pop(tweet_id)
+        self.timelines[tweet['author_id']].remove(tweet)
+
+    def engage(self, fraction: float = 0.5) -> None:
+        """زيادة إحصائيات نسبة من التغريدات عشوائياً"""
+        for tweet in random.sample(list(self.tweets.values()), int(len(self.tweets) * fraction)):
+            stats = tweet['public_metrics']
+            stats['like_count'] = int(stats['like_count'] * 1.5) + 10
+            stats['retweet_count'] += random.randint(0, 50)
+
+    def _publish(self, tweet: Dict) -> None:
+        """إرسال التغريدة لكل اتصال stream إذا طابقت إحدى القواعد"""
+        if not self._streams:
+            return
+        user = next(user for user in self.users.values() if user['id'] == tweet['author_id'])
+        matching = [
+            {'id': rule['id'], 'tag': rule.get('tag')} for rule in self.rules.values()
+            if user['username'].lower() in (name.lower() for name in FROM_RE.findall(rule['value']))
+        ]
+        if matching:
+            message = {'data': tweet, 'includes': {'users': [user], **self._includes([tweet])}, 'matching_rules': matching}
+            for stream in self._streams:
+                stream.put_nowait(message)
+
+    def drop_streams(self) -> None:
+        """قطع كل اتصالات الـ stream لاختبار إعادة الاتصال"""
+        for stream in self._streams:
+            stream.put_nowait(None)
+
+    async def generate(self, duration: float) -> None:
+        """توليد تغريدات عشوائية (Poisson) لمدة محددة بالمعدل الإجمالي tweet_rate/ث"""
+        if self.tweet_rate <= 0:
+            return
+        user_ids = [user['id'] for user in self.users.values()]
+        deadline = time.monotonic() + duration
+        while True:
+            delay = random.expovariate(self.tweet_rate)
+            if time.monotonic() + delay > deadline:
+                break
+            await asyncio.sleep(delay)
+            self.add_tweet(random.choice(user_ids))
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            'x-rate-limit-limit': str(self.rate_limit),
+            'x-rate-limit-remaining': str(self.rate_limit - 1),
+            'x-rate-limit-reset': str(int(time.time()) + 900)
+        }
+
+    async def _prologue(self) -> Optional[web.Response]:
+        """التأخير المصطنع وحقن 429 لكل طلب"""
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if time.monotonic() < self.down_until:
+            return web.json_response({'title': 'Service Unavailable'}, status=503)
+        if self.error_rate and random.random() < self.error_rate:
+            self.rate_limited += 1
+            return web.json_response(
+                {'title': 'Too Many Requests'}, status=429,
+                headers={'x-rate-limit-limit': str(self.rate_limit), 'x-rate-limit-remaining': '0',
+                         'x-rate-limit-reset': str(int(time.time()) + 2)}
+            )
+        return None
+
+    def _includes(self, tweets: List[Dict]) -> Dict:
+        keys = [key for tweet in tweets for key in tweet.get('attachments', {}).get('media_keys', [])]
+        return {'media': [self.media[key] for key in keys]} if keys else {}
+
+    async def media_file(self, request: web.Request) -> web.StreamResponse:
+        """ملف الميديا على دفعات كما يرسله CDN تويتر"""
+        self.media_requests += 1
+        response = web.StreamResponse(headers={'Content-Type': 'image/jpeg'})
+        response.content_length = self.media_size
+        await response.prepare(request)
+        chunk = request.match_info['name'].encode().ljust(64 * 1024, b'\0')
+        remaining = self.media_size
+        while remaining > 0:
+            await response.write(chunk[:remaining])
+            remaining -= len(chunk)
+        return response
+
+    async def head(self, request: web.Request) -> web.Response:
+        return web.Response(status=200)
+
+    async def user_by_username(self, request: web.Request) -> web.Response:
+        error = await self._prologue()
+        if error:
+            return error
+        user = self.users.get(request.match_info['username'].lower())
+        if not user:
+            return web.json_response({'errors': [{'detail': 'not found'}]}, headers=self._headers())
+        return web.json_response({'data': user}, headers=self._headers())
+
+    async def users_by(self, request: web.Request) -> web.Response:
+        error = await self._prologue()
+        if error:
+            return error
+        names = [name.lower() for name in request.query.get('usernames', '').split(',') if name]
+        return web.json_response(
+            {'data': [self.users[name] for name in names if name in self.users]},
+            headers=self._headers()
+        )
+
+    def _page(self, tweets: List[Dict], request: web.Request) -> Tuple[List[Dict], Dict]:
+        """صفحة من التغريدات (الأحدث أولاً) مع meta كما في Twitter API v2
+
+        pagination_token هنا معرف آخر تغريدة في الصفحة السابقة.
+        """
+        since_id = request.query.get('since_id')
+        if since_id:
+            tweets = [tweet for tweet in tweets if int(tweet['id']) > int(since_id)]
+        token = request.query.get('pagination_token')
+        if token:
+            tweets = [tweet for tweet in tweets if int(tweet['id']) < int(token)]
+        page = tweets[:int(request.query.get('max_results', 10))]
+        self.tweets_served += len(page)
+        meta: Dict = {'result_count': len(page)}
+        if page:
+            meta.update(newest_id=page[0]['id'], oldest_id=page[-1]['id'])
+        if len(tweets) > len(page):
+            meta['next_token'] = page[-1]['id']
+        return page, meta
+
+    async def user_tweets(self, request: web.Request) -> web.Response:
+        error = await self._prologue()
+        if error:
+            return error
+        tweets, meta = self._page(self.timelines.get(request.match_info['user_id'], []), request)
+        return web.json_response(
+            {'data': tweets, 'includes': self._includes(tweets), 'meta': meta} if tweets
+            else {'meta': meta},
+            headers=self._headers()
+        )
+
+    async def tweets_lookup(self, request: web.Request) -> web.Response:
+        """GET /2/tweets?ids= حتى 100 معرف، والمحذوفة تُرجع كأخطاء resource-not-found"""
+        error = await self._prologue()
+        if error:
+            return error
+        ids = [tweet_id for tweet_id in request.query.get('ids', '').split(',') if tweet_id]
+        if len(ids) > 100:
+            return web.json_response({'title': 'Invalid Request'}, status=400)
+        found = [self.tweets[tweet_id] for tweet_id in ids if tweet_id in self.tweets]
+        self.tweets_served += len(found)
+        body: Dict = {'data': found} if found else {}
+        errors = [
+            {'value': tweet_id, 'detail': f"Could not find tweet with ids: [{tweet_id}].", 'title': 'Not Found Error',
+             'resource_type': 'tweet', 'parameter': 'ids', 'resource_id': tweet_id,
+             'type': 'https://api.twitter.com/2/problems/resource-not-found'}
+            for tweet_id in ids if tweet_id not in self.tweets
+        ]
+        if errors:
+            body['errors'] = errors
+        return web.json_response(body, headers=self._headers())
+
+    async def search_recent(self, request: web.Request) -> web.Response:
+        error = await self._prologue()
+        if error:
+            return error
+        users = [self.users[name.lower()] for name in FROM_RE.findall(request.query.get('query', ''))
+                 if name.lower() in self.users]
+        tweets = sorted(
+            (tweet for user in users for tweet in self.timelines[user['id']]),
+            key=lambda tweet: int(tweet['id']), reverse=True
+        )
+        tweets, meta = self._page(tweets, request)
+        return web.json_response(
+            {'data': tweets, 'includes': {'users': users, **self._includes(tweets)}, 'meta': meta},
+            headers=self._headers()
+        )
+
+    async def stream_rules(self, request: web.Request) -> web.Response:
+        error = await self._prologue()
+        if error:
+            return error
+        if request.method == 'GET':
+            rules = list(self.rules.values())
+            return web.json_response({'data': rules, 'meta': {'result_count': len(rules)}} if rules
+                                     else {'meta': {'result_count': 0}}, headers=self._headers())
+
+        body = await request.json()
+        for rule_id in body.get('delete', {}).get('ids', []):
+            self.rules.pop(rule_id, None)
+        created = []
+        for rule in body.get('add', []):
+            rule = {'id': str(next(self._rule_ids)), 'value': rule['value'], 'tag': rule.get('tag')}
+            self.rules[rule['id']] = rule
+            created.append(rule)
+        return web.json_response({'data': created, 'meta': {'summary': {'created': len(created)}}},
+                                 status=201 if created else 200, headers=self._headers())
+
+    async def stream(self, request: web.Request) -> web.StreamResponse:
+        """اتصال طويل يرسل سطر JSON لكل تغريدة مطابقة وسطراً فارغاً كنبضة keep-alive"""
+        error = await self._prologue()
+        if error:
+            return error
+        if self.stream_failures:
+            status = self.stream_failures.popleft()
+            return web.json_response({'title': 'Injected Failure', 'status': status}, status=status)
+        response = web.StreamResponse(headers=self._headers())
+        response.content_type = 'application/json'
+        await response.prepare(request)
+        self.stream_connections += 1
+
+        queue: asyncio.Queue = asyncio.Queue()
+        self._streams.add(queue)
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    await response.write(b'\r\n')
+                    continue
+                if message is None:
+                    break
+                await response.write(json.dumps(message).encode() + b'\r\n')
+        except ConnectionResetError:
+            pass
+        finally:
+            self._streams.discard(queue)
+        return response
+
+class FakeDiscord:
+    """بديل لـ Discord webhook بحد إرسال لكل webhook مثل Discord"""
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, limit: int = 5, window: float = 2.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.limit = limit
+        self.window = window
+        self.requests = 0
+        self.rate_limited = 0
+        # (معرف التغريدة، وقت الاستلام monotonic، معرف الـ webhook)
+        self.received: List[Tuple[str, float, str]] = []
+        self.files = 0
+        self.uploaded_bytes = 0
+        self._sent: Dict[str, Deque[float]] = {}
+        # الرسائل المرسلة بـ ?wait=true حسب المعرف، وعدد التعديلات والحذف
+        self.messages: Dict[str, Dict] = {}
+        self._message_ids = itertools.count(1_100_000_000_000_000_000)
+        self.edits = 0
+        self.deletes = 0
+
+    async def webhook_info(self, request: web.Request) -> web.Response:
+        """GET على الـ webhook كما يستخدمه البوت للتحقق دون إرسال"""
+        webhook_id = request.match_info['webhook_id']
+        return web.json_response({'id': webhook_id, 'type': 1, 'token': request.match_info['token']})
+
+    async def _limit(self, webhook_id: str) -> Tuple[Optional[web.Response], Dict[str, str]]:
+        """التأخير المصطنع وحد الإرسال لكل webhook: (رد 429 أو None، ترويسات الحد)"""
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        now = time.monotonic()
+        sent = self._sent.setdefault(webhook_id, deque())
+        while sent and now - sent[0] >= self.window:
+            sent.popleft()
+        reset_after = self.window - (now - sent[0]) if sent else self.window
+
+        if len(sent) >= self.limit or (self.error_rate and random.random() < self.error_rate):
+            self.rate_limited += 1
+            return web.json_response(
+                {'message': 'You are being rate limited.', 'retry_after': round(reset_after, 3), 'global': False},
+                status=429,
+                headers={'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset-After': f"{reset_after:.3f}"}
+            ), {}
+
+        sent.append(now)
+        return None, {
+            'X-RateLimit-Limit': str(self.limit),
+            'X-RateLimit-Remaining': str(self.limit - len(sent)),
+            'X-RateLimit-Reset-After': f"{reset_after:.3f}"
+        }
+
+    async def webhook(self, request: web.Request) -> web.Response:
+        webhook_id = request.match_info['webhook_id']
+        limited, headers = await self._limit(webhook_id)
+        if limited:
+            return limited
+        now = time.monotonic()
+        if request.content_type.startswith('multipart/'):
+            body = {}
+            reader = await request.multipart()
+            async for part in reader:
+                if part.name == 'payload_json':
+                    body = json.loads(await part.text())
+                    continue
+                self.files += 1
+                while True:
+                    chunk = await part.read_chunk()
+                    if not chunk:
+                        break
+                    self.uploaded_bytes += len(chunk)
+        else:
+            body = await request.json()
+        for embed in body.get('embeds', []):
+            url = embed.get('url') or ''
+            if '/status/' in url:
+                self.received.append((url.rsplit('/', 1)[1], now, webhook_id))
+        if request.query.get('wait') != 'true':
+            return web.Response(status=204, headers=headers)
+        message = {'id': str(next(self._message_ids)), 'webhook_id': webhook_id,
+                   'content': body.get('content', ''), 'embeds': body.get('embeds', [])}
+        self.messages[message['id']] = message
+        return web.json_response(message, headers=headers)
+
+    async def message(self, request: web.Request) -> web.Response:
+        """PATCH أو DELETE لرسالة أرسلها الـ webhook"""
+        limited, headers = await self._limit(request.match_info['webhook_id'])
+        if limited:
+            return limited
+        message = self.messages.get(request.match_info['message_id'])
+        if message is None or message['webhook_id'] != request.match_info['webhook_id']:
+            return web.json_response({'message': 'Unknown Message', 'code': 10008}, status=404)
+        if request.method == 'DELETE':
+            self.deletes += 1
+            del self.messages[message['id']]
+            return web.Response(status=204, headers=headers)
+        self.edits += 1
+        message.update({key: value for key, value in (await request.json()).items() if key in ('content', 'embeds')})
+        return web.json_response(message, headers=headers)
+
+def make_app(twitter: FakeTwitter, discord: FakeDiscord) -> web.Application:
+    """تطبيق aiohttp واحد يخدم Twitter تحت /2 و Discord تحت /api/webhooks"""
+    app = web.Application()
+    app.router.add_route('HEAD', '/2', twitter.head)
+    app.router.add_get('/2/users/by/username/{username}', twitter.user_by_username)
+    app.router.add_get('/2/users/by', twitter.users_by)
+    app.router.add_get('/2/users/{user_id}/tweets', twitter.user_tweets)
+    app.router.add_get('/2/tweets', twitter.tweets_lookup)
+    app.router.add_get('/2/tweets/search/recent', twitter.search_recent)
+    app.router.add_route('*', '/2/tweets/search/stream/rules', twitter.stream_rules)
+    app.router.add_get('/2/tweets/search/stream', twitter.stream)
+    app.router.add_get('/media/{name}', twitter.media_file)
+    app.router.add_get('/api/webhooks/{webhook_id}/{token}', discord.webhook_info)
+    app.router.add_post('/api/webhooks/{webhook_id}/{token}', discord.webhook)
+    app.router.add_route('PATCH', '/api/webhooks/{webhook_id}/{token}/messages/{message_id}', discord.message)
+    app.router.add_route('DELETE', '/api/webhooks/{webhook_id}/{token}/messages/{message_id}', discord.message)
+    return app
+
+async def start_services(twitter: FakeTwitter, discord: FakeDiscord,
+                         host: str = '127.0.0.1', port: int = 18080) -> web.AppRunner:
+    """تشغيل الخوادم البديلة وإرجاع الـ runner لإيقافها لاحقاً"""
+    twitter.origin = f"http://{host}:{port}"
+    runner = web.AppRunner(make_app(twitter, discord), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+async def _serve(args) -> None:
+    twitter = FakeTwitter(args.accounts.split(','), args.rate, args.latency_ms / 1000, args.twitter_429)
+    discord = FakeDiscord(args.latency_ms / 1000, args.discord_429)
+    runner = await start_services(twitter, discord, args.host, args.port)
+    print(f"Twitter: http://{args.host}:{args.port}/2")
+    print(f"Discord: http://{args.host}:{args.port}/api/webhooks/1/token")
+    try:
+        await twitter.generate(float('inf'))
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="خوادم Twitter و Discord البديلة")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=18080)
+    parser.add_argument('--accounts', default='alpha,beta')
+    parser.add_argument('--rate', type=float, default=0.1, help='تغريدات/ث لكل الحسابات')
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--twitter-429', type=float, default=0, help='نسبة طلبات Twitter التي ترجع 429')
+    parser.add_argument('--discord-429', type=float, default=0, help='نسبة طلبات Discord التي ترجع 429')
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,153 @@
+"""
+فترات فحص متكيفة حسب نشاط كل حساب
+تتعلم معدل النشر لكل حساب من أوقات التغريدات المرسلة وتوزع ميزانية الطلبات عليها
+"""
+
+import json
+import logging
+import math
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class AdaptiveCadence:
+    """حساب فترة الفحص لكل مهمة ضمن حدود دنيا وعليا وميزانية ثابتة
+
+    لتقليل متوسط زمن الاكتشاف بنفس عدد الطلبات تكون فترة كل حساب متناسبة
+    عكسياً مع الجذر التربيعي لمعدل نشره، مع تعديل المعدل حسب ساعة اليوم.
+    الحسابات التي لا تملك بيانات كافية تُفحص بالفترة الأساسية.
+    """
+
+    MIN_GAPS = 3
+    RECOMPUTE_EVERY = 60
+
+    def __init__(self, base_interval: float, min_interval: float, max_interval: float,
+                 data_dir: Optional[str] = None, alpha: float = 0.3,
+                 budget: Optional[Callable[[], Optional[float]]] = None):
+        self.base_interval = base_interval
+        self.min_interval = min(min_interval, base_interval)
+        self.max_interval = max(max_interval, base_interval)
+        self.alpha = alpha
+        self.budget = budget
+        self.file_path = Path(data_dir) / "cadence.json" if data_dir else None
+
+        self.gap_ewma: Dict[str, float] = {}
+        self.gap_count: Dict[str, int] = {}
+        self.last_seen: Dict[str, float] = {}
+        self.hours: Dict[str, List[float]] = {}
+
+        # المهام المجدولة: مفتاح المهمة -> الحسابات التي تغطيها
+        self.jobs: Dict[str, List[str]] = {}
+        self._intervals: Dict[str, float] = {}
+        self._computed_at = 0.0
+        self._load()
+
+    def _load(self) -> None:
+        """تحميل ما تم تعلمه في التشغيلات السابقة"""
+        if not self.file_path or not self.file_path.exists():
+            return
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.gap_ewma = data.get('gap_ewma', {})
+            self.gap_count = data.get('gap_count', {})
+            self.last_seen = data.get('last_seen', {})
+            self.hours = data.get('hours', {})
+        except Exception as e:
+            logger.error(f"خطأ في تحميل بيانات فترات الفحص: {e}")
+
+    def save(self) -> None:
+        """حفظ معدلات النشر المتعلمة"""
+        if not self.file_path:
+            return
+        tmp_path = self.file_path.with_suffix('.json.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'gap_ewma': self.gap_ewma,
+                    'gap_count': self.gap_count,
+                    'last_seen': self.last_seen,
+                    'hours': self.hours
+                }, f)
+            tmp_path.replace(self.file_path)
+        except Exception as e:
+            logger.error(f"خطأ في حفظ بيانات فترات الفحص: {e}")
+
+    def set_jobs(self, jobs: Dict[str, List[str]]) -> None:
+        """تحديد المهام المجدولة والحسابات التابعة لكل منها"""
+        self.jobs = dict(jobs)
+        self._computed_at = 0.0
+
+    def observe(self, account: str, created_at: str) -> None:
+        """تسجيل وقت نشر تغريدة مرسلة"""
+        try:
+            dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+        except (ValueError, AttributeError):
+            return
+        ts = dt.timestamp()
+
+        hours = self.hours.setdefault(account, [0.0] * 24)
+        # تخفيف الأوزان القديمة ليتكيف التوزيع مع تغير عادات الحساب
+        for i in range(24):
+            hours[i] *= 0.98
+        hours[dt.hour] += 1.0
+
+        last = self.last_seen.get(account)
+        if last is None or ts > last:
+            if last is not None:
+                gap = ts - last
+                previous = self.gap_ewma.get(account)
+                self.gap_ewma[account] = gap if previous is None else (1 - self.alpha) * previous + self.alpha * gap
+                self.gap_count[account] = self.gap_count.get(account, 0) + 1
+            self.last_seen[account] = ts
+
+    def rate(self, account: str, now: Optional[float] = None) -> Optional[float]:
+        """معدل النشر المتوقع الآن (تغريدة/ثانية) أو None عند نقص البيانات"""
+        if self.gap_count.get(account, 0) < self.MIN_GAPS:
+            return None
+        now = now or time.time()
+        # الصمت الطويل يرفع متوسط الفجوة حتى لو كانت الفجوات السابقة قصيرة
+        gap = max(self.gap_ewma[account], now - self.last_seen.get(account, now), 1.0)
+
+        hours = self.hours.get(account)
+        factor = 1.0
+        if hours:
+            mean = sum(hours) / 24
+            factor = (hours[datetime.fromtimestamp(now, timezone.utc).hour] + 1) / (mean + 1)
+        return factor / gap
+
+    def _recompute(self, now: float) -> None:
+        """توزيع ميزانية الطلبات على المهام"""
+        rates: Dict[str, float] = {}
+        unknown = 0
+        for key, accounts in self.jobs.items():
+            account_rates = [self.rate(account, now) for account in accounts]
+            if any(r is None for r in account_rates):
+                unknown += 1
+            else:
+                rates[key] = sum(account_rates)
+
+        total_budget = len(self.jobs) / self.base_interval
+        if self.budget:
+            limit = self.budget()
+            if limit:
+                total_budget = min(total_budget, limit)
+
+        self._intervals = {}
+        known_budget = total_budget - unknown / self.base_interval
+        if rates and known_budget > 0:
+            scale = sum(math.sqrt(r) for r in rates.values()) / known_budget
+            for key, r in rates.items():
+                interval = scale / math.sqrt(r)
+                self._intervals[key] = min(self.max_interval, max(self.min_interval, interval))
+        self._computed_at = now
+
+    def interval_for(self, key: str) -> float:
+        """فترة الفحص التالية للمهمة"""
+        now = time.time()
+        if now - self._computed_at >= self.RECOMPUTE_EVERY:
+            self._recompute(now)
+        return self._intervals.get(key, self.base_interval)
@@ -4,10 +4,13 @@
 """
 
 import os
+import asyncio
 import logging
 from pathlib import Path
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field, fields
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from routing import DEFAULT_DESTINATION, RoutingRule, load_rules
 
 # إعداد logger للإعدادات
 logger = logging.getLogger(__name__)
@@ -23,6 +26,84 @@ class BotConfig:
     max_tweet_length: int = 2000
     log_level: str = "INFO"
     data_dir: str = "data"
+    state_backend: str = "sqlite"
+    state_commit_batch: int = 50
+    state_commit_interval: float = 1.0
+    dedup_capacity: int = 5000
+    http_pool_limit: int = 10
+    http_timeout: float = 30.0
+    http_connect_timeout: float = 10.0
+    http_keepalive_timeout: float = 30.0
+    dns_cache_ttl: int = 300
+    prewarm_seconds: int = 5
+    twitter_usernames: List[str] = field(default_factory=list)
+    max_concurrent_polls: int = 5
+    poll_jitter: float = 0.1
+    profile_cache_ttl: int = 86400
+    ingestion_mode: str = "timeline"
+    search_query_max_length: int = 512
+    adaptive_polling: bool = False
+    min_check_interval: int = 60
+    max_check_interval: int = 1800
+    delivery_queue_size: int = 1000
+    delivery_max_retries: int = 5
+    account_webhooks: Dict[str, List[str]] = field(default_factory=dict)
+    coalesce_window: float = 0.0
+    twitter_api_base_url: str = "https://api.twitter.com/2"
+    metrics_port: int = 8000
+    metrics_host: str = "0.0.0.0"
+    config_reload_interval: float = 5.0
+    startup_check: str = "auto"
+    log_max_bytes: int = 10 * 1024 * 1024
+    log_backup_count: int = 5
+    log_rotate_when: str = ""
+    log_compress: bool = True
+    log_json: bool = False
+    media_upload: bool = False
+    media_cache_max_bytes: int = 512 * 1024 * 1024
+    media_max_upload_bytes: int = 10 * 1024 * 1024
+    workers: int = 1
+    backfill_max_pages: int = 5
+    backfill_rate: float = 0.5
+    refresh_interval: float = 0.0
+    refresh_window: float = 86400.0
+    refresh_min_change: float = 0.1
+    routing_rules_file: str = ""
+    routing_rules: List[RoutingRule] = field(default_factory=list)
+    
+    def __post_init__(self):
+        # الإعداد القديم بحساب واحد يبقى مدعوماً (وعامل بدون حسابات في وضع WORKERS يبقى فارغاً)
+        if not self.twitter_usernames and self.twitter_username:
+            self.twitter_usernames = [self.twitter_username]
+        self.account_webhooks = {account.lower(): urls for account, urls in self.account_webhooks.items()}
+    
+    def webhooks_for(self, username: str) -> List[str]:
+        """روابط Discord التي تُرسل إليها تغريدات الحساب"""
+        return self.account_webhooks.get(username.lower()) or [self.discord_webhook_url]
+    
+    def destinations_for(self, username: str) -> List[str]:
+        """كل الروابط التي قد تصلها تغريدات الحساب: روابطه ووجهات قواعد التوجيه التي تشمله"""
+        urls = list(self.webhooks_for(username))
+        for rule in self.routing_rules:
+            if rule.applies_to(username):
+                urls.extend(url for url in rule.webhooks if url != DEFAULT_DESTINATION and url not in urls)
+        return urls
+    
+    def all_webhooks(self) -> List[str]:
+        """كل روابط Discord المستخدمة بدون تكرار (الرابط الأساسي أولاً)"""
+        urls = [self.discord_webhook_url]
+        for username in self.twitter_usernames:
+            urls.extend(url for url in self.destinations_for(username) if url not in urls)
+        return urls
+
+def diff_config(old: BotConfig, new: BotConfig) -> Dict[str, Tuple[Any, Any]]:
+    """الحقول التي تغيرت بين إعدادين: الاسم -> (القيمة القديمة، الجديدة)"""
+    changes = {}
+    for item in fields(BotConfig):
+        before, after = getattr(old, item.name), getattr(new, item.name)
+        if before != after:
+            changes[item.name] = (before, after)
+    return changes
 
 class ConfigLoader:
     """فئة تحميل وإدارة الإعدادات"""
@@ -31,14 +112,15 @@ class ConfigLoader:
         self.env_file = env_file
         self._load_env_file()
     
-    def _load_env_file(self) -> None:
-        """تحميل متغيرات البيئة من ملف .env"""
+    def _read_env_file(self) -> Dict[str, str]:
+        """قراءة متغيرات ملف .env دون تعيينها"""
         env_path = Path(self.env_file)
+        values: Dict[str, str] = {}
         
         if not env_path.exists():
             logger.warning(f"ملف .env غير موجود في: {env_path.absolute()}")
             logger.info("سيتم الاعتماد على متغيرات البيئة الموجودة")
-            return
+            return values
         
         try:
             with open(env_path, 'r', encoding='utf-8') as f:
@@ -65,17 +147,40 @@ class ConfigLoader:
                     elif value.startswith("'") and value.endswith("'"):
                         value = value[1:-1]
                     
-                    # تعيين متغير البيئة فقط إذا لم يكن موجوداً
-                    if key not in os.environ:
-                        os.environ[key] = value
-                        logger.debug(f"تم تحميل: {key}")
+                    values[key] = value
             
-            logger.info(f"تم تحميل ملف .env بنجاح: {env_path}")
+            return values
             
         except Exception as e:
             logger.error(f"خطأ في تحميل ملف .env: {e}")
             raise
     
+    def _load_env_file(self) -> None:
+        """تحميل متغيرات البيئة من ملف .env"""
+        self._file_values = self._read_env_file()
+        for key, value in self._file_values.items():
+            # تعيين متغير البيئة فقط إذا لم يكن موجوداً
+            if key not in os.environ:
+                os.environ[key] = value
+                logger.debug(f"تم تحميل: {key}")
+        if self._file_values:
+            logger.info(f"تم تحميل ملف .env بنجاح: {self.env_file}")
+    
+    def reload(self) -> BotConfig:
+        """إعادة قراءة ملف .env وبناء BotConfig جديد"""
+        # القيم التي جاءت من الملف تُستبدل، أما متغيرات البيئة الحقيقية
+        # (المختلفة عن قيمة الملف) فتبقى لها الأولوية كما عند التشغيل
+        previous = self._file_values
+        values = self._read_env_file()
+        for key, value in values.items():
+            if key not in os.environ or os.environ[key] == previous.get(key):
+                os.environ[key] = value
+        for key in previous.keys() - values.keys():
+            if os.environ.get(key) == previous[key]:
+                del os.environ[key]
+        self._file_values = values
+        return self.load_config()
+    
     def _get_env_var(self, key: str, default: Optional[str] = None, required: bool = True) -> Optional[str]:
         """الحصول على متغير بيئة مع التحقق"""
         value = os.getenv(key, default)
@@ -98,13 +203,43 @@ class ConfigLoader:
             logger.warning(f"قيمة غير صحيحة لـ {key}، سيتم استخدام القيمة الافتراضية: {default}")
             return default
     
+    def _get_env_list(self, key: str) -> List[str]:
+        """تحويل متغير البيئة المفصول بفواصل إلى قائمة"""
+        value = os.getenv(key, '')
+        return [item.strip() for item in value.split(',') if item.strip()]
+    
+    def _get_env_mapping(self, key: str) -> Dict[str, List[str]]:
+        """تحويل متغير بصيغة name=url1|url2,name2=url3 إلى قاموس"""
+        mapping: Dict[str, List[str]] = {}
+        for item in self._get_env_list(key):
+            name, sep, values = item.partition('=')
+            urls = [url.strip() for url in values.split('|') if url.strip()]
+            if not sep or not name.strip() or not urls:
+                logger.warning(f"قيمة غير صحيحة في {key}: {item}")
+                continue
+            mapping.setdefault(name.strip().lower(), []).extend(urls)
+        return mapping
+    
+    def _get_env_float(self, key: str, default: float = 0.0) -> float:
+        """تحويل متغير البيئة إلى float"""
+        try:
+            return float(os.getenv(key, str(default)))
+        except ValueError:
+            logger.warning(f"قيمة غير صحيحة لـ {key}، سيتم استخدام القيمة الافتراضية: {default}")
+            return default
+    
     def load_config(self) -> BotConfig:
         """تحميل جميع الإعدادات وإنشاء كائن BotConfig"""
         try:
             # المتغيرات المطلوبة
             twitter_token = self._get_env_var('TWITTER_BEARER_TOKEN', required=True)
             discord_webhook = self._get_env_var('DISCORD_WEBHOOK_URL', required=True)
-            twitter_username = self._get_env_var('TWITTER_USERNAME', required=True)
+            twitter_usernames = self._get_env_list('TWITTER_USERNAMES')
+            twitter_username = self._get_env_var('TWITTER_USERNAME', required=not twitter_usernames)
+            if not twitter_usernames:
+                twitter_usernames = [twitter_username]
+            elif not twitter_username:
+                twitter_username = twitter_usernames[0]
             
             # المتغيرات الاختيارية
             check_interval = self._get_env_int('CHECK_INTERVAL', 300)
@@ -112,9 +247,75 @@ class ConfigLoader:
             max_tweet_length = self._get_env_int('MAX_TWEET_LENGTH', 2000)
             log_level = self._get_env_var('LOG_LEVEL', 'INFO', required=False)
             data_dir = self._get_env_var('DATA_DIR', 'data', required=False)
+            state_backend = self._get_env_var('STATE_BACKEND', 'sqlite', required=False).lower()
+            state_commit_batch = self._get_env_int('STATE_COMMIT_BATCH', 50)
+            state_commit_interval = self._get_env_float('STATE_COMMIT_INTERVAL', 1.0)
+            dedup_capacity = self._get_env_int('DEDUP_CAPACITY', 5000)
+            http_pool_limit = self._get_env_int('HTTP_POOL_LIMIT', 10)
+            http_timeout = self._get_env_float('HTTP_TIMEOUT', 30.0)
+            http_connect_timeout = self._get_env_float('HTTP_CONNECT_TIMEOUT', 10.0)
+            http_keepalive_timeout = self._get_env_float('HTTP_KEEPALIVE_TIMEOUT', 30.0)
+            dns_cache_ttl = self._get_env_int('DNS_CACHE_TTL', 300)
+            prewarm_seconds = self._get_env_int('PREWARM_SECONDS', 5)
+            max_concurrent_polls = self._get_env_int('MAX_CONCURRENT_POLLS', 5)
+            poll_jitter = self._get_env_float('POLL_JITTER', 0.1)
+            profile_cache_ttl = self._get_env_int('PROFILE_CACHE_TTL', 86400)
+            ingestion_mode = self._get_env_var('INGESTION_MODE', 'timeline', required=False).lower()
+            search_query_max_length = self._get_env_int('SEARCH_QUERY_MAX_LENGTH', 512)
+            adaptive_polling = self._get_env_bool('ADAPTIVE_POLLING', False)
+            min_check_interval = self._get_env_int('MIN_CHECK_INTERVAL', 60)
+            max_check_interval = self._get_env_int('MAX_CHECK_INTERVAL', 1800)
+            delivery_queue_size = self._get_env_int('DELIVERY_QUEUE_SIZE', 1000)
+            delivery_max_retries = self._get_env_int('DELIVERY_MAX_RETRIES', 5)
+            account_webhooks = self._get_env_mapping('ACCOUNT_WEBHOOKS')
+            coalesce_window = self._get_env_float('COALESCE_WINDOW', 0.0)
+            twitter_api_base_url = self._get_env_var('TWITTER_API_BASE_URL', 'https://api.twitter.com/2', required=False)
+            metrics_port = self._get_env_int('METRICS_PORT', 8000)
+            metrics_host = self._get_env_var('METRICS_HOST', '0.0.0.0', required=False)
+            config_reload_interval = self._get_env_float('CONFIG_RELOAD_INTERVAL', 5.0)
+            startup_check = self._get_env_var('STARTUP_CHECK', 'auto', required=False).lower()
+            log_max_bytes = self._get_env_int('LOG_MAX_BYTES', 10 * 1024 * 1024)
+            log_backup_count = self._get_env_int('LOG_BACKUP_COUNT', 5)
+            log_rotate_when = self._get_env_var('LOG_ROTATE_WHEN', '', required=False)
+            log_compress = self._get_env_bool('LOG_COMPRESS', True)
+            log_json = self._get_env_bool('LOG_JSON', False)
+            media_upload = self._get_env_bool('MEDIA_UPLOAD', False)
+            media_cache_max_bytes = self._get_env_int('MEDIA_CACHE_MAX_BYTES', 512 * 1024 * 1024)
+            media_max_upload_bytes = self._get_env_int('MEDIA_MAX_UPLOAD_BYTES', 10 * 1024 * 1024)
+            workers = max(1, self._get_env_int('WORKERS', 1))
+            backfill_max_pages = max(0, self._get_env_int('BACKFILL_MAX_PAGES', 5))
+            backfill_rate = max(0.0, self._get_env_float('BACKFILL_RATE', 0.5))
+            refresh_interval = max(0.0, self._get_env_float('REFRESH_INTERVAL', 0.0))
+            refresh_window = self._get_env_float('REFRESH_WINDOW', 86400.0)
+            refresh_min_change = max(0.0, self._get_env_float('REFRESH_MIN_CHANGE', 0.1))
+            routing_rules_file = self._get_env_var('ROUTING_RULES_FILE', '', required=False)
+            routing_rules = load_rules(routing_rules_file) if routing_rules_file else []
+            if ingestion_mode not in ('timeline', 'search', 'stream'):
+                logger.warning(f"وضع جلب غير معروف '{ingestion_mode}'، سيتم استخدام timeline")
+                ingestion_mode = 'timeline'
+            if log_rotate_when and log_rotate_when.upper() not in ('S', 'M', 'H', 'D', 'MIDNIGHT', 'W0', 'W1', 'W2', 'W3', 'W4', 'W5', 'W6'):
+                logger.warning(f"قيمة غير معروفة لـ LOG_ROTATE_WHEN '{log_rotate_when}'، سيتم التدوير حسب الحجم")
+                log_rotate_when = ''
+            if startup_check not in ('auto', 'always', 'never'):
+                logger.warning(f"قيمة غير معروفة لـ STARTUP_CHECK '{startup_check}'، سيتم استخدام auto")
+                startup_check = 'auto'
             
             # التحقق من صحة القيم
-            self._validate_config(twitter_token, discord_webhook, twitter_username, check_interval)
+            for username in twitter_usernames:
+                self._validate_config(twitter_token, discord_webhook, username, check_interval)
+            for account, urls in account_webhooks.items():
+                if account not in [username.lower() for username in twitter_usernames]:
+                    logger.warning(f"الحساب @{account} في ACCOUNT_WEBHOOKS غير موجود في قائمة المراقبة")
+                for url in urls:
+                    self._validate_webhook(url)
+            usernames = [username.lower() for username in twitter_usernames]
+            for rule in routing_rules:
+                for account in rule.accounts:
+                    if account not in usernames:
+                        logger.warning(f"الحساب @{account} في قاعدة التوجيه '{rule.name}' غير موجود في قائمة المراقبة")
+                for url in rule.webhooks:
+                    if url != DEFAULT_DESTINATION:
+                        self._validate_webhook(url)
             
             config = BotConfig(
                 twitter_bearer_token=twitter_token,
@@ -124,13 +325,59 @@ class ConfigLoader:
                 mention_everyone=mention_everyone,
                 max_tweet_length=max_tweet_length,
                 log_level=log_level,
-                data_dir=data_dir
+                data_dir=data_dir,
+                state_backend=state_backend,
+                state_commit_batch=state_commit_batch,
+                state_commit_interval=state_commit_interval,
+                dedup_capacity=dedup_capacity,
+                http_pool_limit=http_pool_limit,
+                http_timeout=http_timeout,
+                http_connect_timeout=http_connect_timeout,
+                http_keepalive_timeout=http_keepalive_timeout,
+                dns_cache_ttl=dns_cache_ttl,
+                prewarm_seconds=prewarm_seconds,
+                twitter_usernames=twitter_usernames,
+                max_concurrent_polls=max_concurrent_polls,
+                poll_jitter=poll_jitter,
+                profile_cache_ttl=profile_cache_ttl,
+                ingestion_mode=ingestion_mode,
+                search_query_max_length=search_query_max_length,
+                adaptive_polling=adaptive_polling,
+                min_check_interval=min_check_interval,
+                max_check_interval=max_check_interval,
+                delivery_queue_size=delivery_queue_size,
+                delivery_max_retries=delivery_max_retries,
+                account_webhooks=account_webhooks,
+                coalesce_window=coalesce_window,
+                twitter_api_base_url=twitter_api_base_url,
+                metrics_port=metrics_port,
+                metrics_host=metrics_host,
+                config_reload_interval=config_reload_interval,
+                startup_check=startup_check,
+                log_max_bytes=log_max_bytes,
+                log_backup_count=log_backup_count,
+                log_rotate_when=log_rotate_when,
+                log_compress=log_compress,
+                log_json=log_json,
+                media_upload=media_upload,
+                media_cache_max_bytes=media_cache_max_bytes,
+                media_max_upload_bytes=media_max_upload_bytes,
+                workers=workers,
+                backfill_max_pages=backfill_max_pages,
+                backfill_rate=backfill_rate,
+                refresh_interval=refresh_interval,
+                refresh_window=refresh_window,
+                refresh_min_change=refresh_min_change,
+                routing_rules_file=routing_rules_file,
+                routing_rules=routing_rules
             )
             
             logger.info("تم تحميل الإعدادات بنجاح")
-            logger.info(f"الحساب المراقب: @{twitter_username}")
+            logger.info(f"الحسابات المراقبة: {', '.join('@' + u for u in twitter_usernames)}")
             logger.info(f"فترة الفحص: {check_interval} ثانية")
             logger.info(f"منشن الكل: {'مفعل' if mention_everyone else 'معطل'}")
+            if routing_rules:
+                logger.info(f"قواعد التوجيه: {len(routing_rules)} قاعدة من {routing_rules_file}")
             
             return config
             
@@ -145,8 +392,7 @@ class ConfigLoader:
             logger.warning("تنسيق Twitter Bearer Token قد يكون غير صحيح")
         
         # التحقق من Discord Webhook URL
-        if not webhook.startswith('https://discord.com/api/webhooks/'):
-            raise ValueError("رابط Discord Webhook غير صحيح")
+        self._validate_webhook(webhook)
         
         # التحقق من اسم المستخدم
         if username.startswith('@'):
@@ -158,6 +404,60 @@ class ConfigLoader:
         
         if interval > 3600:
             logger.warning("فترة الفحص أكثر من ساعة قد تفوت تغريدات مهمة")
+    
+    def _validate_webhook(self, webhook: str) -> None:
+        """التحقق من رابط Discord Webhook"""
+        if not webhook.startswith('https://discord.com/api/webhooks/'):
+            raise ValueError("رابط Discord Webhook غير صحيح")
+
+class ConfigWatcher:
+    """مراقبة ملف .env وإعادة تحميل الإعدادات عند تغيره أو عند طلب يدوي (SIGHUP)"""
+    
+    def __init__(self, env_file: str = ".env", interval: float = 5.0):
+        self.env_file = env_file
+        self.interval = interval
+        self.loader = ConfigLoader(env_file)
+        self._mtime = self._stat()
+        self._requested = asyncio.Event()
+    
+    def _stat(self) -> Tuple[Optional[Tuple[float, int]], ...]:
+        """وقت تعديل وحجم ملف .env وملف قواعد التوجيه (تعديل أي منهما يعيد التحميل)"""
+        stats = []
+        for path in (self.env_file, os.getenv('ROUTING_RULES_FILE')):
+            try:
+                stat = os.stat(path) if path else None
+            except OSError:
+                stat = None
+            stats.append((stat.st_mtime, stat.st_size) if stat else None)
+        return tuple(stats)
+    
+    def request_reload(self) -> None:
+        """طلب إعادة التحميل فوراً (يُستدعى من معالج SIGHUP)"""
+        self._requested.set()
+    
+    async def watch(self, on_change: Callable[[BotConfig], Awaitable[None]]) -> None:
+        """حلقة المراقبة: فحص وقت تعديل الملف كل interval ثانية (0 = SIGHUP فقط)"""
+        while True:
+            try:
+                await asyncio.wait_for(self._requested.wait(), self.interval if self.interval > 0 else None)
+            except asyncio.TimeoutError:
+                pass
+            requested = self._requested.is_set()
+            self._requested.clear()
+            
+            mtime = self._stat()
+            if not requested and mtime == self._mtime:
+                continue
+            self._mtime = mtime
+            
+            logger.info(f"إعادة تحميل الإعدادات من {self.env_file}")
+            try:
+                config = self.loader.reload()
+            except Exception as e:
+                # إعدادات غير صالحة: الاستمرار بالإعدادات الحالية
+                logger.error(f"تم تجاهل الإعدادات الجديدة: {e}")
+                continue
+            await on_change(config)
 
 def create_env_file_template(file_path: str = ".env") -> None:
     """إنشاء ملف .env كمثال إذا لم يكن موجوداً"""
@@ -230,8 +530,8 @@ if __name__ == "__main__":
         # محاولة تحميل الإعدادات
         config = load_config()
         print("✅ تم تحميل الإعدادات بنجاح!")
-        print(f"الحساب المراقب: @{config.twitter_username}")
+        print(f"الحسابات المراقبة: {', '.join('@' + u for u in config.twitter_usernames)}")
         
     except Exception as e:
         print(f"❌ خطأ: {e}")
-        print("تأكد من تعديل ملف .env بالمعلومات الصحيحة")
\ No newline at end of file
+        print("تأكد من تعديل ملف .env بالمعلومات الصحيحة")
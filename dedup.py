@@ -0,0 +1,65 @@
+"""
+فهرس مضغوط للتغريدات المرسلة
+يخزن معرفات التغريدات كأعداد int64 مرتبة في مصفوفة بدلاً من مجموعة نصوص
+"""
+
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Optional
+
+class SortedIdSet:
+    """مجموعة مرتبة ومحدودة الحجم من معرفات int64
+
+    معرفات تويتر (snowflake) تزداد مع الزمن، لذلك الإضافة غالباً تكون في
+    نهاية المصفوفة، وعند تجاوز السعة يتم حذف الأقدم وإرجاع أكبر معرف محذوف
+    ليُستخدم كحد أدنى (watermark). الحذف يتم على دفعات (هامش 1/8 من السعة)
+    حتى لا يتم تحريك المصفوفة بالكامل مع كل إضافة.
+    """
+
+    __slots__ = ('capacity', '_slack', '_ids')
+
+    def __init__(self, capacity: int, ids: Iterable[int] = ()):
+        self.capacity = max(1, capacity)
+        self._slack = max(1, self.capacity // 8)
+        self._ids = array('q', sorted(set(ids)))
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, tweet_id: int) -> bool:
+        ids = self._ids
+        i = bisect_left(ids, tweet_id)
+        return i < len(ids) and ids[i] == tweet_id
+
+    def add(self, tweet_id: int) -> Optional[int]:
+        """إضافة معرف، ويرجع أكبر معرف تم حذفه إذا تجاوزت المجموعة سعتها"""
+        ids = self._ids
+        if not ids or tweet_id > ids[-1]:
+            ids.append(tweet_id)
+        else:
+            i = bisect_left(ids, tweet_id)
+            if i < len(ids) and ids[i] == tweet_id:
+                return None
+            ids.insert(i, tweet_id)
+        if len(ids) > self.capacity + self._slack:
+            return self.evict()
+        return None
+
+    def evict(self) -> Optional[int]:
+        """حذف الأقدم حتى الرجوع للسعة المحددة"""
+        overflow = len(self._ids) - self.capacity
+        if overflow <= 0:
+            return None
+        evicted_max = self._ids[overflow - 1]
+        del self._ids[:overflow]
+        return evicted_max
+
+    def discard_below(self, watermark: int) -> None:
+        """حذف كل المعرفات الأصغر من أو تساوي الحد الأدنى"""
+        i = bisect_left(self._ids, watermark + 1)
+        if i:
+            del self._ids[:i]
+
+    def max(self) -> int:
+        """أحدث معرف في المجموعة (0 إذا كانت فارغة)"""
+        return self._ids[-1] if self._ids else 0
@@ -0,0 +1,311 @@
+"""
+طابور إرسال الرسائل إلى Discord
+عامل (worker) في الخلفية يرسل الرسائل بالترتيب ويلتزم بحدود Discord
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# حدود Discord للرسالة الواحدة
+MAX_EMBEDS = 10
+MAX_EMBEDS_SIZE = 6000
+MAX_CONTENT_LENGTH = 2000
+MAX_ATTACHMENTS = 10
+
+@dataclass
+class DeliveryResult:
+    """نتيجة محاولة إرسال واحدة إلى webhook"""
+    ok: bool
+    status: int = 0
+    retry_after: Optional[float] = None
+    remaining: Optional[int] = None
+    reset_after: Optional[float] = None
+    error: str = ""
+    # الرسالة كما أرجعها Discord مع ?wait=true (المعرف والـ embeds)
+    message: Optional[Dict] = None
+
+@dataclass
+class DeliveryJob:
+    """رسالة جاهزة للإرسال مع بيانات التغريدة المرتبطة بها"""
+    account: str
+    tweet_id: str
+    payload: Dict
+    tweet: Dict = field(default_factory=dict)
+    destination: str = ""
+    # تغريدة فائتة استُعيدت بعد انقطاع: تُرسل بمعدل محدد بعد الرسائل المباشرة
+    backfill: bool = False
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return (self.account, self.tweet_id)
+
+def embed_size(embed: Dict) -> int:
+    """عدد الأحرف المحسوبة في حد Discord الإجمالي للـ embeds"""
+    size = len(embed.get('title') or '') + len(embed.get('description') or '')
+    size += len((embed.get('author') or {}).get('name') or '')
+    size += len((embed.get('footer') or {}).get('text') or '')
+    for item in embed.get('fields') or []:
+        size += len(item.get('name') or '') + len(item.get('value') or '')
+    return size
+
+def _content_lines(payload: Dict) -> List[str]:
+    """أسطر المحتوى بدون المنشن (يُضاف مرة واحدة للرسالة المدمجة)"""
+    return [line for line in (payload.get('content') or '').split('\n') if line and line != '@everyone']
+
+def _mentions(payload: Dict) -> bool:
+    return bool((payload.get('allowed_mentions') or {}).get('everyone'))
+
+def merge_payloads(payloads: List[Dict]) -> Dict:
+    """دمج عدة رسائل في رسالة واحدة متعددة الـ embeds مع منشن واحد فقط"""
+    if len(payloads) == 1:
+        return payloads[0]
+    mention = any(_mentions(payload) for payload in payloads)
+    lines = ['@everyone'] if mention else []
+    for payload in payloads:
+        lines.extend(line for line in _content_lines(payload) if line not in lines)
+    merged = {
+        "content": "\n".join(lines)[:MAX_CONTENT_LENGTH],
+        "embeds": [embed for payload in payloads for embed in payload.get('embeds', [])],
+        "allowed_mentions": {"everyone": mention}
+    }
+    # رتب قواعد التوجيه لكل التغريدات المدمجة
+    roles = list(dict.fromkeys(
+        role for payload in payloads for role in (payload.get('allowed_mentions') or {}).get('roles', [])))
+    if roles:
+        merged["allowed_mentions"]["roles"] = roles
+    media = [item for payload in payloads for item in payload.get('media', [])]
+    if media:
+        merged["media"] = media
+    return merged
+
+def pack_jobs(jobs: List['DeliveryJob']) -> List[List['DeliveryJob']]:
+    """توزيع الرسائل بالترتيب على أقل عدد رسائل تسمح به حدود Discord"""
+    groups: List[List[DeliveryJob]] = []
+    embeds = size = content = attachments = 0
+    for job in jobs:
+        job_embeds = len(job.payload.get('embeds', []))
+        job_attachments = len(job.payload.get('media', []))
+        job_size = sum(embed_size(embed) for embed in job.payload.get('embeds', []))
+        job_content = sum(len(line) + 1 for line in _content_lines(job.payload))
+        if (not groups or embeds + job_embeds > MAX_EMBEDS or size + job_size > MAX_EMBEDS_SIZE or
+                content + job_content > MAX_CONTENT_LENGTH - len('@everyone\n') or
+                attachments + job_attachments > MAX_ATTACHMENTS):
+            groups.append([])
+            embeds = size = content = attachments = 0
+        groups[-1].append(job)
+        embeds += job_embeds
+        size += job_size
+        content += job_content
+        attachments += job_attachments
+    return groups
+
+class DeliveryWorker:
+    """يستهلك طابور الرسائل ويرسلها بسرعة يسمح بها Discord
+
+    يقرأ X-RateLimit-Remaining و X-RateLimit-Reset-After لمعرفة متى يمكن
+    إرسال الرسالة التالية، ويعيد المحاولة عند 429 بعد retry_after بالضبط،
+    وعند أخطاء الشبكة أو 5xx مع تأخير متزايد. عند تحديد linger ينتظر العامل
+    هذه المدة لتجميع الرسائل المتتالية في أقل عدد ممكن من الرسائل.
+
+    التغريدات المستعادة (backfill) في طابور منفصل لا يُرسل منه إلا عندما يكون
+    الطابور المباشر فارغاً وبحد أقصى backfill_rate رسالة في الثانية.
+    """
+
+    def __init__(self, send: Callable[[Dict], Awaitable[DeliveryResult]],
+                 on_delivered: Callable[[DeliveryJob], None],
+                 on_dropped: Optional[Callable[[DeliveryJob], None]] = None,
+                 max_retries: int = 5, base_backoff: float = 1.0, max_queue: int = 1000,
+                 name: str = "discord", linger: float = 0.0, backfill_rate: float = 0.5,
+                 on_message: Optional[Callable[[List[DeliveryJob], Dict, DeliveryResult], None]] = None):
+        self.send = send
+        self.on_delivered = on_delivered
+        self.on_dropped = on_dropped
+        # يُستدعى مرة لكل رسالة وصلت مع تغريداتها (لحفظ معرف الرسالة)
+        self.on_message = on_message
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.name = name
+        self.linger = max(0.0, linger)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.pending: Set[Tuple[str, str]] = set()
+        self.backfill_rate = backfill_rate
+        self.backlog: Deque[DeliveryJob] = deque()
+        self._backlog_added = asyncio.Event()
+        self._next_backfill = 0.0
+
+        self._remaining: Optional[int] = None
+        self._reset_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def is_pending(self, account: str, tweet_id: str) -> bool:
+        return (account, tweet_id) in self.pending
+
+    def submit(self, job: DeliveryJob) -> bool:
+        """إضافة رسالة للطابور دون انتظار (False إذا كانت موجودة أو الطابور ممتلئ)"""
+        if job.key in self.pending:
+            return False
+        if job.backfill:
+            if len(self.backlog) >= self.queue.maxsize > 0:
+                logger.warning(f"طابور التغريدات المستعادة {self.name} ممتلئ، تجاهل التغريدة {job.tweet_id}")
+                return False
+            self.backlog.append(job)
+            self.pending.add(job.key)
+            self._backlog_added.set()
+            return True
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            # لن تُسجل التغريدة كمرسلة، لذلك ستُجلب مجدداً في الفحص التالي
+            logger.warning(f"طابور الإرسال {self.name} ممتلئ، تأجيل التغريدة {job.tweet_id}")
+            return False
+        self.pending.add(job.key)
+        return True
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """انتظار إفراغ الطابور لمدة محددة ثم إيقاف العامل"""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"تم إيقاف طابور {self.name} مع {self.queue.qsize()} رسالة غير مرسلة")
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _wait_for_bucket(self) -> None:
+        """انتظار إعادة تعبئة حد Discord إذا نفد"""
+        if self._remaining is not None and self._remaining <= 0:
+            wait = self._reset_at - time.monotonic()
+            if wait > 0:
+                logger.debug(f"انتظار {wait:.2f} ثانية لحد Discord ({self.name})")
+                await asyncio.sleep(wait)
+            self._remaining = None
+
+    def _update_bucket(self, result: DeliveryResult) -> None:
+        if result.remaining is not None:
+            self._remaining = result.remaining
+        if result.reset_after is not None:
+            self._reset_at = time.monotonic() + result.reset_after
+
+    async def _deliver(self, payload: Dict, label: str) -> Optional[DeliveryResult]:
+        """إرسال رسالة واحدة مع إعادة المحاولة حتى تنجح أو تستنفد المحاولات (None عند الفشل)"""
+        attempts = 0
+        while True:
+            await self._wait_for_bucket()
+            result = await self.send(payload)
+            self._update_bucket(result)
+
+            if result.ok:
+                return result
+
+            if result.status == 429:
+                retry_after = result.retry_after if result.retry_after is not None else (result.reset_after or 1.0)
+                logger.warning(f"Rate limit في Discord webhook، إعادة المحاولة بعد {retry_after:.2f} ثانية")
+                # 429 لا تعني فشل الرسالة، لذلك لا تُحسب من عدد المحاولات
+                await asyncio.sleep(retry_after)
+                continue
+
+            attempts += 1
+            if result.status and 400 <= result.status < 500:
+                # خطأ في الطلب نفسه، إعادة المحاولة لن تفيد
+                logger.error(f"خطأ في إرسال التغريدة {label}: {result.status} - {result.error}")
+                return None
+
+            if attempts > self.max_retries:
+                logger.error(f"فشل إرسال التغريدة {label} بعد {attempts} محاولات: {result.error or result.status}")
+                return None
+
+            backoff = self.base_backoff * (2 ** (attempts - 1))
+            logger.warning(f"فشل إرسال التغريدة {label} ({result.error or result.status})، إعادة المحاولة بعد {backoff:.0f} ثانية")
+            await asyncio.sleep(backoff)
+
+    async def _next(self) -> List[DeliveryJob]:
+        """الرسالة التالية: المباشرة أولاً، والمستعادة عندما يحين موعدها والطابور فارغ"""
+        while True:
+            if not self.queue.empty():
+                return [self.queue.get_nowait()]
+            wait = None
+            if self.backlog:
+                wait = self._next_backfill - time.monotonic()
+                if wait <= 0 or self.backfill_rate <= 0:
+                    if self.backfill_rate > 0:
+                        self._next_backfill = time.monotonic() + 1 / self.backfill_rate
+                    batch = [self.backlog.popleft()]
+                    # مع الدمج تُجمع عدة تغريدات مستعادة في رسالة واحدة ضمن نفس الموعد
+                    while self.linger and self.backlog and len(batch) < MAX_EMBEDS:
+                        batch.append(self.backlog.popleft())
+                    return batch
+
+            self._backlog_added.clear()
+            getter = asyncio.ensure_future(self.queue.get())
+            added = asyncio.ensure_future(self._backlog_added.wait())
+            try:
+                await asyncio.wait({getter, added}, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                added.cancel()
+                if not getter.done():
+                    getter.cancel()
+            if getter.done() and not getter.cancelled():
+                return [getter.result()]
+
+    async def _collect(self, batch: List[DeliveryJob]) -> None:
+        """انتظار مدة linger لتجميع الرسائل التي تصل بعد الرسالة الأولى"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.linger
+        while len(batch) < MAX_EMBEDS:
+            # الرسائل المتراكمة في الطابور تُؤخذ فوراً دون انتظار
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout=timeout))
+            except asyncio.TimeoutError:
+                break
+
+    async def run(self) -> None:
+        """حلقة العامل الرئيسية"""
+        while True:
+            batch = await self._next()
+            try:
+                if self.linger and not batch[0].backfill:
+                    await self._collect(batch)
+                for group in pack_jobs(batch):
+                    label = ", ".join(job.tweet_id for job in group)
+                    payload = merge_payloads([job.payload for job in group])
+                    result = await self._deliver(payload, label)
+                    delivered = result is not None
+                    if len(group) > 1 and delivered:
+                        logger.info(f"تم دمج {len(group)} تغريدة في رسالة واحدة ({self.name})")
+                    if delivered and self.on_message:
+                        self.on_message(group, payload, result)
+                    for job in group:
+                        if delivered:
+                            self.on_delivered(job)
+                        elif self.on_dropped:
+                            self.on_dropped(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"خطأ غير متوقع في طابور الإرسال: {e}")
+            finally:
+                for job in batch:
+                    self.pending.discard(job.key)
+                    if not job.backfill:
+                        self.queue.task_done()
@@ -0,0 +1,123 @@
+"""
+خط معالجة السجلات دون حجب حلقة الأحداث
+السجلات تُضاف إلى طابور في الذاكرة، وخيط منفصل يكتبها على القرص مع التدوير والضغط.
+في وضع WORKERS تكتب العمليات الفرعية في طابور المشرف، فيبقى ملف سجل واحد يدوره كاتب واحد
+"""
+
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+from datetime import datetime, timezone
+from typing import Any, List, Optional
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+class JsonFormatter(logging.Formatter):
+    """سطر JSON لكل سجل (JSON Lines) لتسهيل تحليل السجلات آلياً"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+def _gzip_namer(name: str) -> str:
+    return name + ".gz"
+
+def _gzip_rotator(source: str, dest: str) -> None:
+    """ضغط الملف المدوَّر ثم حذفه (يعمل داخل خيط الكتابة وليس في حلقة الأحداث)"""
+    with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+def create_file_handler(path: str, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5,
+                        when: str = "", compress: bool = True) -> logging.Handler:
+    """ملف سجل مع تدوير حسب الحجم، أو حسب الوقت إذا حُدد when (مثل midnight أو H)"""
+    if when:
+        handler: logging.Handler = logging.handlers.TimedRotatingFileHandler(
+            path, when=when, backupCount=backup_count, encoding='utf-8', utc=True
+        )
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+        )
+    if compress:
+        handler.namer = _gzip_namer
+        handler.rotator = _gzip_rotator
+    return handler
+
+class LogPipeline:
+    """QueueHandler على الـ root logger مع QueueListener يكتب في خيط منفصل"""
+
+    def __init__(self, handlers: List[logging.Handler], log_queue: Optional[Any] = None):
+        # طابور غير محدود: الإضافة لا تنتظر أبداً حتى لو تأخر القرص
+        # (أو multiprocessing.Queue يشاركه المشرف مع العمليات الفرعية)
+        self.queue = log_queue if log_queue is not None else queue.SimpleQueue()
+        self.handler = logging.handlers.QueueHandler(self.queue)
+        self.handlers = handlers
+        self.listener = logging.handlers.QueueListener(self.queue, *handlers, respect_handler_level=True)
+
+    def start(self, level: int = logging.INFO) -> None:
+        root = logging.getLogger()
+        # إزالة المعالجات الموجودة لتجنب التكرار
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        root.addHandler(self.handler)
+        root.setLevel(level)
+        self.listener.start()
+
+    def stop(self) -> None:
+        """كتابة ما تبقى في الطابور وإغلاق الملفات"""
+        logging.getLogger().removeHandler(self.handler)
+        self.listener.stop()
+        for handler in self.handlers:
+            handler.close()
+
+_pipeline: Optional[LogPipeline] = None
+
+def start_logging(handlers: List[logging.Handler], level: int = logging.INFO,
+                  log_queue: Optional[Any] = None) -> LogPipeline:
+    """تشغيل خط السجلات (مع إيقاف السابق إن وجد)"""
+    global _pipeline
+    stop_logging()
+    _pipeline = LogPipeline(handlers, log_queue)
+    _pipeline.start(level)
+    return _pipeline
+
+class _PrefixFilter(logging.Filter):
+    """إضافة اسم العملية الفرعية لكل رسالة قبل إرسالها للمشرف"""
+
+    def __init__(self, prefix: str):
+        super().__init__()
+        self.prefix = prefix
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.msg = f"[{self.prefix}] {record.getMessage()}"
+        record.args = None
+        return True
+
+def start_worker_logging(log_queue: Any, level: int = logging.INFO, prefix: str = "") -> None:
+    """توجيه سجلات عملية فرعية إلى طابور المشرف بدلاً من الكتابة في الملفات مباشرة"""
+    handler = logging.handlers.QueueHandler(log_queue)
+    if prefix:
+        handler.addFilter(_PrefixFilter(prefix))
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+def stop_logging() -> None:
+    global _pipeline
+    if _pipeline:
+        _pipeline.stop()
+        _pipeline = None
@@ -2,18 +2,38 @@ import asyncio
 import aiohttp
 import json
 import logging
-import re
 import signal
 import sys
+import time
+from contextlib import contextmanager
+from dataclasses import replace
 from datetime import datetime, timezone
-from typing import Optional, Set, Dict, List
+from typing import Optional, Dict, List, Sequence, Set, Tuple
 from pathlib import Path
+from yarl import URL
 
 # استيراد إعدادات البوت
-from config import load_config, BotConfig
+from config import load_config, BotConfig, ConfigWatcher, diff_config
+from storage import StateStore, create_state_store
+from dedup import SortedIdSet
+from scheduler import PollScheduler
+from profiles import ProfileCache
+from ratelimit import EndpointRateLimiter, RateLimitDeferred
+from cadence import AdaptiveCadence
+from delivery import DeliveryJob, DeliveryResult, DeliveryWorker
+from outbox import Outbox
+from render import EmbedRenderer, format_numbers
+from media import MediaCache
+from refresh import MessageRefresher, message_record
+from routing import Route, Router
+import metrics
+from stream import FilteredStream
+from logpipeline import TEXT_FORMAT, JsonFormatter, create_file_handler, start_logging, stop_logging
 
 # إعداد التسجيل
-def setup_logging(log_level: str = "INFO", data_dir: str = "data"):
+def setup_logging(log_level: str = "INFO", data_dir: str = "data", max_bytes: int = 10 * 1024 * 1024,
+                  backup_count: int = 5, rotate_when: str = "", compress: bool = True, json_lines: bool = False,
+                  log_queue=None):
     """إعداد نظام التسجيل"""
     # إنشاء مجلد logs
     logs_dir = Path("logs")
@@ -22,135 +42,247 @@ def setup_logging(log_level: str = "INFO", data_dir: str = "data"):
     # تحويل مستوى التسجيل
     level = getattr(logging, log_level.upper(), logging.INFO)
     
-    # إزالة المعالجات الموجودة لتجنب التكرار
-    root_logger = logging.getLogger()
-    for handler in root_logger.handlers[:]:
-        root_logger.removeHandler(handler)
-    
-    logging.basicConfig(
-        level=level,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler('logs/bot.log', encoding='utf-8'),
-            logging.StreamHandler()
-        ],
-        force=True  # لضمان إعادة الإعداد
-    )
+    # الكتابة على القرص والشاشة تتم في خيط منفصل، وحلقة الأحداث تضيف للطابور فقط
+    file_handler = create_file_handler(str(logs_dir / "bot.log"), max_bytes, backup_count, rotate_when, compress)
+    file_handler.setFormatter(JsonFormatter() if json_lines else logging.Formatter(TEXT_FORMAT))
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    start_logging([file_handler, console_handler], level, log_queue)
 
 logger = logging.getLogger(__name__)
 
+class StartupProfile:
+    """قياس زمن مراحل التشغيل حتى بدء الفحص الدوري (run_bot.py --profile-startup)"""
+    
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self.phases: List[Tuple[str, float]] = []
+    
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - started))
+    
+    def report(self):
+        """تسجيل زمن الوصول للفحص الدوري مع تفصيل المراحل عند التفعيل"""
+        total = time.perf_counter() - self.started
+        logger.info(f"⏱️ بدء الفحص الدوري بعد {total:.2f} ثانية من التشغيل")
+        if not self.enabled:
+            return
+        for name, seconds in self.phases:
+            share = seconds / total * 100 if total else 0
+            logger.info(f"   {name:<24} {seconds * 1000:9.1f} ms  {share:5.1f}%")
+
 class TweetTracker:
-    """لتتبع التغريدات المرسلة لتجنب التكرار"""
+    """لتتبع التغريدات المرسلة لتجنب التكرار
+
+    يحتفظ في الذاكرة بآخر dedup_capacity معرف لكل حساب فقط، وأي تغريدة
+    معرفها أقل من أو يساوي الحد الأدنى (watermark) للحساب تعتبر مرسلة.
+    """
     
-    def __init__(self, data_dir: str = "data"):
+    def __init__(self, data_dir: str = "data", backend: str = "sqlite", commit_batch: int = 50,
+                 commit_interval: float = 1.0, dedup_capacity: int = 5000):
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(exist_ok=True)
-        self.file_path = self.data_dir / "sent_tweets.json"
-        self.sent_tweets: Set[str] = self._load_sent_tweets()
+        self.dedup_capacity = dedup_capacity
+        self.store: StateStore = create_state_store(backend, self.data_dir, commit_batch, commit_interval)
+        self.watermarks: Dict[str, int] = self.store.get_watermarks()
+        self.sent_ids: Dict[str, SortedIdSet] = {}
+        # مؤشر since_id لكل حساب حتى لا يعيد الفحص جلب ما سُلم للطوابير
+        self.cursors: Dict[str, int] = self.store.get_cursors()
+        logger.info(f"مخزن الحالة: {backend} ({self.store.count()} تغريدة مرسلة)")
     
-    def _load_sent_tweets(self) -> Set[str]:
-        """تحميل التغريدات المرسلة من الملف"""
-        try:
-            if Path(self.file_path).exists():
-                with open(self.file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    return set(data.get('sent_tweets', []))
-        except Exception as e:
-            logger.error(f"خطأ في تحميل التغريدات المرسلة: {e}")
-        return set()
+    def _ids_for(self, account: str) -> SortedIdSet:
+        """تحميل فهرس الحساب من المخزن عند أول استخدام"""
+        ids = self.sent_ids.get(account)
+        if ids is None:
+            recent = self.store.load_recent(account, self.dedup_capacity + 1)
+            ids = SortedIdSet(self.dedup_capacity, recent)
+            self.sent_ids[account] = ids
+            # البيانات القديمة (مثلاً بعد الترحيل من JSON) تتحول إلى حد أدنى
+            self._raise_watermark(account, ids.evict())
+        return ids
     
-    def _save_sent_tweets(self):
-        """حفظ التغريدات المرسلة في الملف"""
-        try:
-            with open(self.file_path, 'w', encoding='utf-8') as f:
-                json.dump({'sent_tweets': list(self.sent_tweets)}, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            logger.error(f"خطأ في حفظ التغريدات المرسلة: {e}")
+    def _raise_watermark(self, account: str, tweet_id: Optional[int]):
+        """رفع الحد الأدنى للحساب بعد حذف معرفات قديمة من الذاكرة"""
+        if tweet_id is None or tweet_id <= self.watermarks.get(account, 0):
+            return
+        self.watermarks[account] = tweet_id
+        self.store.set_watermark(account, tweet_id)
     
-    def is_sent(self, tweet_id: str) -> bool:
+    def is_sent(self, tweet_id: str, account: str = "") -> bool:
         """التحقق من إرسال التغريدة مسبقاً"""
-        return tweet_id in self.sent_tweets
+        key = int(tweet_id)
+        if key <= self.watermarks.get(account, 0) or key in self._ids_for(account):
+            return True
+        # السجلات المرحّلة من الإصدارات القديمة غير مرتبطة بحساب، وما حُذف منها بعد
+        # تجاوز DEDUP_CAPACITY أصبح حداً أدنى للحساب ""
+        return bool(account) and (key <= self.watermarks.get("", 0) or key in self._ids_for(""))
     
-    def mark_as_sent(self, tweet_id: str):
+    def mark_as_sent(self, tweet_id: str, account: str = ""):
         """تحديد التغريدة كمرسلة"""
-        self.sent_tweets.add(tweet_id)
-        self._save_sent_tweets()
+        self.store.add(tweet_id, account)
+        self._raise_watermark(account, self._ids_for(account).add(int(tweet_id)))
+    
+    def forget(self, account: str):
+        """إسقاط حالة الحساب من الذاكرة لتُقرأ من المخزن من جديد (بعد أن عالجته عملية أخرى)"""
+        self.sent_ids.pop(account, None)
+        for state, stored in ((self.watermarks, self.store.get_watermarks()), (self.cursors, self.store.get_cursors())):
+            if account in stored:
+                state[account] = stored[account]
+            else:
+                state.pop(account, None)
+    
+    def last_seen(self, account: str) -> Optional[int]:
+        """أحدث تغريدة مرسلة للحساب من الحالة المحفوظة (None إذا لم يُرسل له شيء)"""
+        latest = max(self.watermarks.get(account, 0), self._ids_for(account).max())
+        return latest or None
+    
+    def cursor(self, account: str) -> Optional[int]:
+        """آخر تغريدة جُلبت للحساب وسُلمت لطوابير الإرسال"""
+        return self.cursors.get(account)
+    
+    def advance_cursor(self, account: str, tweet_id: int):
+        """تقديم المؤشر (لا يتراجع هنا)"""
+        if tweet_id <= self.cursors.get(account, 0):
+            return
+        self.cursors[account] = tweet_id
+        self.store.set_cursor(account, tweet_id)
+    
+    def rewind_cursor(self, account: str, tweet_id: int):
+        """إرجاع المؤشر قبل تغريدة فشل إرسالها لتُجلب مجدداً في الفحص التالي"""
+        cursor = self.cursors.get(account)
+        if cursor is None or tweet_id > cursor:
+            return
+        self.cursors[account] = tweet_id - 1
+        self.store.set_cursor(account, tweet_id - 1)
+    
+    def size(self) -> int:
+        """عدد المعرفات المحفوظة في الذاكرة"""
+        return sum(len(ids) for ids in self.sent_ids.values())
+    
+    def flush(self):
+        """حفظ التغريدات المعلقة على القرص"""
+        self.store.flush()
+    
+    def close(self):
+        """حفظ التغريدات المعلقة وإغلاق المخزن"""
+        self.store.close()
 
 class TwitterAPI:
     """للتعامل مع Twitter API"""
     
-    def __init__(self, bearer_token: str):
+    # مفاتيح حدود المعدل لكل endpoint (الحد في تويتر لكل قالب وليس لكل مستخدم)
+    USERS_ENDPOINT = "users/by"
+    TIMELINE_ENDPOINT = "users/:id/tweets"
+    SEARCH_ENDPOINT = "tweets/search/recent"
+    LOOKUP_ENDPOINT = "tweets"
+    
+    def __init__(self, bearer_token: str, session: Optional[aiohttp.ClientSession] = None,
+                 base_url: str = "https://api.twitter.com/2"):
         self.bearer_token = bearer_token
-        self.base_url = "https://api.twitter.com/2"
+        self.base_url = base_url.rstrip('/')
         self.headers = {
             "Authorization": f"Bearer {bearer_token}",
             "Content-Type": "application/json"
         }
+        # الجلسة المشتركة يملكها البوت ويغلقها عند الإيقاف
+        self.session = session
         self.rate_limit_remaining = None
         self.rate_limit_reset = None
+        self.rate_limiter = EndpointRateLimiter()
     
-    async def handle_rate_limit(self, response_headers: dict = None):
-        """معالجة تجاوز الحد المسموح"""
-        wait_time = 900  # افتراضي 15 دقيقة
+    async def warm_up(self):
+        """فتح اتصال TCP+TLS مسبقاً قبل الفحص ليبقى جاهزاً في المجمع"""
+        try:
+            async with self.session.head(self.base_url, allow_redirects=False) as response:
+                await response.read()
+            logger.debug("تم تجهيز الاتصال بـ Twitter API مسبقاً")
+        except Exception as e:
+            logger.debug(f"فشل تجهيز الاتصال مسبقاً: {e}")
+    
+    def handle_rate_limit(self, endpoint: str, response_headers: dict = None) -> float:
+        """معالجة تجاوز الحد: تأجيل هذا الـ endpoint فقط دون إيقاف البوت"""
+        wait_time = self.rate_limiter.on_429(endpoint, response_headers or {})
+        remaining = (response_headers or {}).get('x-rate-limit-remaining', '0')
+        logger.warning(f"Rate Limit على {endpoint} - المتبقي: {remaining}، "
+                       f"سيتم تأجيل طلباته {wait_time/60:.1f} دقيقة")
+        return wait_time
+    
+    def _track_rate_limit(self, endpoint: str, response: aiohttp.ClientResponse):
+        """تحديث معلومات Rate Limit من ترويسات الاستجابة"""
+        self.rate_limit_remaining = response.headers.get('x-rate-limit-remaining')
+        self.rate_limit_reset = response.headers.get('x-rate-limit-reset')
+        self.rate_limiter.update(endpoint, response.headers)
+    
+    async def get_users_info(self, usernames: List[str]) -> Dict[str, Dict]:
+        """الحصول على معلومات عدة مستخدمين بطلب واحد لكل 100 حساب
+
+        النتيجة قاموس مفتاحه اسم المستخدم بأحرف صغيرة.
+        """
+        url = f"{self.base_url}/users/by"
+        users: Dict[str, Dict] = {}
         
-        if response_headers:
-            # محاولة الحصول على وقت إعادة التجديد من headers
-            reset_time = response_headers.get('x-rate-limit-reset')
-            remaining = response_headers.get('x-rate-limit-remaining', '0')
-            
-            logger.warning(f"Rate Limit - المتبقي: {remaining}")
+        for start in range(0, len(usernames), 100):
+            chunk = usernames[start:start + 100]
+            params = {
+                "usernames": ",".join(chunk),
+                "user.fields": "id,name,username,description,profile_image_url,verified,public_metrics"
+            }
             
-            if reset_time:
-                try:
-                    reset_timestamp = int(reset_time)
-                    current_time = datetime.now().timestamp()
-                    wait_time = max(reset_timestamp - current_time + 60, 900)  # إضافة دقيقة أمان
-                except (ValueError, TypeError):
-                    pass
-        
-        logger.warning(f"سيتم الانتظار {wait_time/60:.1f} دقيقة حتى إعادة التجديد")
-        await asyncio.sleep(wait_time)
-    
-    async def get_user_info(self, username: str) -> Optional[Dict]:
-        """الحصول على معلومات المستخدم الكاملة"""
-        url = f"{self.base_url}/users/by/username/{username}"
-        params = {
-            "user.fields": "id,name,username,description,profile_image_url,verified,public_metrics"
-        }
-        
-        max_retries = 2  # تقليل عدد المحاولات
-        for attempt in range(max_retries):
-            async with aiohttp.ClientSession() as session:
+            max_retries = 2  # تقليل عدد المحاولات
+            for attempt in range(max_retries):
                 try:
-                    async with session.get(url, headers=self.headers, params=params) as response:
+                    await self.rate_limiter.acquire(self.USERS_ENDPOINT)
+                    async with self.session.get(url, headers=self.headers, params=params) as response:
                         # تحديث معلومات Rate Limit
-                        self.rate_limit_remaining = response.headers.get('x-rate-limit-remaining')
+                        self._track_rate_limit(self.USERS_ENDPOINT, response)
                         
                         if response.status == 200:
                             data = await response.json()
-                            return data['data']
+                            for user in data.get('data', []):
+                                users[user['username'].lower()] = user
+                            for error in data.get('errors', []):
+                                logger.error(f"تعذر العثور على الحساب {error.get('value')}: {error.get('detail')}")
+                            break
                         elif response.status == 429:
-                            if attempt < max_retries - 1:
-                                logger.warning(f"Rate limit في الحصول على معلومات المستخدم")
-                                await self.handle_rate_limit(dict(response.headers))
-                                continue
-                            else:
-                                logger.error("تجاوز الحد الأقصى للمحاولات - معلومات المستخدم")
-                                return None
+                            # الحسابات المتبقية ستُجلب لاحقاً عند التحديث في الخلفية
+                            logger.warning("Rate limit في الحصول على معلومات المستخدمين")
+                            self.handle_rate_limit(self.USERS_ENDPOINT, dict(response.headers))
+                            return users
                         else:
-                            logger.error(f"خطأ في الحصول على معلومات المستخدم: {response.status}")
+                            logger.error(f"خطأ في الحصول على معلومات المستخدمين: {response.status}")
                             error_text = await response.text()
                             logger.error(f"تفاصيل الخطأ: {error_text}")
-                            return None
+                            break
+                except RateLimitDeferred as e:
+                    # الحسابات المتبقية ستُجلب لاحقاً عند التحديث في الخلفية
+                    logger.info(f"تأجيل جلب معلومات {len(usernames) - start} حساب: {e}")
+                    return users
                 except Exception as e:
                     logger.error(f"خطأ في الاتصال بـ Twitter API: {e}")
                     if attempt < max_retries - 1:
                         await asyncio.sleep(30)
                         continue
-                    return None
+        
+        return users
     
     async def get_recent_tweets(self, user_id: str, max_results: int = 10) -> tuple[list, dict]:
         """الحصول على التغريدات الحديثة للمستخدم مع الميديا"""
+        tweets, media_info, _ = await self.get_timeline_page(user_id, max_results)
+        return tweets, media_info
+    
+    async def get_timeline_page(self, user_id: str, max_results: int = 10, pagination_token: Optional[str] = None,
+                                since_id: Optional[int] = None) -> tuple[list, dict, dict]:
+        """صفحة واحدة من تغريدات المستخدم مع meta (next_token و oldest_id) لمتابعة الصفحات الأقدم
+
+        مع since_id تُرجع التغريدات الأحدث منه فقط، و next_token يعني وجود المزيد
+        منها بعد هذه الصفحة. meta فارغ عند فشل الطلب.
+        """
         # التأكد من أن max_results بين 5 و 100
         max_results = max(5, min(max_results, 100))
         
@@ -158,320 +290,960 @@ class TwitterAPI:
         params = {
             "max_results": max_results,
             "tweet.fields": "created_at,text,public_metrics,attachments,in_reply_to_user_id,context_annotations,entities",
-            "media.fields": "url,type,preview_image_url,width,height,alt_text",
+            "media.fields": "url,type,preview_image_url,width,height,alt_text,variants",
             "expansions": "attachments.media_keys",
             "exclude": "replies,retweets"
         }
+        if pagination_token:
+            params["pagination_token"] = pagination_token
+        if since_id:
+            params["since_id"] = str(since_id)
         
         # محاولة واحدة فقط لتوفير API calls
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.get(url, headers=self.headers, params=params) as response:
-                    # تحديث معلومات Rate Limit
-                    self.rate_limit_remaining = response.headers.get('x-rate-limit-remaining')
+        try:
+            await self.rate_limiter.acquire(self.TIMELINE_ENDPOINT)
+            async with self.session.get(url, headers=self.headers, params=params) as response:
+                # تحديث معلومات Rate Limit
+                self._track_rate_limit(self.TIMELINE_ENDPOINT, response)
+                
+                if response.status == 200:
+                    data = await response.json()
+                    tweets = data.get('data', [])
+                    media_info = {}
                     
-                    if response.status == 200:
-                        data = await response.json()
-                        tweets = data.get('data', [])
-                        media_info = {}
-                        
-                        # معالجة معلومات الميديا
-                        if 'includes' in data and 'media' in data['includes']:
-                            for media in data['includes']['media']:
-                                media_info[media['media_key']] = media
-                        
-                        # فلترة الردود والريتويت
-                        filtered_tweets = []
-                        for tweet in tweets:
-                            if not tweet.get('in_reply_to_user_id'):
-                                text = tweet.get('text', '')
-                                if not text.startswith('@') and not text.startswith('RT @'):
-                                    filtered_tweets.append(tweet)
-                        
-                        logger.debug(f"تم جلب {len(filtered_tweets)} تغريدة، Rate limit متبقي: {self.rate_limit_remaining}")
-                        return filtered_tweets, media_info
-                        
-                    elif response.status == 429:
-                        logger.warning("Rate limit عند جلب التغريدات")
-                        await self.handle_rate_limit(dict(response.headers))
-                        return [], {}
-                        
-                    else:
-                        logger.error(f"خطأ في الحصول على التغريدات: {response.status}")
-                        error_text = await response.text()
-                        logger.error(f"تفاصيل الخطأ: {error_text}")
-                        return [], {}
-                        
-            except Exception as e:
-                logger.error(f"خطأ في الاتصال بـ Twitter API: {e}")
-                return [], {}
+                    # معالجة معلومات الميديا
+                    if 'includes' in data and 'media' in data['includes']:
+                        for media in data['includes']['media']:
+                            media_info[media['media_key']] = media
+                    
+                    # فلترة الردود والريتويت
+                    filtered_tweets = self._filter_original_tweets(tweets)
+                    
+                    logger.debug(f"تم جلب {len(filtered_tweets)} تغريدة، Rate limit متبقي: {self.rate_limit_remaining}")
+                    # meta يصف الصفحة قبل الفلترة، لذلك يُستخدم لمعرفة حدودها
+                    return filtered_tweets, media_info, data.get('meta', {})
+                    
+                elif response.status == 429:
+                    logger.warning("Rate limit عند جلب التغريدات")
+                    self.handle_rate_limit(self.TIMELINE_ENDPOINT, dict(response.headers))
+                    return [], {}, {}
+                    
+                else:
+                    logger.error(f"خطأ في الحصول على التغريدات: {response.status}")
+                    error_text = await response.text()
+                    logger.error(f"تفاصيل الخطأ: {error_text}")
+                    return [], {}, {}
+                    
+        except RateLimitDeferred as e:
+            logger.debug(f"تأجيل جلب التغريدات: {e}")
+            return [], {}, {}
+        except Exception as e:
+            logger.error(f"خطأ في الاتصال بـ Twitter API: {e}")
+            return [], {}, {}
 
-class DiscordWebhook:
-    """للتعامل مع Discord Webhook"""
-    
-    def __init__(self, webhook_url: str, mention_everyone: bool = True):
-        self.webhook_url = webhook_url
-        self.mention_everyone = mention_everyone
-    
-    def _format_numbers(self, num: int) -> str:
-        """تنسيق الأرقام بشكل جميل"""
-        if num >= 1000000:
-            return f"{num/1000000:.1f}M"
-        elif num >= 1000:
-            return f"{num/1000:.1f}K"
-        return str(num)
+    @staticmethod
+    def _filter_original_tweets(tweets: List[Dict]) -> List[Dict]:
+        """استبعاد الردود والريتويت"""
+        filtered_tweets = []
+        for tweet in tweets:
+            if not tweet.get('in_reply_to_user_id'):
+                text = tweet.get('text', '')
+                if not text.startswith('@') and not text.startswith('RT @'):
+                    filtered_tweets.append(tweet)
+        return filtered_tweets
     
-    def _format_timestamp(self, created_at: str) -> str:
-        """تنسيق الوقت"""
-        try:
-            dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-            return dt.strftime("%Y-%m-%d %H:%M:%S UTC")
-        except:
-            return created_at
+    @staticmethod
+    def build_search_queries(usernames: List[str], max_length: int = 512) -> List[List[str]]:
+        """تقسيم الحسابات إلى مجموعات يتسع كل منها في استعلام بحث واحد"""
+        chunks: List[List[str]] = []
+        current: List[str] = []
+        for username in usernames:
+            candidate = current + [username]
+            if current and len(TwitterAPI.search_query(candidate)) > max_length:
+                chunks.append(current)
+                candidate = [username]
+            current = candidate
+        if current:
+            chunks.append(current)
+        return chunks
     
-    def _clean_tweet_text(self, text: str, max_length: int = 2000) -> str:
-        """تنظيف نص التغريدة من الروابط القصيرة"""
-        # إزالة روابط t.co
-        text = re.sub(r'https://t\.co/\w+', '', text)
-        # إزالة المسافات الإضافية
-        text = re.sub(r'\s+', ' ', text).strip()
-        # قطع النص إذا كان طويلاً
-        if len(text) > max_length:
-            text = text[:max_length-3] + "..."
-        return text
+    @staticmethod
+    def search_query(usernames: List[str]) -> str:
+        """بناء استعلام from:a OR from:b مع استبعاد الردود والريتويت"""
+        return f"({' OR '.join(f'from:{username}' for username in usernames)}) -is:reply -is:retweet"
     
-    def _extract_hashtags_and_mentions(self, tweet_data: dict) -> tuple[List[str], List[str]]:
-        """استخراج الهاشتاغات والمنشن"""
-        hashtags = []
-        mentions = []
-        
-        entities = tweet_data.get('entities', {})
+    async def search_recent_tweets(self, usernames: List[str], max_results: int = 100) -> Dict[str, tuple]:
+        """جلب تغريدات عدة حسابات باستعلام بحث واحد وتوزيعها حسب الحساب
+
+        النتيجة قاموس: اسم المستخدم بأحرف صغيرة -> (التغريدات, معلومات الميديا)
+        """
+        # التأكد من أن max_results بين 10 و 100
+        max_results = max(10, min(max_results, 100))
         
-        if 'hashtags' in entities:
-            hashtags = [f"#{tag['tag']}" for tag in entities['hashtags']]
+        url = f"{self.base_url}/tweets/search/recent"
+        params = {
+            "query": self.search_query(usernames),
+            "max_results": max_results,
+            "tweet.fields": "created_at,text,public_metrics,attachments,in_reply_to_user_id,context_annotations,entities,author_id",
+            "media.fields": "url,type,preview_image_url,width,height,alt_text,variants",
+            "user.fields": "username",
+            "expansions": "author_id,attachments.media_keys"
+        }
         
-        if 'mentions' in entities:
-            mentions = [f"@{mention['username']}" for mention in entities['mentions']]
+        try:
+            await self.rate_limiter.acquire(self.SEARCH_ENDPOINT)
+            async with self.session.get(url, headers=self.headers, params=params) as response:
+                # تحديث معلومات Rate Limit
+                self._track_rate_limit(self.SEARCH_ENDPOINT, response)
+                
+                if response.status == 200:
+                    data = await response.json()
+                    includes = data.get('includes', {})
+                    media_info = {media['media_key']: media for media in includes.get('media', [])}
+                    authors = {user['id']: user['username'].lower() for user in includes.get('users', [])}
+                    
+                    # توزيع النتائج على الحسابات حسب author_id
+                    results: Dict[str, tuple] = {}
+                    for tweet in self._filter_original_tweets(data.get('data', [])):
+                        username = authors.get(tweet.get('author_id'))
+                        if not username:
+                            continue
+                        tweets, _ = results.setdefault(username, ([], media_info))
+                        tweets.append(tweet)
+                    
+                    logger.debug(f"بحث {len(usernames)} حساب: {sum(len(t) for t, _ in results.values())} تغريدة، Rate limit متبقي: {self.rate_limit_remaining}")
+                    return results
+                    
+                elif response.status == 429:
+                    logger.warning("Rate limit عند البحث عن التغريدات")
+                    self.handle_rate_limit(self.SEARCH_ENDPOINT, dict(response.headers))
+                    return {}
+                    
+                else:
+                    logger.error(f"خطأ في البحث عن التغريدات: {response.status}")
+                    error_text = await response.text()
+                    logger.error(f"تفاصيل الخطأ: {error_text}")
+                    return {}
+                    
+        except RateLimitDeferred as e:
+            logger.debug(f"تأجيل البحث عن التغريدات: {e}")
+            return {}
+        except Exception as e:
+            logger.error(f"خطأ في الاتصال بـ Twitter API: {e}")
+            return {}
+
+    async def lookup_tweets(self, ids: List[str]) -> Optional[Tuple[Dict[str, Dict], Set[str]]]:
+        """جلب حتى 100 تغريدة بطلب واحد: (التغريدات الموجودة حسب المعرف، معرفات المحذوفة)
+
+        None عند فشل الطلب، حتى لا تُعتبر التغريدات محذوفة بسبب خطأ مؤقت.
+        """
+        url = f"{self.base_url}/tweets"
+        params = {
+            "ids": ",".join(ids[:100]),
+            "tweet.fields": "public_metrics"
+        }
         
-        return hashtags, mentions
+        try:
+            await self.rate_limiter.acquire(self.LOOKUP_ENDPOINT)
+            async with self.session.get(url, headers=self.headers, params=params) as response:
+                self._track_rate_limit(self.LOOKUP_ENDPOINT, response)
+                
+                if response.status == 200:
+                    data = await response.json()
+                    found = {tweet['id']: tweet for tweet in data.get('data', [])}
+                    # التغريدات المحذوفة تصل كأخطاء resource-not-found، أما الحسابات
+                    # المعلقة أو المحمية فتصل بنوع آخر ولا تُحذف رسائلها
+                    deleted = {
+                        error.get('resource_id') or error.get('value') for error in data.get('errors', [])
+                        if error.get('type', '').endswith('/resource-not-found')
+                    }
+                    return found, deleted - {None}
+                    
+                elif response.status == 429:
+                    logger.warning("Rate limit عند تحديث التغريدات المرسلة")
+                    self.handle_rate_limit(self.LOOKUP_ENDPOINT, dict(response.headers))
+                    return None
+                    
+                else:
+                    logger.error(f"خطأ في تحديث التغريدات المرسلة: {response.status}")
+                    return None
+                    
+        except RateLimitDeferred as e:
+            logger.info(f"تأجيل تحديث التغريدات المرسلة: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"خطأ في الاتصال بـ Twitter API: {e}")
+            return None
+
+def webhook_id(url: str) -> str:
+    """معرف الـ webhook من الرابط (يُستخدم في السجلات ومفاتيح التتبع)"""
+    parts = url.rstrip('/').split('/webhooks/')
+    return parts[1].split('/')[0] if len(parts) > 1 else url
+
+class DiscordWebhook:
+    """للتعامل مع Discord Webhook"""
+    
+    def __init__(self, webhook_url: str, mention_everyone: bool = True, session: Optional[aiohttp.ClientSession] = None,
+                 media_cache: Optional[MediaCache] = None):
+        self.webhook_url = webhook_url
+        self.mention_everyone = mention_everyone
+        self.session = session
+        self.media_cache = media_cache
+        self.renderer = EmbedRenderer(mention_everyone, upload_media=media_cache is not None)
+    
+    @property
+    def webhook_id(self) -> str:
+        """معرف الـ webhook من الرابط"""
+        return webhook_id(self.webhook_url)
     
     def _create_embed(self, tweet_data: dict, username: str, user_info: dict, media_info: dict, max_length: int = 2000, is_startup: bool = False) -> dict:
         """إنشاء embed احترافي للتغريدة"""
-        tweet_text = self._clean_tweet_text(tweet_data.get('text', ''), max_length)
-        tweet_id = tweet_data['id']
-        tweet_url = f"https://twitter.com/{username}/status/{tweet_id}"
-        created_at = tweet_data.get('created_at', '')
-        metrics = tweet_data.get('public_metrics', {})
-        
-        # استخراج الهاشتاغات والمنشن
-        hashtags, mentions = self._extract_hashtags_and_mentions(tweet_data)
-        
-        # إنشاء الـ embed الأساسي
-        embed_title = "🎯 فحص أولي - تغريدة" if is_startup else "🐦 تغريدة جديدة"
-        embed_color = 0x00FF00 if is_startup else 0x1DA1F2
-        
-        embed = {
-            "title": embed_title,
-            "description": tweet_text[:2000] if tweet_text else "_بدون نص_",
-            "url": tweet_url,
-            "color": embed_color,
-            "timestamp": created_at,
-            "author": {
-                "name": f"{user_info.get('name', username)} (@{username})",
-                "url": f"https://twitter.com/{username}",
-                "icon_url": user_info.get('profile_image_url', '').replace('_normal', '_400x400') if user_info.get('profile_image_url') else None
-            },
-            "footer": {
-                "text": f"Twitter • {self._format_timestamp(created_at)}",
-                "icon_url": "https://abs.twimg.com/icons/apple-touch-icon-192x192.png"
-            },
-            "fields": []
-        }
-        
-        # إضافة الإحصائيات
-        if metrics:
-            stats_text = []
-            if metrics.get('like_count', 0) > 0:
-                stats_text.append(f"❤️ {self._format_numbers(metrics['like_count'])}")
-            if metrics.get('retweet_count', 0) > 0:
-                stats_text.append(f"🔄 {self._format_numbers(metrics['retweet_count'])}")
-            if metrics.get('reply_count', 0) > 0:
-                stats_text.append(f"💬 {self._format_numbers(metrics['reply_count'])}")
-            
-            if stats_text:
-                embed["fields"].append({
-                    "name": "📊 الإحصائيات",
-                    "value": " • ".join(stats_text),
-                    "inline": True
-                })
-        
-        # إضافة الهاشتاغات إذا وُجدت
-        if hashtags and len(hashtags) <= 5:
-            hashtags_text = " ".join(hashtags[:5])
-            embed["fields"].append({
-                "name": "🏷️ الهاشتاغات",
-                "value": hashtags_text,
-                "inline": True
-            })
-        
-        # معالجة الميديا المرفقة
-        if 'attachments' in tweet_data and 'media_keys' in tweet_data['attachments']:
-            media_keys = tweet_data['attachments']['media_keys']
-            
-            for i, media_key in enumerate(media_keys):
-                if media_key in media_info:
-                    media = media_info[media_key]
-                    media_type = media.get('type', '')
-                    
-                    if media_type == 'photo' and i == 0:
-                        # استخدام أول صورة كـ main image
-                        embed["image"] = {"url": media.get('url', '')}
-                    elif media_type == 'video' and i == 0:
-                        # للفيديو: استخدام preview image
-                        if media.get('preview_image_url'):
-                            embed["image"] = {"url": media['preview_image_url']}
-        
-        return embed
+        return self.renderer.create_embed(tweet_data, username, user_info, media_info, max_length, is_startup)
     
-    def _format_tweet_message(self, tweet_data: dict, username: str, user_info: dict, media_info: dict, max_length: int = 2000, is_startup: bool = False) -> dict:
+    def _format_tweet_message(self, tweet_data: dict, username: str, user_info: dict, media_info: dict, max_length: int = 2000, is_startup: bool = False,
+                              roles: Sequence[str] = ()) -> dict:
         """تنسيق رسالة التغريدة لديسكورد"""
-        tweet_id = tweet_data['id']
-        tweet_url = f"https://twitter.com/{username}/status/{tweet_id}"
+        return self.renderer.render_message(tweet_data, username, user_info, media_info, max_length, is_startup, roles)
+    
+    @staticmethod
+    def _header_float(headers, name: str) -> Optional[float]:
+        try:
+            value = headers.get(name)
+            return float(value) if value is not None else None
+        except (TypeError, ValueError):
+            return None
+    
+    async def deliver(self, message_data: dict) -> DeliveryResult:
+        """إرسال رسالة جاهزة مرة واحدة وإرجاع حالة حد Discord من الترويسات"""
+        started = time.monotonic()
+        result = await self._deliver(message_data)
+        metrics.DISCORD_SEND_SECONDS.observe(time.monotonic() - started, self.webhook_id)
+        metrics.DISCORD_RESPONSES.inc(self.webhook_id, result.status or "error")
+        return result
+    
+    async def _prepare_files(self, message_data: dict) -> Tuple[dict, list]:
+        """تنزيل الميديا (أو أخذها من الذاكرة المؤقتة) وربط الـ embeds بالمرفقات
         
-        # إنشاء المحتوى الرئيسي
-        display_name = user_info.get('name', username) if user_info else username
-        verified_badge = " ✅" if user_info and user_info.get('verified') else ""
+        ما يتعذر تنزيله أو يتجاوز حد الحجم يبقى كرابط تويتر في الـ embed.
+        """
+        body = {key: value for key, value in message_data.items() if key != 'media'}
+        media = message_data.get('media') or []
+        if not media or not self.media_cache:
+            return body, []
         
-        content_parts = []
+        paths = await asyncio.gather(*(self.media_cache.first(item['urls']) for item in media))
+        files, attachments, images = [], [], {}
+        budget = self.media_cache.max_file_size
+        for item, path in zip(media, paths):
+            if path is None:
+                continue
+            try:
+                size = path.stat().st_size
+                if size > budget:
+                    continue
+                handle = open(path, 'rb')
+            except OSError:
+                # حُذف من الذاكرة المؤقتة بين التنزيل والفتح
+                continue
+            budget -= size
+            attachments.append({"id": len(files), "filename": item['filename'], "description": item.get('description')})
+            files.append((item['filename'], handle))
+            if item['type'] == 'photo':
+                images[item['urls'][0]] = f"attachment://{item['filename']}"
+            elif item.get('preview'):
+                # الفيديو المرفق يُعرض بنفسه، فلا داعي لصورة المعاينة في الـ embed
+                images[item['preview']] = None
         
-        if is_startup:
-            content_parts.append("🎯 **فحص أولي للبوت**")
+        if files:
+            embeds = []
+            for embed in body.get('embeds', []):
+                url = (embed.get('image') or {}).get('url')
+                if url in images:
+                    embed = dict(embed)
+                    if images[url]:
+                        embed['image'] = {"url": images[url]}
+                    else:
+                        del embed['image']
+                embeds.append(embed)
+            body['embeds'] = embeds
+            body['attachments'] = attachments
+        return body, files
+    
+    async def _deliver(self, message_data: dict) -> DeliveryResult:
+        """طلب POST واحد إلى الـ webhook (multipart عند رفع الميديا)"""
+        body, files = await self._prepare_files(message_data)
+        if files:
+            # aiohttp يقرأ الملفات ويرسلها على دفعات دون تحميلها كاملة في الذاكرة
+            form = aiohttp.FormData()
+            form.add_field('payload_json', json.dumps(body), content_type='application/json')
+            for index, (filename, handle) in enumerate(files):
+                form.add_field(f'files[{index}]', handle, filename=filename)
+            request = self.session.post(self.webhook_url, data=form, params={'wait': 'true'})
         else:
-            if self.mention_everyone:
-                content_parts.append("@everyone")
-            content_parts.append(f"**{display_name}**{verified_badge} غرد للتو!")
-        
-        content_parts.append(f"🔗 **[اقرأ التغريدة الكاملة]({tweet_url})**")
-        content = "\n".join(content_parts)
-        
-        # إنشاء الـ embed
-        embed = self._create_embed(tweet_data, username, user_info, media_info, max_length, is_startup)
-        
-        return {
-            "content": content,
-            "embeds": [embed],
-            "allowed_mentions": {
-                "everyone": self.mention_everyone and not is_startup
-            }
-        }
+            # wait=true يجعل Discord يرجع الرسالة بمعرفها لتعديلها لاحقاً
+            request = self.session.post(self.webhook_url, json=body, params={'wait': 'true'})
+        try:
+            async with request as response:
+                return await self._result(response)
+        except Exception as e:
+            return DeliveryResult(ok=False, error=str(e) or type(e).__name__)
+        finally:
+            for _, handle in files:
+                handle.close()
     
-    async def send_tweet(self, tweet_data: dict, username: str, user_info: dict, media_info: dict, max_length: int = 2000, is_startup: bool = False) -> bool:
-        """إرسال التغريدة إلى ديسكورد"""
+    async def _result(self, response: aiohttp.ClientResponse) -> DeliveryResult:
+        """حالة الطلب وحد Discord من الترويسات، والرسالة المرجعة عند النجاح"""
+        remaining = self._header_float(response.headers, 'X-RateLimit-Remaining')
+        result = DeliveryResult(
+            ok=response.status in [200, 204],
+            status=response.status,
+            remaining=int(remaining) if remaining is not None else None,
+            reset_after=self._header_float(response.headers, 'X-RateLimit-Reset-After')
+        )
+        if response.status == 200:
+            try:
+                result.message = await response.json(content_type=None)
+            except Exception:
+                pass
+        elif response.status == 429:
+            # retry_after في جسم الاستجابة أدق من ترويسة Retry-After
+            try:
+                body = await response.json(content_type=None)
+                result.retry_after = float(body.get('retry_after'))
+            except Exception:
+                result.retry_after = self._header_float(response.headers, 'Retry-After')
+        elif not result.ok:
+            result.error = await response.text()
+        return result
+    
+    def _message_url(self, message_id: str) -> URL:
+        """رابط رسالة أرسلها الـ webhook مع الإبقاء على معاملات الرابط (مثل thread_id)"""
+        url = URL(self.webhook_url)
+        return url.with_path(f"{url.path.rstrip('/')}/messages/{message_id}").with_query(url.query)
+    
+    async def edit_message(self, message_id: str, body: dict) -> DeliveryResult:
+        """تعديل رسالة أرسلها هذا الـ webhook"""
         try:
-            message_data = self._format_tweet_message(tweet_data, username, user_info, media_info, max_length, is_startup)
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(self.webhook_url, json=message_data) as response:
-                    if response.status in [200, 204]:
-                        tweet_type = "فحص أولي" if is_startup else "تغريدة"
-                        logger.info(f"تم إرسال {tweet_type} {tweet_data['id']} بنجاح")
-                        return True
-                    elif response.status == 429:
-                        logger.warning("Rate limit في Discord webhook")
-                        await asyncio.sleep(5)
-                        return False
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"خطأ في إرسال التغريدة: {response.status} - {error_text}")
-                        return False
+            async with self.session.patch(self._message_url(message_id), json=body) as response:
+                return await self._result(response)
         except Exception as e:
-            logger.error(f"خطأ في إرسال الرسالة: {e}")
-            return False
+            return DeliveryResult(ok=False, error=str(e) or type(e).__name__)
+    
+    async def delete_message(self, message_id: str) -> DeliveryResult:
+        """حذف رسالة أرسلها هذا الـ webhook"""
+        try:
+            async with self.session.delete(self._message_url(message_id)) as response:
+                return await self._result(response)
+        except Exception as e:
+            return DeliveryResult(ok=False, error=str(e) or type(e).__name__)
+    
+    async def validate(self) -> bool:
+        """التحقق من صلاحية الـ webhook بطلب GET دون إرسال رسالة"""
+        try:
+            async with self.session.get(self.webhook_url) as response:
+                # 401/404 تعني رابطاً خاطئاً أو محذوفاً، أما غيرها فيُترك للإرسال الفعلي
+                if response.status in (401, 403, 404):
+                    logger.error(f"الـ webhook {self.webhook_id} غير صالح (HTTP {response.status})")
+                    return False
+                if response.status != 200:
+                    logger.warning(f"تعذر التحقق من الـ webhook {self.webhook_id} (HTTP {response.status})")
+                return True
+        except Exception as e:
+            logger.warning(f"تعذر التحقق من الـ webhook {self.webhook_id}: {e}")
+            return True
 
 class TwitterDiscordBot:
     """البوت الرئيسي"""
     
-    def __init__(self, config: BotConfig):
+    def __init__(self, config: BotConfig, worker_index: Optional[int] = None):
         self.config = config
-        self.twitter_api = TwitterAPI(config.twitter_bearer_token)
-        self.discord_webhook = DiscordWebhook(config.discord_webhook_url, config.mention_everyone)
-        self.tweet_tracker = TweetTracker(config.data_dir)
-        self.user_info: Optional[Dict] = None
+        # رقم العملية في وضع WORKERS: ملفاتها الخاصة (صندوق الصادر والفترات المتكيفة)
+        # في مجلد مستقل، أما مخزن التتبع فمشترك بين كل العمليات
+        self.worker_index = worker_index
+        self.worker_dir = Path(config.data_dir)
+        if worker_index is not None:
+            self.worker_dir = self.worker_dir / f"worker-{worker_index}"
+            self.worker_dir.mkdir(parents=True, exist_ok=True)
+        self.twitter_api = TwitterAPI(config.twitter_bearer_token, base_url=config.twitter_api_base_url)
+        self.tweet_tracker = TweetTracker(
+            config.data_dir,
+            config.state_backend,
+            config.state_commit_batch,
+            config.state_commit_interval,
+            config.dedup_capacity
+        )
+        # الرسائل المنتظرة تُحفظ على القرص حتى لا تضيع عند توقف البوت
+        self.outbox = Outbox(str(self.worker_dir), config.state_commit_batch, config.state_commit_interval)
+        # معلومات كل حساب مراقب حسب اسم المستخدم
+        self.user_infos: Dict[str, Dict] = {}
+        self.profile_cache = ProfileCache(config.data_dir, config.profile_cache_ttl)
+        self.profile_refresh_task: Optional[asyncio.Task] = None
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.scheduler: Optional[PollScheduler] = None
+        # مجموعات الحسابات في وضع البحث: مفتاح المجموعة -> أسماء الحسابات
+        self.search_chunks: Dict[str, List[str]] = {}
+        # في وضع stream يبقى الفحص الدوري احتياطياً ويعمل فقط أثناء انقطاع الاتصال
+        self.stream: Optional[FilteredStream] = None
+        self._catch_up: Set[str] = set()
+        # تغريدات أُعيد المؤشر من أجلها بعد فشل إرسالها
+        self._rewound: Set[Tuple[str, str]] = set()
+        self.cadence: Optional[AdaptiveCadence] = None
+        if config.adaptive_polling:
+            self.cadence = AdaptiveCadence(
+                config.check_interval,
+                config.min_check_interval,
+                config.max_check_interval,
+                str(self.worker_dir),
+                budget=self._poll_budget
+            )
+        # ذاكرة الميديا المرفوعة كمرفقات (فقط عند تفعيل MEDIA_UPLOAD)
+        self.media_cache: Optional[MediaCache] = None
+        if config.media_upload:
+            self.media_cache = self._create_media_cache(config)
+        # تحديث إحصائيات الرسائل المرسلة وحذف التغريدات المحذوفة (REFRESH_INTERVAL)،
+        # وفي وضع WORKERS تتولاه العملية الأولى لكل الرسائل في المخزن المشترك
+        self.refresher: Optional[MessageRefresher] = None
+        if self.tweet_tracker.store.TRACKS_MESSAGES and worker_index in (None, 0):
+            self.refresher = MessageRefresher(
+                self.tweet_tracker.store,
+                self.twitter_api.lookup_tweets,
+                self._edit_message,
+                self._delete_message,
+                config.refresh_interval,
+                config.refresh_window,
+                config.refresh_min_change
+            )
+        elif config.refresh_interval and not self.tweet_tracker.store.TRACKS_MESSAGES:
+            logger.warning("REFRESH_INTERVAL يتطلب STATE_BACKEND=sqlite، لن تُحدث الرسائل المرسلة")
+        # قواعد التوجيه مجمعة مرة واحدة (ROUTING_RULES_FILE)، وتُعاد عند تغير الملف
+        self.router = Router(config.routing_rules)
+        # webhook لكل وجهة، والأساسي يُستخدم لتنسيق الرسائل ورسائل الحالة
+        self.webhooks: Dict[str, DiscordWebhook] = {}
+        self.deliveries: Dict[str, DeliveryWorker] = {}
+        for url in config.all_webhooks():
+            self._add_destination(url)
+        self.discord_webhook = self.webhooks[config.discord_webhook_url]
+        # مراقب ملف الإعدادات (يُضبط من main) لتطبيق التغييرات أثناء التشغيل
+        self.config_watcher: Optional[ConfigWatcher] = None
+        self.startup_profile = StartupProfile()
+        self.metrics_server: Optional[metrics.MetricsServer] = None
+        if config.metrics_port:
+            self.metrics_server = metrics.MetricsServer(config.metrics_host, config.metrics_port)
         self.is_running = False
         self.startup_check_done = False
         self.shutdown_requested = False
     
+    def _add_destination(self, url: str) -> DeliveryWorker:
+        """إنشاء webhook وطابور إرسال لوجهة"""
+        webhook = DiscordWebhook(url, self.config.mention_everyone, self.session, self.media_cache)
+        self.webhooks[url] = webhook
+        # الإرسال إلى Discord يتم في الخلفية حتى لا ينتظره الفحص، مع طابور
+        # مستقل لكل webhook لأن لكل منها حدود إرسال خاصة بها
+        worker = DeliveryWorker(
+            webhook.deliver,
+            self._on_delivered,
+            self._on_dropped,
+            max_retries=self.config.delivery_max_retries,
+            max_queue=self.config.delivery_queue_size,
+            name=webhook.webhook_id,
+            linger=self.config.coalesce_window,
+            backfill_rate=self.config.backfill_rate,
+            on_message=self._on_message
+        )
+        self.deliveries[url] = worker
+        return worker
+    
+    def _create_media_cache(self, config: BotConfig) -> MediaCache:
+        # لكل عملية في وضع WORKERS ذاكرتها في مجلدها، فيبقى الحد والفهرس صحيحين
+        # لكل ذاكرة (على حساب تنزيل نفس الميديا مرة في كل عملية تحتاجها)
+        return MediaCache(str(self.worker_dir / "media"), config.media_cache_max_bytes,
+                          config.media_max_upload_bytes, self.session)
+    
+    async def _apply_media(self, config: BotConfig):
+        """تفعيل أو تعطيل رفع الميديا وتحديث حدود الذاكرة المؤقتة"""
+        if not config.media_upload:
+            self.media_cache = None
+        elif self.media_cache is None:
+            self.media_cache = self._create_media_cache(config)
+        else:
+            await self.media_cache.resize(config.media_cache_max_bytes, config.media_max_upload_bytes)
+        for webhook in self.webhooks.values():
+            webhook.media_cache = self.media_cache
+            webhook.renderer.upload_media = self.media_cache is not None
+    
+    async def open_session(self):
+        """إنشاء جلسة HTTP مشتركة مع مجمع اتصالات و DNS cache"""
+        connector = aiohttp.TCPConnector(
+            limit=self.config.http_pool_limit * 2,
+            limit_per_host=self.config.http_pool_limit,
+            ttl_dns_cache=self.config.dns_cache_ttl,
+            keepalive_timeout=self.config.http_keepalive_timeout
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=self.config.http_timeout,
+            connect=self.config.http_connect_timeout
+        )
+        self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        self.twitter_api.session = self.session
+        for webhook in self.webhooks.values():
+            webhook.session = self.session
+        if self.media_cache:
+            self.media_cache.session = self.session
+    
+    async def close_session(self):
+        """إغلاق الجلسة المشتركة وكل الاتصالات المفتوحة"""
+        if self.session and not self.session.closed:
+            await self.session.close()
+    
+    def _poll_budget(self) -> Optional[float]:
+        """أقصى عدد فحوصات في الثانية يسمح به حد Twitter (مع هامش 10%)"""
+        endpoint = TwitterAPI.SEARCH_ENDPOINT if self.search_chunks else TwitterAPI.TIMELINE_ENDPOINT
+        bucket = self.twitter_api.rate_limiter.buckets.get(endpoint)
+        if not bucket or not bucket.limit:
+            return None
+        # نوافذ حدود Twitter API v2 مدتها 15 دقيقة
+        return bucket.limit * 0.9 / 900
+    
+    def collect_metrics(self):
+        """تحديث المقاييس اللحظية عند كل قراءة لـ /metrics"""
+        for url, worker in self.deliveries.items():
+            metrics.DELIVERY_QUEUE_DEPTH.set(worker.queue.qsize(), self.webhooks[url].webhook_id)
+            metrics.BACKFILL_QUEUE_DEPTH.set(len(worker.backlog), self.webhooks[url].webhook_id)
+        metrics.OUTBOX_PENDING.set(len(self.outbox))
+        for endpoint, state in self.twitter_api.rate_limiter.snapshot().items():
+            if state['remaining'] is not None:
+                metrics.RATE_LIMIT_REMAINING.set(state['remaining'], endpoint)
+            if state['limit'] is not None:
+                metrics.RATE_LIMIT_LIMIT.set(state['limit'], endpoint)
+            metrics.RATE_LIMIT_RESET.set(state['reset_at'], endpoint)
+            metrics.RATE_LIMIT_BLOCKED.set(state['blocked_for'], endpoint)
+        metrics.TRACKER_IDS.set(self.tweet_tracker.size())
+        metrics.TRACKER_STORED.set(self.tweet_tracker.store.count())
+    
+    async def _sleep(self, seconds: float):
+        """انتظار قابل للمقاطعة عند طلب الإيقاف"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + seconds
+        while not self.shutdown_requested:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(min(1, remaining))
+    
+    async def resolve_users(self, usernames: List[str], force: bool = False) -> None:
+        """جلب معلومات الحسابات من الذاكرة المؤقتة أو بطلب مجمّع واحد"""
+        stale = list(usernames) if force else self.profile_cache.stale(usernames)
+        if stale:
+            fetched = await self.twitter_api.get_users_info(stale)
+            self.profile_cache.update(fetched)
+        
+        for username in usernames:
+            # عند فشل الجلب تُستخدم المعلومات القديمة إن وجدت
+            user_info = self.profile_cache.get(username)
+            if user_info:
+                self.user_infos[username] = user_info
+    
+    async def refresh_profiles(self):
+        """تحديث معلومات الحسابات في الخلفية عند انتهاء صلاحيتها"""
+        while not self.shutdown_requested:
+            usernames = list(self.config.twitter_usernames)
+            await self._sleep(max(60, self.profile_cache.next_expiry(usernames)))
+            if self.shutdown_requested:
+                break
+            stale = self.profile_cache.stale(usernames)
+            if stale:
+                logger.info(f"تحديث معلومات {len(stale)} حساب في الخلفية")
+                await self.resolve_users(stale, force=True)
+    
     async def initialize(self) -> bool:
         """تهيئة البوت"""
         logger.info("جاري تهيئة البوت...")
         
-        # الحصول على معلومات المستخدم الكاملة
-        self.user_info = await self.twitter_api.get_user_info(self.config.twitter_username)
-        if not self.user_info:
-            logger.error(f"فشل في الحصول على معلومات المستخدم لـ {self.config.twitter_username}")
-            return False
+        # التشغيل الدافئ: المعلومات المحفوظة تُستخدم فوراً حتى لو انتهت صلاحيتها،
+        # وتحديثها يتم في الخلفية عبر refresh_profiles، فلا يُنتظر تويتر إلا للحسابات الجديدة
+        usernames = [username for username in self.config.twitter_usernames if username not in self.user_infos]
+        for username in usernames:
+            cached = self.profile_cache.get(username)
+            if cached:
+                self.user_infos[username] = cached
+        missing = [username for username in usernames if username not in self.user_infos]
+        if missing:
+            await self.resolve_users(missing)
+        if len(missing) < len(usernames):
+            logger.info(f"تم تحميل معلومات {len(usernames) - len(missing)} حساب من الذاكرة المؤقتة")
         
-        logger.info(f"تم العثور على المستخدم {self.user_info['name']} (@{self.config.twitter_username})")
-        return True
+        for username in usernames:
+            user_info = self.user_infos.get(username)
+            if user_info:
+                logger.info(f"تم العثور على المستخدم {user_info['name']} (@{username})")
+            else:
+                logger.error(f"فشل في الحصول على معلومات المستخدم لـ {username}")
+        
+        # الحسابات التي فشلت سيُعاد جلبها عند فحصها (وعامل بدون حسابات ينتظر حصته من المشرف)
+        return bool(self.user_infos) or not self.config.twitter_usernames
+    
+    async def validate_webhooks(self) -> bool:
+        """التحقق من كل الوجهات بالتوازي دون إرسال رسائل"""
+        results = await asyncio.gather(*(webhook.validate() for webhook in self.webhooks.values()))
+        return all(results)
     
-    async def perform_startup_check(self):
-        """إجراء الفحص الأولي وإرسال آخر 3 تغريدات"""
-        if not self.user_info:
+    def startup_accounts(self) -> List[str]:
+        """الحسابات التي يُجرى لها الفحص الأولي حسب STARTUP_CHECK"""
+        usernames = list(self.user_infos)
+        if self.config.startup_check == "never":
+            return []
+        if self.config.startup_check == "always":
+            return usernames
+        # auto: الحسابات التي لها آخر تغريدة محفوظة تستأنف منها دون فحص أولي
+        return [username for username in usernames if self.tweet_tracker.last_seen(username) is None]
+    
+    async def perform_startup_check(self, usernames: Optional[List[str]] = None):
+        """إجراء الفحص الأولي وإرسال آخر 3 تغريدات لكل حساب"""
+        if not self.user_infos:
             logger.warning("معلومات المستخدم غير متوفرة للفحص الأولي")
             return
         
-        logger.info("🎯 بدء الفحص الأولي - إرسال آخر 3 تغريدات للتأكد من عمل البوت")
+        usernames = list(self.user_infos) if usernames is None else usernames
+        if not usernames:
+            logger.info("تخطي الفحص الأولي: الاستئناف من آخر تغريدة محفوظة لكل حساب")
+            return
         
-        user_id = self.user_info['id']
-        tweets, media_info = await self.twitter_api.get_recent_tweets(user_id, max_results=5)
+        logger.info(f"🎯 بدء الفحص الأولي لـ {len(usernames)} حساب - إرسال آخر 3 تغريدات للتأكد من عمل البوت")
         
-        if not tweets:
-            logger.warning("لم يتم العثور على تغريدات للفحص الأولي")
-            return
+        # جلب كل الحسابات بالتوازي ضمن حد الفحص، ثم الإضافة للطابور بنفس الترتيب
+        semaphore = asyncio.Semaphore(max(1, self.config.max_concurrent_polls))
         
-        # إرسال آخر 3 تغريدات (أو أقل إذا لم تكن متوفرة)
-        recent_tweets = tweets[:3]
+        async def fetch(username: str):
+            async with semaphore:
+                return await self.twitter_api.get_recent_tweets(self.user_infos[username]['id'], max_results=5)
         
-        logger.info(f"سيتم إرسال {len(recent_tweets)} تغريدة للفحص الأولي")
+        results = await asyncio.gather(*(fetch(username) for username in usernames))
         
-        for i, tweet in enumerate(recent_tweets):
-            tweet_id = tweet['id']
+        for username, (tweets, media_info) in zip(usernames, results):
+            user_info = self.user_infos[username]
+            if not tweets:
+                logger.warning(f"لم يتم العثور على تغريدات للفحص الأولي لـ @{username}")
+                continue
             
-            # إرسال التغريدة مع علامة الفحص الأولي
-            success = await self.discord_webhook.send_tweet(
-                tweet, 
-                self.config.twitter_username, 
-                self.user_info, 
-                media_info, 
-                self.config.max_tweet_length,
-                is_startup=True
-            )
+            # إرسال آخر 3 تغريدات (أو أقل إذا لم تكن متوفرة)
+            recent_tweets = tweets[:3]
             
-            if success:
-                # تسجيل التغريدة كمرسلة لتجنب إعادة الإرسال
-                self.tweet_tracker.mark_as_sent(tweet_id)
-                
-                # انتظار 3 ثواني بين الرسائل لتجنب spam
-                if i < len(recent_tweets) - 1:
-                    await asyncio.sleep(3)
-            else:
-                logger.error(f"فشل في إرسال تغريدة الفحص الأولي {tweet_id}")
+            logger.info(f"سيتم إرسال {len(recent_tweets)} تغريدة للفحص الأولي لـ @{username}")
+            
+            for tweet in recent_tweets:
+                # إرسال التغريدة مع علامة الفحص الأولي، وتُسجل كمرسلة عند وصولها
+                self.enqueue_tweet(username, user_info, tweet, media_info, is_startup=True)
         
+        self.outbox.flush()
         logger.info("✅ تم الانتهاء من الفحص الأولي")
     
-    async def check_new_tweets(self):
-        """فحص التغريدات الجديدة"""
-        if not self.user_info:
-            logger.warning("معلومات المستخدم غير متوفرة، محاولة إعادة التهيئة...")
-            if not await self.initialize():
-                return
+    def _tracker_key(self, username: str, url: str) -> str:
+        """مفتاح التتبع لكل حساب ووجهة (الوجهة الأساسية تحتفظ بمفتاح الحساب القديم)"""
+        if url == self.config.discord_webhook_url:
+            return username
+        return f"{username}#{webhook_id(url)}"
+    
+    def enqueue_tweet(self, username: str, user_info: Dict, tweet: Dict, media_info: Dict, is_startup: bool = False,
+                      backfill: bool = False) -> int:
+        """تنسيق التغريدة مرة واحدة وإضافتها لطابور كل وجهة لم تستلمها بعد"""
+        tweet_id = tweet['id']
+        route = self.router.route(username, tweet)
+        if route.drop:
+            self._drop(username, tweet_id, route)
+            return 0
+        urls = [
+            url for url in route.destinations(self.config.webhooks_for(username))
+            if not self.deliveries[url].is_pending(username, tweet_id) and
+            (is_startup or not self.tweet_tracker.is_sent(tweet_id, self._tracker_key(username, url)))
+        ]
+        if not urls:
+            return 0
+        
+        message_data = self.discord_webhook._format_tweet_message(
+            tweet,
+            username,
+            user_info,
+            media_info,
+            self.config.max_tweet_length,
+            is_startup,
+            route.roles
+        )
+        queued = 0
+        for url in urls:
+            job = DeliveryJob(username, tweet_id, message_data, tweet, url, backfill)
+            if self.deliveries[url].submit(job):
+                self.outbox.append(job)
+                queued += 1
+        return queued
+    
+    def _drop(self, username: str, tweet_id: str, route: Route):
+        """تسجيل تغريدة استبعدتها قاعدة توجيه كمعالجة، فلا تُطابق مجدداً في كل فحص (وضع البحث)"""
+        keys = [self._tracker_key(username, url) for url in self.config.webhooks_for(username)]
+        if all(self.tweet_tracker.is_sent(tweet_id, key) for key in keys):
+            return
+        for key in keys:
+            self.tweet_tracker.mark_as_sent(tweet_id, key)
+        metrics.TWEETS_DROPPED.inc(username)
+        logger.info(f"تم استبعاد التغريدة {tweet_id} من @{username} بقاعدة {', '.join(route.rules)}")
+    
+    def _destinations(self, username: str, tweet: Dict) -> List[str]:
+        """وجهات التغريدة حسب قواعد التوجيه (فارغة إذا استُبعدت)"""
+        return self.router.route(username, tweet).destinations(self.config.webhooks_for(username))
+    
+    def replay_outbox(self):
+        """إعادة الرسائل التي لم تصل قبل التوقف السابق إلى طوابير الإرسال"""
+        replayed = 0
+        for job in self.outbox.pending():
+            worker = self.deliveries.get(job.destination)
+            if worker is None or self.tweet_tracker.is_sent(job.tweet_id, self._tracker_key(job.account, job.destination)):
+                # وجهة أزيلت من الإعدادات أو رسالة وصلت قبل تسجيل تأكيدها
+                self.outbox.ack(job)
+            elif worker.submit(job):
+                replayed += 1
+        self.outbox.flush()
+        if replayed:
+            logger.info(f"إعادة إرسال {replayed} رسالة من صندوق الصادر")
+    
+    def _on_delivered(self, job: DeliveryJob):
+        """تسجيل التغريدة كمرسلة لهذه الوجهة بعد وصولها إلى Discord"""
+        logger.info(f"تم إرسال التغريدة {job.tweet_id} من @{job.account} إلى {self.webhooks[job.destination].webhook_id}")
+        self.tweet_tracker.mark_as_sent(job.tweet_id, self._tracker_key(job.account, job.destination))
+        self._rewound.discard(job.key)
+        metrics.TWEETS_DELIVERED.inc(job.account, self.webhooks[job.destination].webhook_id)
+        self.outbox.ack(job)
+        # نشاط الحساب يُسجل مرة واحدة وليس مرة لكل وجهة
+        if self.cadence and job.destination == next(iter(self._destinations(job.account, job.tweet)), None):
+            self.cadence.observe(job.account, job.tweet.get('created_at', ''))
+        # حفظ دفعة التغريدات المرسلة عند إفراغ كل الطوابير
+        if all(worker.queue.empty() for worker in self.deliveries.values()):
+            self.tweet_tracker.flush()
+    
+    def _on_message(self, jobs: List[DeliveryJob], payload: dict, result: DeliveryResult):
+        """حفظ معرف الرسالة المرسلة وتغريداتها لتحديثها لاحقاً"""
+        if not self.config.refresh_interval or not result.message or 'id' not in result.message:
+            return
+        body, tweets = message_record(jobs, payload, result.message)
+        try:
+            self.tweet_tracker.store.record_message(jobs[0].destination, result.message['id'], body, tweets)
+        except Exception as e:
+            # فشل الحفظ لا يعني فشل الإرسال، فلا يُعاد إرسال الرسالة
+            logger.error(f"خطأ في حفظ معرف الرسالة {result.message['id']}: {e}")
+    
+    def _webhook_for(self, destination: str) -> DiscordWebhook:
+        """webhook الوجهة، أو webhook مؤقت لوجهة تتبع عملية أخرى (وضع WORKERS)"""
+        return self.webhooks.get(destination) or DiscordWebhook(destination, session=self.session)
+    
+    async def _edit_message(self, destination: str, message_id: str, body: dict) -> DeliveryResult:
+        return await self._webhook_for(destination).edit_message(message_id, body)
+    
+    async def _delete_message(self, destination: str, message_id: str) -> DeliveryResult:
+        return await self._webhook_for(destination).delete_message(message_id)
+    
+    def _on_dropped(self, job: DeliveryJob):
+        """إزالة رسالة فشلت نهائياً من صندوق الصادر (تُجلب مجدداً في الفحص التالي)"""
+        self.outbox.ack(job)
+        # مرة واحدة لكل تغريدة، فرسالة يرفضها Discord دائماً لا توقف تقدم المؤشر
+        if job.key not in self._rewound:
+            self._rewound.add(job.key)
+            self.tweet_tracker.rewind_cursor(job.account, int(job.tweet_id))
+    
+    async def _broadcast(self, message_data: dict) -> int:
+        """إرسال رسالة حالة إلى كل الوجهات بالتوازي وإرجاع عدد الناجحة"""
+        results = await asyncio.gather(*(webhook.deliver(message_data) for webhook in self.webhooks.values()))
+        return sum(1 for result in results if result.ok)
+    
+    def _start_delivery(self):
+        """تشغيل طوابير الإرسال لكل الوجهات"""
+        for worker in self.deliveries.values():
+            worker.start()
+    
+    async def _stop_delivery(self, timeout: float):
+        """إفراغ طوابير الإرسال خلال مدة محددة ثم إيقافها"""
+        await asyncio.gather(*(worker.stop(timeout=timeout) for worker in self.deliveries.values()))
+    
+    async def _user_info_for(self, username: str) -> Optional[Dict]:
+        """معلومات الحساب مع إعادة المحاولة إذا لم تكن متوفرة"""
+        user_info = self.user_infos.get(username)
+        if not user_info:
+            logger.warning(f"معلومات @{username} غير متوفرة، محاولة إعادة التهيئة...")
+            await self.resolve_users([username], force=True)
+            user_info = self.user_infos.get(username)
+        return user_info
+    
+    async def poll_job(self, key: str):
+        """تنفيذ مهمة فحص من المجدول: حساب واحد أو مجموعة بحث"""
+        if self.stream and self.stream.connected and key not in self._catch_up:
+            return
         
-        user_id = self.user_info['id']
-        # استخدام قيمة أقل لتوفير API calls
-        tweets, media_info = await self.twitter_api.get_recent_tweets(user_id, max_results=5)
+        # إذا كان الـ endpoint محظوراً مؤقتاً يتم تأجيل هذه المهمة فقط بدلاً
+        # من الانتظار داخلها وحجز مكان في حد التوازي
+        endpoint = TwitterAPI.SEARCH_ENDPOINT if key in self.search_chunks else TwitterAPI.TIMELINE_ENDPOINT
+        delay = self.twitter_api.rate_limiter.delay(endpoint)
+        if delay > 5 and self.scheduler:
+            logger.info(f"تأجيل فحص {key} لمدة {delay/60:.1f} دقيقة بسبب Rate Limit")
+            self.scheduler.schedule(key, delay)
+            return
         
+        started = time.monotonic()
+        try:
+            if key in self.search_chunks:
+                await self.check_search_chunk(key)
+            else:
+                await self.check_new_tweets(key)
+        finally:
+            # يبقى الحساب في _catch_up حتى ينتهي فحص التعويض (لا عند تأجيله)، فلا تقدم
+            # تغريدات الـ stream المؤشر فوق فجوة الانقطاع قبل جلبها
+            self._catch_up.discard(key)
+            metrics.POLL_SECONDS.observe(time.monotonic() - started, key)
+    
+    async def check_new_tweets(self, username: Optional[str] = None):
+        """فحص التغريدات الجديدة لحساب واحد"""
+        username = username or self.config.twitter_username
+        user_info = await self._user_info_for(username)
+        if not user_info:
+            return
+        
+        user_id = user_info['id']
+        # الجلب التزايدي: التغريدات الأحدث من المؤشر فقط، فالفحص بدون جديد يرجع صفحة فارغة
+        since_id = self._since_id(username)
+        tweets, media_info, meta = await self.twitter_api.get_timeline_page(user_id, max_results=5, since_id=since_id)
+        if not meta:
+            return
+        # next_token مع since_id يعني أن الجديد أكثر من صفحة (بعد انقطاع أو حظر طويل)،
+        # فالتغريدات بين المؤشر والصفحة تُجلب من الصفحات الأقدم بدلاً من تجاهلها
+        complete = True
+        if since_id and meta.get('next_token'):
+            if self.config.backfill_max_pages:
+                complete = await self.backfill(username, user_info, meta, since_id)
+            else:
+                # بدون تعويض تُطلب الفجوة بصفحة كاملة واحدة، وما يتجاوزها يُبقي المؤشر
+                # مكانه حتى لا تُتخطى تغريدات لم تُجلب
+                page = await self.twitter_api.get_timeline_page(user_id, max_results=100, since_id=since_id)
+                if page[2]:
+                    tweets, media_info, meta = page
+                complete = not meta.get('next_token')
+                if not complete:
+                    logger.warning(f"تغريدات @{username} الجديدة أكثر من 100 والتعويض معطل (BACKFILL_MAX_PAGES=0)، "
+                                   f"المؤشر لن يتقدم حتى لا تُتخطى التغريدات الأقدم")
+        await self.process_tweets(username, user_info, tweets, media_info)
+        if complete:
+            self._advance_cursor(username, tweets, meta)
+    
+    def _since_id(self, username: str) -> Optional[int]:
+        """مؤشر الجلب للحساب، أو أحدث تغريدة وصلت لكل الوجهات إذا لم يُحفظ مؤشر بعد
+
+        الوجهات هي نفسها التي يفحصها _handed_off، بما فيها وجهات قواعد التوجيه.
+        """
+        cursor = self.tweet_tracker.cursor(username)
+        if cursor:
+            return cursor
+        seen = [self.tweet_tracker.last_seen(self._tracker_key(username, url)) for url in self.config.destinations_for(username)]
+        seen = [tweet_id for tweet_id in seen if tweet_id]
+        return min(seen) if seen else None
+    
+    def _handed_off(self, username: str, tweet: Dict) -> bool:
+        """التغريدة في طابور كل وجهة أو وصلت إليها (أو استبعدتها قاعدة توجيه)"""
+        tweet_id = tweet['id']
+        return all(
+            self.deliveries[url].is_pending(username, tweet_id) or
+            self.tweet_tracker.is_sent(tweet_id, self._tracker_key(username, url))
+            for url in self._destinations(username, tweet)
+        )
+    
+    def _advance_cursor(self, username: str, tweets: List[Dict], meta: Dict):
+        """تقديم المؤشر حتى أحدث تغريدة سُلمت دون تخطي تغريدة قبلها لم تدخل الطابور
+
+        الطوابير محفوظة في صندوق الصادر، لذلك لا يضيع ما بعد المؤشر عند التوقف.
+        """
+        newest = None
+        for tweet in sorted(tweets, key=lambda tweet: int(tweet['id'])):
+            if not self._handed_off(username, tweet):
+                break
+            newest = int(tweet['id'])
+        else:
+            # كل التغريدات سُلمت، فالمستبعدة بالفلترة (ردود مثلاً) لا تُجلب مجدداً أيضاً
+            if meta.get('newest_id'):
+                newest = int(meta['newest_id'])
+        if newest:
+            self.tweet_tracker.advance_cursor(username, newest)
+    
+    async def backfill(self, username: str, user_info: Dict, meta: Dict, since_id: int) -> bool:
+        """متابعة pagination_token للخلف حتى المؤشر بحد أقصى backfill_max_pages صفحة
+
+        التغريدات المستعادة تُضاف من الأقدم للأحدث إلى طابور منخفض الأولوية في كل
+        وجهة، فلا تؤخر التغريدات الجديدة. False إذا توقف قبل الانتهاء (ليبقى المؤشر).
+        """
+        recovered: List[Dict] = []
+        media_info: Dict = {}
+        token = meta.get('next_token')
+        pages = 0
+        while token and pages < self.config.backfill_max_pages:
+            if self.shutdown_requested:
+                return False
+            if self.twitter_api.rate_limiter.delay(TwitterAPI.TIMELINE_ENDPOINT) > 5:
+                # يُعاد التعويض من نفس المؤشر في الفحص التالي بعد رفع الحظر
+                logger.info(f"تأجيل تعويض تغريدات @{username} بسبب Rate Limit")
+                return False
+            tweets, page_media, page_meta = await self.twitter_api.get_timeline_page(
+                user_info['id'], 100, token, since_id=since_id)
+            if not page_meta:
+                return False
+            pages += 1
+            media_info.update(page_media)
+            recovered.extend(tweets)
+            token = page_meta.get('next_token')
+        
+        if token:
+            logger.warning(f"الفجوة في تغريدات @{username} أكبر من {pages} صفحة، التغريدات الأقدم لن تُرسل")
+        
+        queued = 0
+        for tweet in reversed(recovered):
+            if self.enqueue_tweet(username, user_info, tweet, media_info, backfill=True):
+                queued += 1
+        self.outbox.flush()
+        if queued:
+            metrics.BACKFILL_TWEETS.inc(username, amount=queued)
+            logger.info(f"تعويض {queued} تغريدة فائتة لـ @{username} من {pages} صفحة")
+        # تغريدة مستعادة لم تدخل الطابور (طابور ممتلئ) تُبقي المؤشر لإعادة المحاولة
+        return all(self._handed_off(username, tweet) for tweet in recovered)
+    
+    async def check_search_chunk(self, key: str):
+        """فحص مجموعة حسابات باستعلام بحث واحد"""
+        usernames = self.search_chunks[key]
+        results = await self.twitter_api.search_recent_tweets(usernames)
+        
+        for username in usernames:
+            if self.shutdown_requested:
+                break
+            tweets, media_info = results.get(username.lower(), ([], {}))
+            if not tweets:
+                continue
+            user_info = await self._user_info_for(username)
+            if user_info:
+                await self.process_tweets(username, user_info, tweets, media_info)
+    
+    async def _on_stream_tweet(self, username: str, tweet: Dict, media_info: Dict):
+        """تغريدة وصلت عبر الـ stream تمر بنفس مسار التتبع والإرسال
+
+        تقدم المؤشر أيضاً، فلا يعيد فحص التعويض بعد إعادة الاتصال جلب ما وصل عبر الـ
+        stream، إلا إذا كان فحص التعويض لهذا الحساب لم ينته بعد.
+        """
+        user_info = await self._user_info_for(username)
+        if user_info:
+            await self.process_tweets(username, user_info, [tweet], media_info)
+            if username not in self._catch_up:
+                self._advance_cursor(username, [tweet], {})
+    
+    def _on_stream_connect(self):
+        """فحص واحد لكل حساب بعد كل اتصال لتعويض ما نُشر أثناء الانقطاع"""
+        self._catch_up = set(self.scheduler.keys())
+        for key in self._catch_up:
+            self.scheduler.schedule(key, 0)
+    
+    async def process_tweets(self, username: str, user_info: Dict, tweets: List[Dict], media_info: Dict):
+        """إرسال التغريدات الجديدة لحساب واحد (الأحدث أولاً في المدخلات)"""
         if not tweets:
-            logger.debug("لا توجد تغريدات جديدة")
+            logger.debug(f"لا توجد تغريدات جديدة لـ @{username}")
             return
         
         # ترتيب التغريدات من الأقدم للأحدث
@@ -479,47 +1251,39 @@ class TwitterDiscordBot:
         
         new_tweets_count = 0
         for tweet in tweets:
-            if self.shutdown_requested:
-                break
-                
-            tweet_id = tweet['id']
-            
-            if not self.tweet_tracker.is_sent(tweet_id):
-                logger.info(f"تغريدة جديدة وُجدت: {tweet_id}")
-                
-                # إرسال التغريدة إلى ديسكورد
-                success = await self.discord_webhook.send_tweet(
-                    tweet, 
-                    self.config.twitter_username, 
-                    self.user_info, 
-                    media_info, 
-                    self.config.max_tweet_length
-                )
-                
-                if success:
-                    self.tweet_tracker.mark_as_sent(tweet_id)
-                    new_tweets_count += 1
-                    # انتظار بين الرسائل
-                    if not self.shutdown_requested:
-                        await asyncio.sleep(3)
-                else:
-                    logger.error(f"فشل في إرسال التغريدة {tweet_id}")
+            # التغريدات المرسلة أو التي في الطابور بالفعل لا تُضاف مرة أخرى
+            queued = self.enqueue_tweet(username, user_info, tweet, media_info)
+            if queued:
+                logger.info(f"تغريدة جديدة وُجدت لـ @{username}: {tweet['id']} ({queued} وجهة)")
+                new_tweets_count += 1
+        
+        # حفظ الرسائل الجديدة على القرص دفعة واحدة لكل فحص
+        self.outbox.flush()
         
         if new_tweets_count > 0:
-            logger.info(f"تم إرسال {new_tweets_count} تغريدة جديدة")
+            logger.info(f"تمت إضافة {new_tweets_count} تغريدة جديدة من @{username} لطابور الإرسال")
     
-    async def send_startup_message(self):
+    async def send_startup_message(self, startup_accounts: Optional[List[str]] = None):
         """إرسال رسالة بدء التشغيل"""
-        if not self.user_info:
+        if not self.user_infos:
             return
         
+        # أول حساب يظهر كصورة مصغرة، ومجموع المتابعين لكل الحسابات
+        user_info = next(iter(self.user_infos.values()))
+        if len(self.user_infos) == 1:
+            description = f"بدأت مراقبة حساب **{user_info['name']}** (@{user_info['username']})"
+        else:
+            accounts = ", ".join(f"@{username}" for username in self.user_infos)
+            description = f"بدأت مراقبة {len(self.user_infos)} حساب: {accounts}"[:4096]
+        followers = sum(info.get('public_metrics', {}).get('followers_count', 0) for info in self.user_infos.values())
+        
         startup_embed = {
             "title": "🤖 تم تشغيل البوت بنجاح",
-            "description": f"بدأت مراقبة حساب **{self.user_info['name']}** (@{self.config.twitter_username})",
+            "description": description,
             "color": 0x00FF00,  # أخضر
             "timestamp": datetime.now(timezone.utc).isoformat(),
             "thumbnail": {
-                "url": self.user_info.get('profile_image_url', '').replace('_normal', '_400x400') if self.user_info.get('profile_image_url') else None
+                "url": user_info.get('profile_image_url', '').replace('_normal', '_400x400') if user_info.get('profile_image_url') else None
             },
             "fields": [
                 {
@@ -529,12 +1293,13 @@ class TwitterDiscordBot:
                 },
                 {
                     "name": "📊 إحصائيات الحساب",
-                    "value": f"👥 {self._format_numbers(self.user_info.get('public_metrics', {}).get('followers_count', 0))} متابع",
+                    "value": f"👥 {format_numbers(followers)} متابع",
                     "inline": True
                 },
                 {
                     "name": "🎯 الفحص الأولي",
-                    "value": "سيتم إرسال آخر 3 تغريدات للتأكد من عمل البوت",
+                    "value": "سيتم إرسال آخر 3 تغريدات للتأكد من عمل البوت" if startup_accounts is None or startup_accounts
+                             else "تم الاستئناف من آخر تغريدة محفوظة لكل حساب",
                     "inline": False
                 }
             ],
@@ -548,88 +1313,308 @@ class TwitterDiscordBot:
             "embeds": [startup_embed]
         }
         
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(self.discord_webhook.webhook_url, json=message_data) as response:
-                    if response.status in [200, 204]:
-                        logger.info("تم إرسال رسالة بدء التشغيل")
-                    else:
-                        logger.error(f"خطأ في إرسال رسالة بدء التشغيل: {response.status}")
-        except Exception as e:
-            logger.error(f"خطأ في إرسال رسالة بدء التشغيل: {e}")
+        sent = await self._broadcast(message_data)
+        if sent == len(self.webhooks):
+            logger.info("تم إرسال رسالة بدء التشغيل")
+        else:
+            logger.error(f"خطأ في إرسال رسالة بدء التشغيل إلى {len(self.webhooks) - sent} وجهة")
     
-    def _format_numbers(self, num: int) -> str:
-        """تنسيق الأرقام بشكل جميل"""
-        if num >= 1000000:
-            return f"{num/1000000:.1f}M"
-        elif num >= 1000:
-            return f"{num/1000:.1f}K"
-        return str(num)
+    def _build_jobs(self) -> List[str]:
+        """مهام المجدول حسب الإعدادات الحالية (تُستدعى عند البدء وعند تغيير الحسابات)"""
+        # في وضع البحث يكون الفحص لكل مجموعة حسابات بدلاً من كل حساب
+        jobs = list(self.config.twitter_usernames)
+        if self.config.ingestion_mode == "search":
+            chunks = TwitterAPI.build_search_queries(jobs, self.config.search_query_max_length)
+            self.search_chunks = {f"search:{i}": chunk for i, chunk in enumerate(chunks)}
+            jobs = list(self.search_chunks)
+            logger.info(f"وضع البحث: {len(self.config.twitter_usernames)} حساب في {len(jobs)} استعلام")
+        
+        if self.cadence:
+            self.cadence.set_jobs(self.search_chunks or {username: [username] for username in jobs})
+        return jobs
+    
+    def _interval_for(self, key: str) -> float:
+        """فترات متكيفة حسب نشاط كل حساب أو فترة ثابتة للجميع"""
+        if self.cadence:
+            return self.cadence.interval_for(key)
+        return self.config.check_interval
+    
+    # إعدادات مرتبطة بموارد مفتوحة أو بحالة محفوظة ولا تتغير إلا بإعادة التشغيل
+    RESTART_FIELDS = (
+        'discord_webhook_url', 'data_dir', 'state_backend', 'state_commit_batch', 'state_commit_interval',
+        'dedup_capacity', 'http_pool_limit', 'http_timeout', 'http_connect_timeout', 'http_keepalive_timeout',
+        'dns_cache_ttl', 'ingestion_mode', 'delivery_queue_size', 'metrics_port', 'metrics_host',
+        'log_max_bytes', 'log_backup_count', 'log_rotate_when', 'log_compress', 'log_json', 'workers'
+    )
+    
+    async def assign(self, config: BotConfig):
+        """تطبيق حصة حسابات جديدة أرسلها المشرف في وضع WORKERS"""
+        # الحسابات المنقولة من عملية أخرى تُستأنف من حالتها في المخزن المشترك لا من الذاكرة
+        for username in set(config.twitter_usernames) - set(self.config.twitter_usernames):
+            self.tweet_tracker.forget(username)
+            for url in config.destinations_for(username):
+                self.tweet_tracker.forget(self._tracker_key(username, url))
+        await self.apply_config(config)
+        # حفظ ما أُرسل قبل أن تتسلم عملية أخرى الحسابات المحذوفة من هذه الحصة
+        self.tweet_tracker.flush()
+    
+    async def apply_config(self, new_config: BotConfig):
+        """تطبيق إعدادات جديدة أثناء التشغيل دون إعادة التهيئة أو الفحص الأولي"""
+        changes = diff_config(self.config, new_config)
+        restart = [name for name in changes if name in self.RESTART_FIELDS]
+        if restart:
+            logger.warning(f"تغيير {', '.join(restart)} يتطلب إعادة تشغيل البوت، سيتم تجاهله الآن")
+            new_config = replace(new_config, **{name: getattr(self.config, name) for name in restart})
+            changes = diff_config(self.config, new_config)
+        if not changes:
+            logger.info("لا توجد تغييرات قابلة للتطبيق في الإعدادات")
+            return
+        
+        old_config = self.config
+        # الحسابات والوجهات الجديدة تبدأ من آخر تغريدة حالية بدلاً من إرسال القديمة
+        added = [username for username in new_config.twitter_usernames if username not in old_config.twitter_usernames]
+        if added:
+            await self.resolve_users(added)
+        await self._prime_destinations(old_config, new_config)
+        
+        # من هنا حتى إضافة الطوابير لا يوجد await حتى لا يرى الفحص إعدادات ناقصة
+        self.config = new_config
+        logger.info(f"تطبيق الإعدادات الجديدة: {', '.join(changes)}")
+        
+        if 'log_level' in changes:
+            logging.getLogger().setLevel(getattr(logging, new_config.log_level.upper(), logging.INFO))
+        if 'routing_rules' in changes:
+            self.router = Router(new_config.routing_rules)
+            logger.info(f"تم تحميل {len(self.router)} قاعدة توجيه")
+        if 'twitter_bearer_token' in changes:
+            self.twitter_api.bearer_token = new_config.twitter_bearer_token
+            self.twitter_api.headers["Authorization"] = f"Bearer {new_config.twitter_bearer_token}"
+        if 'twitter_api_base_url' in changes:
+            self.twitter_api.base_url = new_config.twitter_api_base_url.rstrip('/')
+        if 'profile_cache_ttl' in changes:
+            self.profile_cache.ttl = new_config.profile_cache_ttl
+        if 'config_reload_interval' in changes and self.config_watcher:
+            self.config_watcher.interval = new_config.config_reload_interval
+        if {'media_upload', 'media_cache_max_bytes', 'media_max_upload_bytes'} & changes.keys():
+            await self._apply_media(new_config)
+        if self.refresher:
+            self.refresher.interval = new_config.refresh_interval
+            self.refresher.window = new_config.refresh_window
+            self.refresher.min_change = new_config.refresh_min_change
+        if 'mention_everyone' in changes:
+            for webhook in self.webhooks.values():
+                webhook.mention_everyone = new_config.mention_everyone
+                webhook.renderer.mention_everyone = new_config.mention_everyone
+        for worker in self.deliveries.values():
+            worker.max_retries = new_config.delivery_max_retries
+            worker.linger = max(0.0, new_config.coalesce_window)
+            worker.backfill_rate = new_config.backfill_rate
+        
+        urls = new_config.all_webhooks()
+        for url in urls:
+            if url not in self.deliveries:
+                self._add_destination(url).start()
+                logger.info(f"تمت إضافة الوجهة {self.webhooks[url].webhook_id}")
+        
+        self._apply_cadence(changes)
+        for username in added:
+            logger.info(f"بدء مراقبة @{username}")
+        for username in old_config.twitter_usernames:
+            if username not in new_config.twitter_usernames:
+                self.user_infos.pop(username, None)
+                logger.info(f"إيقاف مراقبة @{username}")
+        if self.scheduler:
+            self._apply_schedule(changes)
+        if self.stream and {'twitter_usernames', 'search_query_max_length'} & changes.keys():
+            await self.stream.sync_rules()
+        
+        # الوجهات المحذوفة تُفرغ طوابيرها أولاً ثم تُزال
+        removed = [url for url in self.deliveries if url not in urls]
+        await asyncio.gather(*(self.deliveries[url].stop(timeout=10) for url in removed))
+        for url in removed:
+            del self.deliveries[url]
+            logger.info(f"تمت إزالة الوجهة {self.webhooks.pop(url).webhook_id}")
+        logger.info("✅ تم تطبيق الإعدادات الجديدة")
+    
+    async def _prime_destinations(self, old_config: BotConfig, new_config: BotConfig):
+        """تسجيل التغريدات الحالية كمرسلة للوجهات الجديدة لكل حساب دون إرسالها"""
+        for username in new_config.twitter_usernames:
+            previous = old_config.destinations_for(username) if username in old_config.twitter_usernames else []
+            # الوجهات التي لها حالة محفوظة (مثلاً حساب نُقل من عملية أخرى) تستأنف منها
+            urls = [url for url in new_config.destinations_for(username) if url not in previous and
+                    self.tweet_tracker.last_seen(self._tracker_key(username, url)) is None]
+            user_info = self.user_infos.get(username)
+            if not urls or not user_info:
+                continue
+            tweets, _ = await self.twitter_api.get_recent_tweets(user_info['id'], max_results=5)
+            for url in urls:
+                for tweet in tweets:
+                    self.tweet_tracker.mark_as_sent(tweet['id'], self._tracker_key(username, url))
+            if tweets:
+                logger.info(f"@{username}: بدء {len(urls)} وجهة جديدة من التغريدة {tweets[0]['id']}")
+        self.tweet_tracker.flush()
+    
+    def _apply_cadence(self, changes: Dict):
+        """تفعيل أو تعطيل الفترات المتكيفة أو تعديل حدودها"""
+        if self.config.adaptive_polling and not self.cadence:
+            self.cadence = AdaptiveCadence(
+                self.config.check_interval,
+                self.config.min_check_interval,
+                self.config.max_check_interval,
+                str(self.worker_dir),
+                budget=self._poll_budget
+            )
+        elif not self.config.adaptive_polling and self.cadence:
+            self.cadence.save()
+            self.cadence = None
+        elif self.cadence and {'check_interval', 'min_check_interval', 'max_check_interval'} & changes.keys():
+            self.cadence.base_interval = self.config.check_interval
+            self.cadence.min_interval = min(self.config.min_check_interval, self.config.check_interval)
+            self.cadence.max_interval = max(self.config.max_check_interval, self.config.check_interval)
+    
+    def _apply_schedule(self, changes: Dict):
+        """مزامنة مهام المجدول وإعداداته مع الإعدادات الجديدة"""
+        self.scheduler.jitter = max(0.0, min(self.config.poll_jitter, 0.5))
+        self.scheduler.prewarm = self.config.prewarm_seconds
+        if 'max_concurrent_polls' in changes:
+            # الفحوصات الجارية تحرر الـ semaphore القديم والجديدة تستخدم الجديد
+            self.scheduler.semaphore = asyncio.Semaphore(max(1, self.config.max_concurrent_polls))
+        
+        jobs = self._build_jobs()
+        current = self.scheduler.keys()
+        for key in current:
+            if key not in jobs:
+                self.scheduler.remove(key)
+        self.scheduler.add_all([key for key in jobs if key not in current])
+        
+        # تقليل الفترة يُطبق فوراً بدلاً من انتظار المواعيد البعيدة المجدولة سابقاً
+        if {'check_interval', 'max_check_interval', 'adaptive_polling'} & changes.keys():
+            self.scheduler.tighten(self.cadence.max_interval if self.cadence else self.config.check_interval)
     
     def shutdown(self):
         """طلب إيقاف البوت بشكل آمن"""
         logger.info("تم طلب إيقاف البوت...")
         self.shutdown_requested = True
         self.is_running = False
+        if self.scheduler:
+            self.scheduler.stop()
     
     async def run(self):
         """تشغيل البوت"""
-        # محاولة التهيئة مع إعادة المحاولة
+        await self.open_session()
+        if self.metrics_server:
+            metrics.REGISTRY.add_collector(self.collect_metrics)
+            with self.startup_profile.phase("خادم المقاييس"):
+                await self.metrics_server.start()
+        try:
+            await self._run()
+        finally:
+            if self.metrics_server:
+                await self.metrics_server.stop()
+                metrics.REGISTRY.remove_collector(self.collect_metrics)
+            await self._stop_delivery(timeout=0)
+            self.outbox.close()
+            # حفظ حالة التتبع وإغلاق المخزن والاتصالات
+            self.tweet_tracker.close()
+            if self.cadence:
+                self.cadence.save()
+            await self.close_session()
+    
+    async def _initialize_with_retry(self) -> bool:
+        """محاولة التهيئة مع إعادة المحاولة"""
         max_init_attempts = 3
         for attempt in range(max_init_attempts):
             if await self.initialize():
-                break
+                return True
             elif attempt < max_init_attempts - 1:
                 logger.info(f"إعادة محاولة التهيئة ({attempt + 2}/{max_init_attempts}) بعد دقيقتين...")
-                await asyncio.sleep(120)
-            else:
-                logger.error("فشل في تهيئة البوت بعد عدة محاولات")
-                return
+                await self._sleep(120)
+        logger.error("فشل في تهيئة البوت بعد عدة محاولات")
+        return False
+    
+    async def _run(self):
+        """حلقة البوت الرئيسية"""
+        profile = self.startup_profile
+        
+        # التحقق من تويتر (معلومات الحسابات) ومن Discord بالتوازي
+        with profile.phase("التهيئة والتحقق"):
+            initialized, _ = await asyncio.gather(self._initialize_with_retry(), self.validate_webhooks())
+        if not initialized:
+            return
+        check_accounts = self.startup_accounts()
         
-        # إرسال رسالة بدء التشغيل
-        await self.send_startup_message()
+        # إرسال رسالة بدء التشغيل (في وضع WORKERS يرسلها المشرف مرة واحدة)
+        if self.worker_index is None:
+            with profile.phase("رسالة بدء التشغيل"):
+                await self.send_startup_message(check_accounts)
+        self._start_delivery()
+        with profile.phase("صندوق الصادر"):
+            self.replay_outbox()
         
-        # إجراء الفحص الأولي
-        await self.perform_startup_check()
+        # إجراء الفحص الأولي (للحسابات التي ليس لها حالة محفوظة فقط افتراضياً)
+        with profile.phase("الفحص الأولي"):
+            await self.perform_startup_check(check_accounts)
         
         self.is_running = True
-        logger.info(f"بدء مراقبة @{self.config.twitter_username} كل {self.config.check_interval} ثانية")
+        logger.info(f"بدء مراقبة {len(self.config.twitter_usernames)} حساب كل {self.config.check_interval} ثانية")
         
-        # استخدام فترة المراقبة من الإعدادات
-        check_interval = self.config.check_interval
+        jobs = self._build_jobs()
         
-        while self.is_running and not self.shutdown_requested:
-            try:
-                await self.check_new_tweets()
-                
-                # انتظار بشكل قابل للمقاطعة
-                for _ in range(check_interval):
-                    if self.shutdown_requested:
-                        break
-                    await asyncio.sleep(1)
-                    
-            except asyncio.CancelledError:
-                logger.info("تم إلغاء مهمة البوت")
-                break
-            except KeyboardInterrupt:
-                logger.info("تم إيقاف البوت بواسطة المستخدم")
-                break
-            except Exception as e:
-                logger.error(f"خطأ في دورة البوت: {e}")
-                # انتظار 5 دقائق عند حدوث خطأ
-                for _ in range(300):
-                    if self.shutdown_requested:
-                        break
-                    await asyncio.sleep(1)
+        # مجدول الفحص: كل مهمة لها موعد مستقل مع توزيع عشوائي بسيط
+        self.scheduler = PollScheduler(
+            self.poll_job,
+            self._interval_for,
+            max_concurrency=self.config.max_concurrent_polls,
+            jitter=self.config.poll_jitter,
+            error_delay=300,
+            warm_up=self.twitter_api.warm_up,
+            prewarm=self.config.prewarm_seconds
+        )
+        self.scheduler.add_all(jobs)
+        profile.report()
+        self.profile_refresh_task = asyncio.create_task(self.refresh_profiles())
+        refresh_task = asyncio.create_task(self.refresher.run()) if self.refresher else None
+        reload_task = None
+        if self.config_watcher:
+            reload_task = asyncio.create_task(self.config_watcher.watch(self.apply_config))
+        stream_task = None
+        if self.config.ingestion_mode == "stream":
+            self.stream = FilteredStream(
+                self.twitter_api,
+                lambda: self.config.twitter_usernames,
+                self._on_stream_tweet,
+                self._on_stream_connect,
+                self.config.search_query_max_length
+            )
+            stream_task = asyncio.create_task(self.stream.run())
+        
+        try:
+            if not self.shutdown_requested:
+                await self.scheduler.run()
+        except asyncio.CancelledError:
+            logger.info("تم إلغاء مهمة البوت")
+        finally:
+            self.profile_refresh_task.cancel()
+            if refresh_task:
+                refresh_task.cancel()
+            if reload_task:
+                reload_task.cancel()
+            if stream_task:
+                self.stream.stop()
+                stream_task.cancel()
+        
+        # إرسال ما تبقى في الطابور قبل رسالة إيقاف التشغيل
+        await self._stop_delivery(timeout=10)
         
         # إرسال رسالة إيقاف التشغيل
-        await self.send_shutdown_message()
+        if self.worker_index is None:
+            await self.send_shutdown_message()
     
     async def send_shutdown_message(self):
         """إرسال رسالة إيقاف التشغيل"""
         shutdown_embed = {
             "title": "⏸️ تم إيقاف البوت",
-            "description": f"توقفت مراقبة حساب **@{self.config.twitter_username}**",
+            "description": f"توقفت مراقبة {', '.join(f'**@{username}**' for username in self.config.twitter_usernames)}"[:4096],
             "color": 0xFF0000,  # أحمر
             "timestamp": datetime.now(timezone.utc).isoformat(),
             "footer": {
@@ -642,13 +1627,8 @@ class TwitterDiscordBot:
             "embeds": [shutdown_embed]
         }
         
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(self.discord_webhook.webhook_url, json=message_data) as response:
-                    if response.status in [200, 204]:
-                        logger.info("تم إرسال رسالة إيقاف التشغيل")
-        except Exception as e:
-            logger.error(f"خطأ في إرسال رسالة إيقاف التشغيل: {e}")
+        if await self._broadcast(message_data):
+            logger.info("تم إرسال رسالة إيقاف التشغيل")
 
 # متغير عام للبوت لاستخدامه في signal handler
 bot_instance = None
@@ -668,9 +1648,10 @@ def load_config() -> BotConfig:
     from config import load_config as _load_config
     return _load_config()
 
-async def main():
+async def main(profile_startup: bool = False):
     """الدالة الرئيسية لتشغيل البوت"""
     global bot_instance
+    profile = StartupProfile(profile_startup)
     
     try:
         # إعداد معالجات الإشارات
@@ -678,15 +1659,45 @@ async def main():
         signal.signal(signal.SIGTERM, signal_handler)
         
         # تحميل الإعدادات
-        config = load_config()
+        with profile.phase("تحميل الإعدادات"):
+            config = load_config()
+        
+        # وضع العمليات المتعددة: المشرف يوزع الحسابات ويكتب سجلات كل العمليات
+        supervisor = None
+        if config.workers > 1:
+            from supervisor import Supervisor
+            supervisor = Supervisor(config)
         
         # إعداد التسجيل
-        setup_logging(config.log_level, config.data_dir)
+        setup_logging(
+            config.log_level,
+            config.data_dir,
+            config.log_max_bytes,
+            config.log_backup_count,
+            config.log_rotate_when,
+            config.log_compress,
+            config.log_json,
+            supervisor.log_queue if supervisor else None
+        )
         logger.info("🤖 بدء تشغيل Twitter-Discord Bridge Bot")
         logger.info(f"📊 الإعدادات: فترة المراقبة={config.check_interval}ث، منشن الكل={config.mention_everyone}")
         
+        if supervisor:
+            logger.info(f"⚙️ وضع العمليات المتعددة: {config.workers} عملية")
+            supervisor.config_watcher = ConfigWatcher(".env", config.config_reload_interval)
+            await supervisor.run()
+            return
+        
         # إنشاء وتشغيل البوت
-        bot_instance = TwitterDiscordBot(config)
+        with profile.phase("تحميل الحالة المحفوظة"):
+            bot_instance = TwitterDiscordBot(config)
+        bot_instance.startup_profile = profile
+        
+        # إعادة تحميل الإعدادات عند تعديل ملف .env أو عند استلام SIGHUP
+        bot_instance.config_watcher = ConfigWatcher(".env", config.config_reload_interval)
+        if hasattr(signal, 'SIGHUP'):
+            asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, bot_instance.config_watcher.request_reload)
+        
         await bot_instance.run()
         
     except KeyboardInterrupt:
@@ -696,10 +1707,11 @@ async def main():
         raise
     finally:
         logger.info("تم إغلاق البوت بنجاح")
+        stop_logging()
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        asyncio.run(main('--profile-startup' in sys.argv))
     except KeyboardInterrupt:
         print("\n👋 تم إيقاف البوت بواسطة المستخدم")
         sys.exit(0)
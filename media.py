@@ -0,0 +1,268 @@
+"""
+ذاكرة مؤقتة على القرص لميديا التغريدات التي تُرفع إلى Discord كمرفقات
+الملفات تُنزل على دفعات (دون تحميلها كاملة في الذاكرة) وتُسمى ببصمة محتواها،
+مع حد للحجم الكلي وحذف الأقدم استخداماً (LRU)
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import uuid
+from collections import OrderedDict
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set
+from urllib.parse import urlparse
+
+import aiohttp
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+class MediaCache:
+    """تنزيل الميديا مرة واحدة لكل رابط ومشاركتها بين كل الوجهات
+
+    اسم الملف هو sha256 لمحتواه، فنفس الصورة من روابط مختلفة تُخزن مرة واحدة.
+    الطلبات المتزامنة لنفس الرابط (عدة webhooks) تنتظر تنزيلاً واحداً.
+    عمليات الملفات أثناء التشغيل تتم في خيوط المنفذ الافتراضي، وحلقة الأحداث
+    تحدّث الفهرس والحجم في الذاكرة فقط.
+    """
+
+    INDEX_FILE = "index.json"
+
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024 * 1024,
+                 max_file_size: int = 10 * 1024 * 1024, session: Optional[aiohttp.ClientSession] = None):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_file_size = max_file_size
+        self.session = session
+        # اسم الملف -> الحجم، بترتيب آخر استخدام (الأقدم أولاً)
+        self._files: "OrderedDict[str, int]" = OrderedDict()
+        # الرابط -> اسم الملف
+        self._urls: Dict[str, str] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # روابط تتجاوز حد الحجم، لا يُعاد طلبها لكل وجهة
+        self._too_large: Set[str] = set()
+        # حفظ الفهرس ونقل الملفات المنزلة وحذف المستبعدة يتم بالترتيب، حتى لا تكتب
+        # نسخة أقدم من الفهرس فوق أحدث ولا يُحذف ملف أعيد تنزيله بعد استبعاده
+        self._index_lock = asyncio.Lock()
+        self.total = 0
+        self._load()
+
+    def _load(self) -> None:
+        """قراءة الملفات الموجودة بترتيب آخر استخدام وفهرس الروابط"""
+        entries = []
+        for path in self.directory.iterdir():
+            if not path.is_file() or path.name.startswith(self.INDEX_FILE):
+                continue
+            if path.name.startswith('.'):
+                # تنزيل لم يكتمل قبل توقف عملية سابقة، أما تنزيلات العمليات
+                # الأخرى الحية التي تشارك المجلد (وضع WORKERS) فتبقى
+                if not self._writer_alive(path.name):
+                    path.unlink(missing_ok=True)
+                continue
+            stat = path.stat()
+            entries.append((stat.st_mtime, path.name, stat.st_size))
+        for _, name, size in sorted(entries):
+            self._files[name] = size
+            self.total += size
+
+        try:
+            with open(self.directory / self.INDEX_FILE, 'r', encoding='utf-8') as f:
+                self._urls = {url: name for url, name in json.load(f).items() if name in self._files}
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"تعذر قراءة فهرس الميديا: {e}")
+        evicted = self._evict()
+        if evicted:
+            self._write(evicted, dict(self._urls))
+
+    @staticmethod
+    def _writer_alive(name: str) -> bool:
+        """هل العملية التي كتبت الملف المؤقت .<pid>-<uuid>.part ما زالت تعمل"""
+        try:
+            pid = int(name[1:].split('-', 1)[0])
+        except ValueError:
+            return False
+        if pid == os.getpid():
+            # نفس الرقم لعملية سابقة انتهت، فهذه العملية لم تبدأ أي تنزيل بعد
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    @staticmethod
+    async def _run(func: Callable, *args):
+        """تنفيذ عملية ملفات في خيط منفصل حتى لا تتوقف حلقة الأحداث أثناءها"""
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    def _write(self, evicted: List[str], urls: Dict[str, str]) -> None:
+        """حذف الملفات المستبعدة وحفظ نسخة من فهرس الروابط (خارج حلقة الأحداث)"""
+        for name in evicted:
+            try:
+                (self.directory / name).unlink()
+            except OSError:
+                pass
+        tmp_path = self.directory / f"{self.INDEX_FILE}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(urls, f)
+            tmp_path.replace(self.directory / self.INDEX_FILE)
+        except Exception as e:
+            logger.warning(f"تعذر حفظ فهرس الميديا: {e}")
+
+    async def _persist(self, evicted: List[str]) -> None:
+        async with self._index_lock:
+            await self._flush(evicted)
+
+    async def _flush(self, evicted: List[str]) -> None:
+        """الحذف والحفظ مع حجز _index_lock (النسخة تؤخذ بعد القفل لتشمل كل ما تغير قبله)"""
+        # ملف استُبعد ثم نُقل إليه تنزيل بنفس المحتوى قبل حذفه يبقى
+        evicted = [name for name in evicted if name not in self._files]
+        await self._run(self._write, evicted, dict(self._urls))
+
+    async def _touch(self, name: str) -> None:
+        """نقل الملف إلى نهاية ترتيب LRU (و mtime ليبقى الترتيب بعد إعادة التشغيل)"""
+        self._files.move_to_end(name)
+        try:
+            await self._run(os.utime, self.directory / name)
+        except OSError:
+            pass
+
+    def _evict(self, keep: Optional[str] = None) -> List[str]:
+        """إخراج الأقدم استخداماً من الفهرس حتى يعود الحجم الكلي تحت الحد
+
+        ترجع أسماء الملفات المستبعدة ليحذفها المستدعي من القرص.
+        """
+        evicted = []
+        for name in list(self._files):
+            if self.total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            self.total -= self._files.pop(name)
+            evicted.append(name)
+        if evicted:
+            removed = set(evicted)
+            self._urls = {url: name for url, name in self._urls.items() if name not in removed}
+        metrics.MEDIA_CACHE_BYTES.set(self.total)
+        return evicted
+
+    async def resize(self, max_bytes: int, max_file_size: int) -> None:
+        """تغيير الحدود أثناء التشغيل مع حذف الزائد فوراً"""
+        self.max_bytes = max_bytes
+        self.max_file_size = max_file_size
+        self._too_large.clear()
+        evicted = self._evict()
+        if evicted:
+            await self._persist(evicted)
+
+    async def path(self, url: str) -> Optional[Path]:
+        """مسار الملف المخزن لرابط دون تنزيل"""
+        name = self._urls.get(url)
+        if not name or name not in self._files:
+            return None
+        path = self.directory / name
+        if not await self._run(path.exists):
+            # حذفته عملية أخرى تشارك نفس المجلد (وضع WORKERS)، أو استُبعد أثناء الفحص
+            self.total -= self._files.pop(name, 0)
+            self._urls.pop(url, None)
+            return None
+        return path
+
+    async def get(self, url: str) -> Optional[Path]:
+        """مسار الملف المحلي للرابط (None إذا فشل التنزيل أو تجاوز الحد)"""
+        path = await self.path(url)
+        if path is not None:
+            await self._touch(path.name)
+            metrics.MEDIA_CACHE_REQUESTS.inc("hit")
+            return path
+        if url in self._too_large:
+            return None
+
+        task = self._inflight.get(url)
+        if task is None:
+            task = asyncio.ensure_future(self._download(url))
+            self._inflight[url] = task
+            task.add_done_callback(lambda _: self._inflight.pop(url, None))
+        # إلغاء أحد المنتظرين لا يلغي التنزيل على الباقين
+        return await asyncio.shield(task)
+
+    def _suffix(self, url: str, content_type: str) -> str:
+        suffix = os.path.splitext(urlparse(url).path)[1]
+        if not suffix:
+            suffix = mimetypes.guess_extension(content_type.split(';')[0].strip()) or ""
+        return suffix.lower()
+
+    async def _download(self, url: str) -> Optional[Path]:
+        """تنزيل على دفعات إلى ملف مؤقت مع حساب البصمة أثناء الكتابة"""
+        tmp_path = self.directory / f".{os.getpid()}-{uuid.uuid4().hex}.part"
+        digest = hashlib.sha256()
+        size = 0
+        # الملفات الكبيرة قد تتجاوز المهلة الكلية للجلسة، لذلك المهلة لكل قراءة فقط
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=self.session.timeout.connect,
+                                        sock_read=self.session.timeout.total)
+        try:
+            async with self.session.get(url, timeout=timeout) as response:
+                if response.status != 200:
+                    logger.warning(f"تعذر تنزيل الميديا {url}: HTTP {response.status}")
+                    metrics.MEDIA_CACHE_REQUESTS.inc("error")
+                    return None
+                if response.content_length and response.content_length > self.max_file_size:
+                    self._too_large.add(url)
+                    metrics.MEDIA_CACHE_REQUESTS.inc("too_large")
+                    return None
+                f = await self._run(open, tmp_path, 'wb')
+                try:
+                    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                        size += len(chunk)
+                        if size > self.max_file_size:
+                            self._too_large.add(url)
+                            metrics.MEDIA_CACHE_REQUESTS.inc("too_large")
+                            return None
+                        digest.update(chunk)
+                        await self._run(f.write, chunk)
+                finally:
+                    await self._run(f.close)
+                suffix = self._suffix(url, response.headers.get('Content-Type', ''))
+
+            name = digest.hexdigest() + suffix
+            async with self._index_lock:
+                # نفس المحتوى من رابط آخر يُستبدل بنسخة مطابقة، والفهرس يُحدّث بعد
+                # النقل دون انتظار بين الفحص والإضافة
+                await self._run(tmp_path.replace, self.directory / name)
+                if name in self._files:
+                    self._files.move_to_end(name)
+                else:
+                    self._files[name] = size
+                    self.total += size
+                self._urls[url] = name
+                await self._flush(self._evict(keep=name))
+            metrics.MEDIA_CACHE_REQUESTS.inc("miss")
+            return self.directory / name
+        except Exception as e:
+            logger.warning(f"تعذر تنزيل الميديا {url}: {e or type(e).__name__}")
+            metrics.MEDIA_CACHE_REQUESTS.inc("error")
+            return None
+        finally:
+            await self._run(partial(tmp_path.unlink, missing_ok=True))
+
+    async def first(self, urls: List[str]) -> Optional[Path]:
+        """أول رابط ينجح تنزيله ضمن الحد (مثلاً جودات الفيديو من الأعلى للأقل)"""
+        for url in urls:
+            path = await self.get(url)
+            if path is not None:
+                return path
+        return None
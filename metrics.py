@@ -0,0 +1,244 @@
+"""
+مقاييس Prometheus للبوت
+سجل مقاييس بسيط بصيغة Prometheus النصية مع خادم aiohttp على المنفذ 8000
+"""
+
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _number(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric(ABC):
+    """أساس المقاييس: اسم ووصف وأسماء labels"""
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    @abstractmethod
+    def render(self) -> List[str]:
+        """أسطر القيم بصيغة Prometheus النصية (دون HELP و TYPE)"""
+
+class Counter(Metric):
+    """عداد متزايد فقط"""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        key = tuple(str(value) for value in label_values)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_labels(self.label_names, key)} {_number(value)}"
+                for key, value in self.values.items()]
+
+class Gauge(Metric):
+    """قيمة لحظية يمكن أن ترتفع وتنخفض"""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, *label_values: str) -> None:
+        self.values[tuple(str(label) for label in label_values)] = value
+
+    def clear(self) -> None:
+        self.values.clear()
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_labels(self.label_names, key)} {_number(value)}"
+                for key, value in self.values.items()]
+
+class Histogram(Metric):
+    """توزيع القيم على حدود ثابتة (buckets) مع المجموع والعدد"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        # labels -> (عدد كل bucket، المجموع)
+        self.values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        key = tuple(str(label) for label in label_values)
+        entry = self.values.get(key)
+        if entry is None:
+            entry = self.values[key] = ([0] * len(self.buckets), [0.0])
+        counts, total = entry
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        total[0] += value
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(total[0])}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+class Registry:
+    """مجموعة المقاييس مع دوال تُحدّث القيم اللحظية قبل كل قراءة"""
+
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        self.collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        self.collectors.append(collector)
+
+    def remove_collector(self, collector: Callable[[], None]) -> None:
+        if collector in self.collectors:
+            self.collectors.remove(collector)
+
+    def render(self) -> str:
+        for collector in list(self.collectors):
+            try:
+                collector()
+            except Exception as e:
+                logger.error(f"خطأ في جمع المقاييس: {e}")
+        lines: List[str] = []
+        for metric in self.metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+POLL_SECONDS = REGISTRY.register(Histogram(
+    "twitter_bridge_poll_duration_seconds", "Duration of one poll job (account or search chunk)", ["job"]))
+TWEETS_DELIVERED = REGISTRY.register(Counter(
+    "twitter_bridge_tweets_delivered_total", "Tweets delivered to Discord", ["account", "webhook"]))
+DISCORD_SEND_SECONDS = REGISTRY.register(Histogram(
+    "twitter_bridge_discord_send_seconds", "Latency of Discord webhook requests", ["webhook"]))
+DISCORD_RESPONSES = REGISTRY.register(Counter(
+    "twitter_bridge_discord_responses_total", "Discord webhook responses by status code", ["webhook", "status"]))
+DELIVERY_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "twitter_bridge_delivery_queue_depth", "Messages waiting in the delivery queue", ["webhook"]))
+BACKFILL_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "twitter_bridge_backfill_queue_depth", "Recovered tweets waiting behind live messages", ["webhook"]))
+BACKFILL_TWEETS = REGISTRY.register(Counter(
+    "twitter_bridge_backfill_tweets_total", "Tweets recovered from timeline pages older than the first one", ["account"]))
+TWEETS_DROPPED = REGISTRY.register(Counter(
+    "twitter_bridge_tweets_dropped_total", "Tweets dropped by routing rules", ["account"]))
+MESSAGES_REFRESHED = REGISTRY.register(Counter(
+    "twitter_bridge_messages_refreshed_total", "Posted Discord messages edited or deleted after a refresh", ["action"]))
+OUTBOX_PENDING = REGISTRY.register(Gauge(
+    "twitter_bridge_outbox_pending", "Unacknowledged messages in the on-disk outbox"))
+RATE_LIMIT_REMAINING = REGISTRY.register(Gauge(
+    "twitter_bridge_twitter_rate_limit_remaining", "Remaining Twitter requests in the current window", ["endpoint"]))
+RATE_LIMIT_LIMIT = REGISTRY.register(Gauge(
+    "twitter_bridge_twitter_rate_limit_limit", "Twitter request limit per window", ["endpoint"]))
+RATE_LIMIT_RESET = REGISTRY.register(Gauge(
+    "twitter_bridge_twitter_rate_limit_reset_timestamp_seconds", "Unix time when the Twitter window resets", ["endpoint"]))
+RATE_LIMIT_BLOCKED = REGISTRY.register(Gauge(
+    "twitter_bridge_twitter_rate_limit_blocked_seconds", "Seconds until a rate-limited endpoint is retried", ["endpoint"]))
+TRACKER_IDS = REGISTRY.register(Gauge(
+    "twitter_bridge_tracker_ids", "Sent tweet IDs held in memory for deduplication"))
+TRACKER_STORED = REGISTRY.register(Gauge(
+    "twitter_bridge_tracker_stored", "Sent tweet rows in the state store"))
+STREAM_CONNECTED = REGISTRY.register(Gauge(
+    "twitter_bridge_stream_connected", "1 while the Twitter filtered stream is connected"))
+STREAM_RECONNECTS = REGISTRY.register(Counter(
+    "twitter_bridge_stream_disconnects_total", "Filtered stream connections that dropped"))
+MEDIA_CACHE_BYTES = REGISTRY.register(Gauge(
+    "twitter_bridge_media_cache_bytes", "Size of the on-disk media cache"))
+MEDIA_CACHE_REQUESTS = REGISTRY.register(Counter(
+    "twitter_bridge_media_cache_requests_total", "Media lookups by result (hit, miss, too_large, error)", ["result"]))
+LOOP_LAG_SECONDS = REGISTRY.register(Gauge(
+    "twitter_bridge_event_loop_lag_seconds", "Most recent event-loop scheduling lag"))
+LOOP_LAG = REGISTRY.register(Histogram(
+    "twitter_bridge_event_loop_lag_distribution_seconds", "Distribution of event-loop scheduling lag",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)))
+
+async def monitor_loop_lag(interval: float = 0.5) -> None:
+    """قياس تأخر حلقة الأحداث: الفرق بين موعد الاستيقاظ المتوقع والفعلي"""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - expected)
+        LOOP_LAG_SECONDS.set(lag)
+        LOOP_LAG.observe(lag)
+
+class MetricsServer:
+    """خادم HTTP داخل البوت يعرض /metrics بصيغة Prometheus"""
+
+    def __init__(self, host: str = "0.0.0.0", port: int = 8000, registry: Registry = REGISTRY):
+        self.host = host
+        self.port = port
+        self.registry = registry
+        self._runner: Optional[web.AppRunner] = None
+        self._lag_task: Optional[asyncio.Task] = None
+
+    async def _metrics(self, request: web.Request) -> web.Response:
+        started = time.perf_counter()
+        body = self.registry.render()
+        logger.debug(f"تم تجهيز المقاييس في {(time.perf_counter() - started) * 1000:.1f}ms")
+        return web.Response(text=body, content_type="text/plain", charset="utf-8",
+                            headers={"X-Content-Type-Options": "nosniff"})
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get('/metrics', self._metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        try:
+            await web.TCPSite(self._runner, self.host, self.port).start()
+        except OSError as e:
+            # البوت يستمر في العمل حتى لو كان المنفذ مستخدماً
+            logger.error(f"تعذر تشغيل خادم المقاييس على المنفذ {self.port}: {e}")
+            await self._runner.cleanup()
+            self._runner = None
+            return
+        self._lag_task = asyncio.create_task(monitor_loop_lag())
+        logger.info(f"المقاييس متاحة على http://{self.host}:{self.port}/metrics")
+
+    async def stop(self) -> None:
+        if self._lag_task:
+            self._lag_task.cancel()
+            self._lag_task = None
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,150 @@
+"""
+صندوق الصادر (outbox) الدائم للرسائل المنتظرة
+كل رسالة تُضاف للطابور تُكتب أولاً في ملف JSONL وتُؤكد بعد وصولها إلى Discord
+"""
+
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from delivery import DeliveryJob
+
+logger = logging.getLogger(__name__)
+
+class Outbox:
+    """سجل إضافة فقط (append-only) مع fsync مجمّع وإعادة تشغيل عند البدء
+
+    السجل يحتوي على سطرين لكل رسالة: "add" عند دخولها الطابور و "ack" عند
+    وصولها أو إسقاطها. ما لم يُؤكد عند البدء يعاد إرساله دون جلب من تويتر.
+    """
+
+    COMPACT_AFTER = 1000
+
+    def __init__(self, data_dir: str, commit_batch: int = 50, commit_interval: float = 1.0):
+        self.file_path = Path(data_dir) / "outbox.jsonl"
+        self.commit_batch = max(1, commit_batch)
+        self.commit_interval = max(0.0, commit_interval)
+        self.entries: Dict[Tuple[str, str, str], Dict] = {}
+        self._unsynced = 0
+        self._first_unsynced_at = 0.0
+        self._records = 0
+
+        self._load()
+        # إعادة كتابة الملف بما تبقى فقط قبل فتحه للإضافة
+        self._compact()
+        self._file = open(self.file_path, 'a', encoding='utf-8')
+
+    @staticmethod
+    def _key(record: Dict) -> Tuple[str, str, str]:
+        return (record.get('destination', ''), record['account'], record['tweet_id'])
+
+    def _load(self) -> None:
+        """قراءة السجل واستخراج الرسائل غير المؤكدة بترتيبها الأصلي"""
+        if not self.file_path.exists():
+            return
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # السطر الأخير قد يكون ناقصاً إذا توقف البوت أثناء الكتابة
+                        continue
+                    if record.get('op') == 'add':
+                        self.entries[self._key(record)] = record
+                    elif record.get('op') == 'ack':
+                        self.entries.pop(self._key(record), None)
+        except Exception as e:
+            logger.error(f"خطأ في قراءة صندوق الصادر: {e}")
+
+    def _compact(self) -> None:
+        """استبدال السجل بالرسائل غير المؤكدة فقط (ملف مؤقت ثم استبدال)"""
+        tmp_path = self.file_path.with_suffix('.jsonl.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for record in self.entries.values():
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            tmp_path.replace(self.file_path)
+            self._records = len(self.entries)
+        except Exception as e:
+            logger.error(f"خطأ في ضغط صندوق الصادر: {e}")
+
+    def _write(self, record: Dict) -> None:
+        if not self._unsynced:
+            self._first_unsynced_at = time.monotonic()
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._unsynced += 1
+        self._records += 1
+
+        # fsync عند امتلاء الدفعة أو مرور فترة الحفظ
+        if (self._unsynced >= self.commit_batch or
+                time.monotonic() - self._first_unsynced_at >= self.commit_interval):
+            self.flush()
+
+    def append(self, job: DeliveryJob) -> None:
+        """تسجيل رسالة دخلت الطابور"""
+        record = {
+            'op': 'add',
+            'destination': job.destination,
+            'account': job.account,
+            'tweet_id': job.tweet_id,
+            'payload': job.payload,
+            'tweet': job.tweet,
+            'queued_at': time.time()
+        }
+        if job.backfill:
+            record['backfill'] = True
+        self.entries[self._key(record)] = record
+        self._write(record)
+
+    def ack(self, job: DeliveryJob) -> None:
+        """تأكيد انتهاء رسالة (وصلت أو أُسقطت نهائياً)"""
+        record = {'op': 'ack', 'destination': job.destination, 'account': job.account, 'tweet_id': job.tweet_id}
+        if self.entries.pop(self._key(record), None) is None:
+            return
+        self._write(record)
+
+        # السجل لا يكبر بلا حد: يُضغط عندما لا توجد رسائل منتظرة
+        if not self.entries and self._records >= self.COMPACT_AFTER:
+            self._file.close()
+            self._compact()
+            self._file = open(self.file_path, 'a', encoding='utf-8')
+            self._unsynced = 0
+
+    def pending(self) -> List[DeliveryJob]:
+        """الرسائل غير المؤكدة بترتيب إضافتها"""
+        return [
+            DeliveryJob(
+                record['account'],
+                record['tweet_id'],
+                record['payload'],
+                record.get('tweet', {}),
+                record.get('destination', ''),
+                record.get('backfill', False)
+            )
+            for record in self.entries.values()
+        ]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def flush(self) -> None:
+        """كتابة السجلات المعلقة على القرص"""
+        if not self._unsynced:
+            return
+        try:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except Exception as e:
+            logger.error(f"خطأ في حفظ صندوق الصادر: {e}")
+        self._unsynced = 0
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
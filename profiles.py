@@ -0,0 +1,73 @@
+"""
+ذاكرة تخزين مؤقت لمعلومات حسابات تويتر
+تُحفظ في data_dir حتى لا تُستهلك طلبات البحث عن المستخدمين عند كل تشغيل
+"""
+
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class ProfileCache:
+    """تخزين مؤقت لمعلومات المستخدمين مع مدة صلاحية (TTL)"""
+
+    def __init__(self, data_dir: str, ttl: int = 86400):
+        self.file_path = Path(data_dir) / "user_profiles.json"
+        self.ttl = ttl
+        self.entries: Dict[str, Dict] = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        """تحميل الذاكرة المؤقتة من الملف"""
+        try:
+            if self.file_path.exists():
+                with open(self.file_path, 'r', encoding='utf-8') as f:
+                    return json.load(f).get('profiles', {})
+        except Exception as e:
+            logger.error(f"خطأ في تحميل ذاكرة الحسابات المؤقتة: {e}")
+        return {}
+
+    def save(self) -> None:
+        """حفظ الذاكرة المؤقتة بشكل آمن (ملف مؤقت ثم استبدال)"""
+        # اسم مؤقت لكل عملية حتى لا تتداخل الكتابة في وضع WORKERS
+        tmp_path = self.file_path.with_suffix(f'.json.{os.getpid()}.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'profiles': self.entries}, f, ensure_ascii=False)
+            tmp_path.replace(self.file_path)
+        except Exception as e:
+            logger.error(f"خطأ في حفظ ذاكرة الحسابات المؤقتة: {e}")
+
+    def get(self, username: str) -> Optional[Dict]:
+        """معلومات الحساب المخزنة حتى لو انتهت صلاحيتها"""
+        entry = self.entries.get(username.lower())
+        return entry['data'] if entry else None
+
+    def is_fresh(self, username: str) -> bool:
+        entry = self.entries.get(username.lower())
+        return bool(entry) and time.time() - entry['fetched_at'] < self.ttl
+
+    def stale(self, usernames: Iterable[str]) -> List[str]:
+        """الحسابات غير الموجودة أو منتهية الصلاحية"""
+        return [username for username in usernames if not self.is_fresh(username)]
+
+    def next_expiry(self, usernames: Iterable[str]) -> float:
+        """عدد الثواني حتى انتهاء صلاحية أقرب حساب"""
+        now = time.time()
+        expiries = [
+            self.entries[username.lower()]['fetched_at'] + self.ttl - now
+            for username in usernames if username.lower() in self.entries
+        ]
+        return max(0.0, min(expiries)) if expiries else 0.0
+
+    def update(self, profiles: Dict[str, Dict]) -> None:
+        """تحديث معلومات عدة حسابات وحفظها"""
+        if not profiles:
+            return
+        now = time.time()
+        for username, data in profiles.items():
+            self.entries[username.lower()] = {'data': data, 'fetched_at': now}
+        self.save()
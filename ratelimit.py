@@ -0,0 +1,123 @@
+"""
+محدد معدل الطلبات لكل endpoint في Twitter API
+يعتمد على ترويسات x-rate-limit-* لتوزيع الطلبات المتبقية على نافذة الحد
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+class RateLimitDeferred(Exception):
+    """الطلب يحتاج انتظاراً أطول من المسموح، فيؤجله المستدعي بدلاً من النوم داخله"""
+
+    def __init__(self, endpoint: str, retry_after: float):
+        super().__init__(f"{endpoint} مؤجل لمدة {retry_after:.0f} ثانية بسبب Rate Limit")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+@dataclass
+class EndpointBucket:
+    """حالة الحد لـ endpoint واحد"""
+    limit: Optional[int] = None
+    remaining: Optional[int] = None
+    reset_at: float = 0.0
+    blocked_until: float = 0.0
+    next_allowed: float = 0.0
+
+class EndpointRateLimiter:
+    """token bucket لكل endpoint يتغذى من ترويسات كل استجابة
+
+    الطلبات المتبقية تُوزع بالتساوي على الوقت المتبقي حتى إعادة التجديد، لذلك
+    لا يتم استهلاك الحد بالكامل في بداية النافذة ثم الانتظار حتى نهايتها.
+    """
+
+    def __init__(self, default_block: float = 900, safety_margin: float = 1.0):
+        self.default_block = default_block
+        self.safety_margin = safety_margin
+        self.buckets: Dict[str, EndpointBucket] = {}
+
+    def _bucket(self, endpoint: str) -> EndpointBucket:
+        bucket = self.buckets.get(endpoint)
+        if bucket is None:
+            bucket = self.buckets[endpoint] = EndpointBucket()
+        return bucket
+
+    def update(self, endpoint: str, headers: Mapping[str, str]) -> None:
+        """تحديث حالة الـ endpoint من ترويسات الاستجابة"""
+        bucket = self._bucket(endpoint)
+        try:
+            if headers.get('x-rate-limit-limit') is not None:
+                bucket.limit = int(headers['x-rate-limit-limit'])
+            if headers.get('x-rate-limit-remaining') is not None:
+                bucket.remaining = int(headers['x-rate-limit-remaining'])
+            if headers.get('x-rate-limit-reset') is not None:
+                bucket.reset_at = float(headers['x-rate-limit-reset'])
+        except (ValueError, TypeError):
+            return
+
+    def on_429(self, endpoint: str, headers: Mapping[str, str]) -> float:
+        """تسجيل تجاوز الحد وإرجاع مدة التأجيل لهذا الـ endpoint فقط"""
+        self.update(endpoint, headers)
+        bucket = self._bucket(endpoint)
+        now = time.time()
+        if bucket.reset_at > now:
+            bucket.blocked_until = bucket.reset_at + self.safety_margin
+        else:
+            bucket.blocked_until = now + self.default_block
+        bucket.remaining = 0
+        return bucket.blocked_until - now
+
+    def delay(self, endpoint: str) -> float:
+        """عدد الثواني حتى يُسمح بالطلب التالي على هذا الـ endpoint"""
+        bucket = self.buckets.get(endpoint)
+        if bucket is None:
+            return 0.0
+
+        now = time.time()
+        if bucket.blocked_until > now:
+            return bucket.blocked_until - now
+        if bucket.reset_at <= now:
+            # بدأت نافذة جديدة ولم تصل ترويسات بعد
+            return max(0.0, bucket.next_allowed - now)
+        if bucket.remaining is not None and bucket.remaining <= 0:
+            return bucket.reset_at + self.safety_margin - now
+        return max(0.0, bucket.next_allowed - now)
+
+    async def acquire(self, endpoint: str, max_wait: Optional[float] = 5.0) -> None:
+        """انتظار الموعد المسموح ثم حجز طلب من الرصيد
+
+        إذا تجاوز الانتظار max_wait (الحظر أو انتهاء الرصيد حتى نهاية النافذة) يُرفع
+        RateLimitDeferred دون حجز، حتى لا تبقى المهمة نائمة وهي تحجز مكاناً في حد
+        التوازي. None يعني الانتظار مهما طال (للمهام المستقلة مثل الـ stream).
+        """
+        wait = self.delay(endpoint)
+        if max_wait is not None and wait > max_wait:
+            raise RateLimitDeferred(endpoint, wait)
+        if wait > 0:
+            logger.debug(f"تنظيم معدل {endpoint}: انتظار {wait:.1f} ثانية")
+            await asyncio.sleep(wait)
+
+        bucket = self._bucket(endpoint)
+        now = time.time()
+        if bucket.remaining is not None and bucket.reset_at > now:
+            bucket.remaining = max(0, bucket.remaining - 1)
+            # توزيع الطلبات المتبقية على ما تبقى من النافذة
+            bucket.next_allowed = now + (bucket.reset_at - now) / max(1, bucket.remaining + 1)
+        else:
+            bucket.next_allowed = now
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """حالة كل endpoint (للسجلات والمراقبة)"""
+        return {
+            endpoint: {
+                'limit': bucket.limit,
+                'remaining': bucket.remaining,
+                'reset_at': bucket.reset_at,
+                'blocked_for': max(0.0, bucket.blocked_until - time.time())
+            }
+            for endpoint, bucket in self.buckets.items()
+        }
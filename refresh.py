@@ -0,0 +1,200 @@
+"""
+تحديث رسائل Discord بعد إرسالها
+إحصائيات التغريدات (الإعجابات، الريتويت، الردود) تُحدث دورياً، والتغريدات المحذوفة
+من تويتر تُحذف رسائلها، مع جلب التغريدات على دفعات من 100 بطلب واحد لكل دفعة
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import metrics
+from delivery import DeliveryJob, DeliveryResult
+from render import update_stats
+from storage import StateStore
+
+logger = logging.getLogger(__name__)
+
+# أقصى عدد معرفات في طلب /2/tweets?ids=
+LOOKUP_BATCH = 100
+
+# الحقول التي يقبلها Discord عند تعديل embed (ما يضيفه هو مثل proxy_url يُحذف)
+EMBED_KEYS = {
+    'title': None, 'description': None, 'url': None, 'color': None, 'timestamp': None, 'fields': None,
+    'author': ('name', 'url', 'icon_url'),
+    'footer': ('text', 'icon_url'),
+    'image': ('url',),
+    'thumbnail': ('url',)
+}
+
+METRIC_KEYS = ('like_count', 'retweet_count', 'reply_count')
+
+Lookup = Callable[[List[str]], Awaitable[Optional[Tuple[Dict[str, Dict], Set[str]]]]]
+
+def editable_embed(embed: Dict) -> Dict:
+    """embed كما أرجعه Discord بالحقول القابلة للإرسال فقط"""
+    clean = {}
+    for key, allowed in EMBED_KEYS.items():
+        if key not in embed:
+            continue
+        clean[key] = {name: value for name, value in embed[key].items() if name in allowed} if allowed else embed[key]
+    return clean
+
+def message_record(jobs: List[DeliveryJob], payload: Dict, message: Optional[Dict]) -> Tuple[Dict, List[Dict]]:
+    """محتوى الرسالة وتغريداتها كما تُحفظ: موضع أول embed لكل تغريدة وعدده وإحصائياتها
+
+    الـ embeds تؤخذ من رد Discord إن وُجد لأن روابط المرفقات فيه أصبحت روابط CDN.
+    """
+    message = message or {}
+    embeds = message.get('embeds') or payload.get('embeds', [])
+    tweets, index = [], 0
+    for job in jobs:
+        count = len(job.payload.get('embeds', []))
+        tweets.append({
+            'id': job.tweet_id,
+            'index': index,
+            'count': count,
+            'metrics': job.tweet.get('public_metrics', {})
+        })
+        index += count
+    return {
+        'content': message.get('content', payload.get('content', '')),
+        'embeds': [editable_embed(embed) for embed in embeds]
+    }, tweets
+
+def meaningful_change(before: Dict, after: Dict, min_change: float) -> bool:
+    """تغير أي إحصائية بنسبة min_change على الأقل (أو من صفر)"""
+    for key in METRIC_KEYS:
+        old, new = before.get(key, 0), after.get(key, 0)
+        if abs(new - old) >= max(1, old * min_change):
+            return True
+    return False
+
+class MessageRefresher:
+    """مهمة خلفية تعدل الرسائل الحديثة أو تحذفها حسب حالة تغريداتها في تويتر
+
+    الرسائل المدمجة (عدة تغريدات) يُحذف منها embed التغريدة المحذوفة فقط، وتُحذف
+    الرسالة كاملة عندما لا يبقى فيها شيء.
+    """
+
+    def __init__(self, store: StateStore, lookup: Lookup,
+                 edit: Callable[[str, str, Dict], Awaitable[DeliveryResult]],
+                 delete: Callable[[str, str], Awaitable[DeliveryResult]],
+                 interval: float = 0.0, window: float = 86400.0, min_change: float = 0.1):
+        self.store = store
+        self.lookup = lookup
+        self.edit = edit
+        self.delete = delete
+        self.interval = interval
+        self.window = window
+        self.min_change = min_change
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    async def run(self) -> None:
+        """حلقة التحديث (تعطيلها بـ interval=0 أثناء التشغيل يوقف الطلبات فقط)"""
+        while True:
+            await asyncio.sleep(self.interval if self.enabled else 60)
+            if not self.enabled:
+                continue
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"خطأ في تحديث رسائل Discord: {e}")
+
+    async def _lookup_all(self, ids: List[str]) -> Optional[Tuple[Dict[str, Dict], Set[str]]]:
+        found: Dict[str, Dict] = {}
+        deleted: Set[str] = set()
+        for start in range(0, len(ids), LOOKUP_BATCH):
+            result = await self.lookup(ids[start:start + LOOKUP_BATCH])
+            if result is None:
+                # بدون نتيجة كاملة لا يُعدل شيء، فلا تُحذف رسالة بسبب خطأ مؤقت
+                return None
+            found.update(result[0])
+            deleted |= result[1]
+        return found, deleted
+
+    def _apply(self, payload: Dict, tweets: List[Dict], found: Dict[str, Dict],
+               deleted: Set[str]) -> Tuple[Dict, List[Dict], bool]:
+        """الرسالة بعد حذف التغريدات المحذوفة وتحديث الإحصائيات المتغيرة"""
+        embeds = payload.get('embeds', [])
+        lines = (payload.get('content') or '').split('\n')
+        kept: List[Dict] = []
+        new_embeds: List[Dict] = []
+        changed = False
+        for tweet in tweets:
+            part = embeds[tweet['index']:tweet['index'] + tweet['count']]
+            if tweet['id'] in deleted:
+                lines = [line for line in lines if f"/status/{tweet['id']})" not in line]
+                changed = True
+                continue
+            current = (found.get(tweet['id']) or {}).get('public_metrics')
+            if part and current and meaningful_change(tweet['metrics'], current, self.min_change):
+                updated = update_stats(part[0], current)
+                # تغير لا يظهر في الأرقام المختصرة (1.2K) لا يستحق طلب تعديل
+                if updated != part[0]:
+                    part = [updated] + part[1:]
+                    tweet = {**tweet, 'metrics': current}
+                    changed = True
+            kept.append({**tweet, 'index': len(new_embeds)})
+            new_embeds.extend(part)
+        return {'content': '\n'.join(lines), 'embeds': new_embeds}, kept, changed
+
+    @staticmethod
+    async def _call(request: Callable[[], Awaitable[DeliveryResult]]) -> DeliveryResult:
+        """طلب تعديل أو حذف مع الالتزام بحد Discord للـ webhook"""
+        for _ in range(3):
+            result = await request()
+            if result.status != 429:
+                if result.remaining == 0 and result.reset_after:
+                    await asyncio.sleep(result.reset_after)
+                return result
+            await asyncio.sleep(result.retry_after or result.reset_after or 1.0)
+        return result
+
+    async def refresh(self) -> None:
+        """دورة واحدة: جلب التغريدات الحديثة ثم تعديل أو حذف ما تغير"""
+        since = time.time() - self.window
+        self.store.prune_messages(since)
+        messages = self.store.recent_messages(since)
+        if not messages:
+            return
+        ids = list(dict.fromkeys(tweet['id'] for *_, tweets in messages for tweet in tweets))
+        result = await self._lookup_all(ids)
+        if result is None:
+            return
+        found, deleted = result
+
+        edited = removed = 0
+        for destination, message_id, payload, tweets in messages:
+            body, kept, changed = self._apply(payload, tweets, found, deleted)
+            if not changed:
+                continue
+            if kept:
+                # تعديل الرسالة لا يعيد المنشن، لكن allowed_mentions فارغ احتياطاً
+                request = {**body, 'allowed_mentions': {'parse': []}}
+                response = await self._call(lambda: self.edit(destination, message_id, request))
+            else:
+                response = await self._call(lambda: self.delete(destination, message_id))
+
+            if response.status == 404:
+                # حُذفت الرسالة يدوياً أو أُزيل الـ webhook
+                self.store.delete_message(destination, message_id)
+            elif not response.ok:
+                logger.warning(f"تعذر تحديث الرسالة {message_id}: {response.error or response.status}")
+            elif kept:
+                self.store.update_message(destination, message_id, body, kept)
+                metrics.MESSAGES_REFRESHED.inc("edited")
+                edited += 1
+            else:
+                self.store.delete_message(destination, message_id)
+                metrics.MESSAGES_REFRESHED.inc("deleted")
+                removed += 1
+
+        if edited or removed:
+            logger.info(f"تحديث رسائل Discord: {edited} معدلة، {removed} محذوفة (من {len(messages)} رسالة و {len(ids)} تغريدة)")
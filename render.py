@@ -0,0 +1,227 @@
+"""
+تنسيق رسائل التغريدات لديسكورد
+الأجزاء الثابتة لكل حساب (المؤلف، الصورة، العنوان) تُحسب مرة واحدة وتُعاد عند تغير معلومات الحساب
+"""
+
+import os
+import re
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+TCO_LINK_RE = re.compile(r'https://t\.co/\w+')
+WHITESPACE_RE = re.compile(r'\s+')
+
+TWITTER_ICON_URL = "https://abs.twimg.com/icons/apple-touch-icon-192x192.png"
+
+def format_numbers(num: int) -> str:
+    """تنسيق الأرقام بشكل جميل"""
+    if num >= 1000000:
+        return f"{num/1000000:.1f}M"
+    elif num >= 1000:
+        return f"{num/1000:.1f}K"
+    return str(num)
+
+def format_timestamp(created_at: str) -> str:
+    """تنسيق الوقت"""
+    try:
+        dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+        return dt.strftime("%Y-%m-%d %H:%M:%S UTC")
+    except (ValueError, AttributeError):
+        return created_at
+
+def clean_tweet_text(text: str, max_length: int = 2000) -> str:
+    """تنظيف نص التغريدة من الروابط القصيرة"""
+    # إزالة روابط t.co
+    text = TCO_LINK_RE.sub('', text)
+    # إزالة المسافات الإضافية
+    text = WHITESPACE_RE.sub(' ', text).strip()
+    # قطع النص إذا كان طويلاً
+    if len(text) > max_length:
+        text = text[:max_length-3] + "..."
+    return text
+
+def upload_candidates(tweet_data: dict, media_info: dict) -> List[Dict]:
+    """ميديا التغريدة القابلة للرفع كمرفقات: الصور، وجودات mp4 للفيديو و GIF من الأعلى للأقل"""
+    uploads = []
+    for media_key in tweet_data.get('attachments', {}).get('media_keys', []):
+        media = media_info.get(media_key)
+        if not media:
+            continue
+        if media.get('type') == 'photo':
+            urls = [media['url']] if media.get('url') else []
+        else:
+            variants = [variant for variant in media.get('variants', [])
+                        if variant.get('content_type') == 'video/mp4' and variant.get('url')]
+            variants.sort(key=lambda variant: variant.get('bit_rate', 0), reverse=True)
+            urls = [variant['url'] for variant in variants]
+        if not urls:
+            continue
+        suffix = os.path.splitext(urlparse(urls[0]).path)[1] or ('.jpg' if media['type'] == 'photo' else '.mp4')
+        uploads.append({
+            "urls": urls,
+            # اسم المرفق فريد داخل الرسالة حتى بعد دمج عدة تغريدات
+            "filename": f"{media_key}{suffix}",
+            "type": media['type'],
+            "description": media.get('alt_text'),
+            "preview": media.get('preview_image_url')
+        })
+    return uploads
+
+STATS_FIELD_NAME = "📊 الإحصائيات"
+
+def stats_field(metrics: Optional[dict]) -> Optional[Dict]:
+    """حقل الإحصائيات في الـ embed (None إذا كانت كلها صفراً)"""
+    if not metrics:
+        return None
+    stats_text = []
+    if metrics.get('like_count', 0) > 0:
+        stats_text.append(f"❤️ {format_numbers(metrics['like_count'])}")
+    if metrics.get('retweet_count', 0) > 0:
+        stats_text.append(f"🔄 {format_numbers(metrics['retweet_count'])}")
+    if metrics.get('reply_count', 0) > 0:
+        stats_text.append(f"💬 {format_numbers(metrics['reply_count'])}")
+    if not stats_text:
+        return None
+    return {
+        "name": STATS_FIELD_NAME,
+        "value": " • ".join(stats_text),
+        "inline": True
+    }
+
+def update_stats(embed: Dict, metrics: dict) -> Dict:
+    """نسخة من embed مرسل مع حقل إحصائيات محدث (أول الحقول كما في create_embed)"""
+    fields = [item for item in embed.get('fields') or [] if item.get('name') != STATS_FIELD_NAME]
+    stats = stats_field(metrics)
+    if stats:
+        fields.insert(0, stats)
+    return {**embed, "fields": fields}
+
+class EmbedRenderer:
+    """تنسيق رسائل التغريدات مع تخزين الأجزاء الثابتة لكل حساب"""
+
+    def __init__(self, mention_everyone: bool = True, upload_media: bool = False):
+        self.mention_everyone = mention_everyone
+        self.upload_media = upload_media
+        # اسم المستخدم -> (بصمة معلومات الحساب، الأجزاء الثابتة)
+        self._accounts: Dict[str, Tuple[tuple, Dict]] = {}
+
+    @staticmethod
+    def _fingerprint(user_info: Optional[dict]) -> tuple:
+        if not user_info:
+            return ()
+        return (user_info.get('name'), user_info.get('profile_image_url'), user_info.get('verified'))
+
+    def invalidate(self, username: Optional[str] = None) -> None:
+        """حذف الأجزاء المخزنة لحساب واحد أو لكل الحسابات"""
+        if username is None:
+            self._accounts.clear()
+        else:
+            self._accounts.pop(username, None)
+
+    def _static_parts(self, username: str, user_info: Optional[dict]) -> Dict:
+        """الأجزاء التي لا تتغير إلا بتغير معلومات الحساب"""
+        fingerprint = self._fingerprint(user_info)
+        cached = self._accounts.get(username)
+        if cached and cached[0] == fingerprint:
+            return cached[1]
+
+        user_info = user_info or {}
+        display_name = user_info.get('name', username)
+        profile_image_url = user_info.get('profile_image_url')
+        verified_badge = " ✅" if user_info.get('verified') else ""
+        parts = {
+            'author_name': f"{display_name} (@{username})",
+            'author_url': f"https://twitter.com/{username}",
+            'author_icon': profile_image_url.replace('_normal', '_400x400') if profile_image_url else None,
+            'headline': f"**{display_name}**{verified_badge} غرد للتو!",
+            'status_prefix': f"https://twitter.com/{username}/status/"
+        }
+        self._accounts[username] = (fingerprint, parts)
+        return parts
+
+    def create_embed(self, tweet_data: dict, username: str, user_info: dict, media_info: dict,
+                     max_length: int = 2000, is_startup: bool = False) -> dict:
+        """إنشاء embed احترافي للتغريدة"""
+        parts = self._static_parts(username, user_info)
+        tweet_text = clean_tweet_text(tweet_data.get('text', ''), max_length)
+        created_at = tweet_data.get('created_at', '')
+        metrics = tweet_data.get('public_metrics', {})
+
+        embed = {
+            "title": "🎯 فحص أولي - تغريدة" if is_startup else "🐦 تغريدة جديدة",
+            "description": tweet_text[:2000] if tweet_text else "_بدون نص_",
+            "url": parts['status_prefix'] + tweet_data['id'],
+            "color": 0x00FF00 if is_startup else 0x1DA1F2,
+            "timestamp": created_at,
+            "author": {
+                "name": parts['author_name'],
+                "url": parts['author_url'],
+                "icon_url": parts['author_icon']
+            },
+            "footer": {
+                "text": f"Twitter • {format_timestamp(created_at)}",
+                "icon_url": TWITTER_ICON_URL
+            },
+            "fields": []
+        }
+
+        # إضافة الإحصائيات
+        stats = stats_field(metrics)
+        if stats:
+            embed["fields"].append(stats)
+
+        # إضافة الهاشتاغات إذا وُجدت
+        hashtags = tweet_data.get('entities', {}).get('hashtags')
+        if hashtags and len(hashtags) <= 5:
+            embed["fields"].append({
+                "name": "🏷️ الهاشتاغات",
+                "value": " ".join(f"#{tag['tag']}" for tag in hashtags),
+                "inline": True
+            })
+
+        # معالجة الميديا المرفقة: أول عنصر فقط يظهر كصورة رئيسية
+        media_keys = tweet_data.get('attachments', {}).get('media_keys')
+        if media_keys and media_keys[0] in media_info:
+            media = media_info[media_keys[0]]
+            media_type = media.get('type', '')
+            if media_type == 'photo':
+                embed["image"] = {"url": media.get('url', '')}
+            elif media_type == 'video' and media.get('preview_image_url'):
+                # للفيديو: استخدام preview image
+                embed["image"] = {"url": media['preview_image_url']}
+
+        return embed
+
+    def render_message(self, tweet_data: dict, username: str, user_info: dict, media_info: dict,
+                       max_length: int = 2000, is_startup: bool = False, roles: Sequence[str] = ()) -> dict:
+        """تنسيق رسالة التغريدة لديسكورد (roles: رتب قواعد التوجيه المطابقة)"""
+        parts = self._static_parts(username, user_info)
+
+        content_parts = []
+        if is_startup:
+            content_parts.append("🎯 **فحص أولي للبوت**")
+            roles = ()
+        else:
+            if self.mention_everyone:
+                content_parts.append("@everyone")
+            if roles:
+                content_parts.append(" ".join(f"<@&{role}>" for role in roles))
+            content_parts.append(parts['headline'])
+        content_parts.append(f"🔗 **[اقرأ التغريدة الكاملة]({parts['status_prefix']}{tweet_data['id']})**")
+
+        message = {
+            "content": "\n".join(content_parts),
+            "embeds": [self.create_embed(tweet_data, username, user_info, media_info, max_length, is_startup)],
+            "allowed_mentions": {
+                "everyone": self.mention_everyone and not is_startup
+            }
+        }
+        if roles:
+            message["allowed_mentions"]["roles"] = list(roles)
+        if self.upload_media:
+            # تُنزل عند الإرسال، والـ embed يبقى بروابط تويتر إذا تعذر الرفع
+            uploads = upload_candidates(tweet_data, media_info)
+            if uploads:
+                message["media"] = uploads
+        return message
@@ -0,0 +1,304 @@
+"""
+توجيه التغريدات حسب محتواها
+قواعد الكلمات المفتاحية والهاشتاقات والمنشنات ونطاقات الروابط تُجمع مرة واحدة في
+مطابق متعدد الأنماط (Aho-Corasick) وقواميس، فتكلفة مطابقة التغريدة لا تزيد بعدد القواعد
+"""
+
+import json
+import logging
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Pattern, Sequence, Set, Tuple
+from urllib.parse import urlparse
+
+from render import clean_tweet_text
+
+logger = logging.getLogger(__name__)
+
+# في webhooks القاعدة: وجهات الحساب المعتادة (ACCOUNT_WEBHOOKS أو الرابط الأساسي)
+DEFAULT_DESTINATION = "default"
+
+ACTIONS = ('route', 'drop')
+
+RULE_KEYS = {'name', 'keywords', 'hashtags', 'mentions', 'domains', 'regex', 'accounts',
+             'action', 'webhooks', 'roles', 'substring'}
+
+@dataclass
+class RoutingRule:
+    """قاعدة توجيه كما في ملف ROUTING_RULES_FILE
+
+    تطابق القاعدة التغريدة إذا وُجد فيها أي من أنماطها وكان الحساب ضمن accounts
+    (فارغة = كل الحسابات).
+    """
+    name: str
+    keywords: List[str] = field(default_factory=list)
+    hashtags: List[str] = field(default_factory=list)
+    mentions: List[str] = field(default_factory=list)
+    domains: List[str] = field(default_factory=list)
+    regex: List[str] = field(default_factory=list)
+    accounts: List[str] = field(default_factory=list)
+    action: str = "route"
+    webhooks: List[str] = field(default_factory=list)
+    roles: List[str] = field(default_factory=list)
+    # الكلمات المفتاحية تطابق كلمات كاملة، إلا إذا سُمح بمطابقتها داخل الكلمات
+    substring: bool = False
+
+    def applies_to(self, username: str) -> bool:
+        return not self.accounts or username.lower() in self.accounts
+
+def _strings(rule: Dict, key: str, name: str, strip: str = "") -> List[str]:
+    """قائمة نصوص من حقل القاعدة (يُقبل نص واحد أيضاً) بدون الفارغة"""
+    value = rule.get(key, [])
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise ValueError(f"الحقل {key} في قاعدة التوجيه '{name}' يجب أن يكون قائمة نصوص")
+    items = [item.strip().lstrip(strip) for item in value]
+    return [item for item in items if item]
+
+def parse_rules(data) -> List[RoutingRule]:
+    """التحقق من قواعد التوجيه وتحويلها (خطأ في أي قاعدة يرفض الملف كاملاً)"""
+    if not isinstance(data, list):
+        raise ValueError("ملف قواعد التوجيه يجب أن يكون قائمة JSON")
+    rules = []
+    for position, item in enumerate(data, 1):
+        if not isinstance(item, dict):
+            raise ValueError(f"قاعدة التوجيه رقم {position} ليست كائن JSON")
+        name = str(item.get('name') or f"rule-{position}")
+        unknown = item.keys() - RULE_KEYS
+        if unknown:
+            raise ValueError(f"حقول غير معروفة في قاعدة التوجيه '{name}': {', '.join(sorted(unknown))}")
+        rule = RoutingRule(
+            name=name,
+            keywords=_strings(item, 'keywords', name),
+            hashtags=_strings(item, 'hashtags', name, '#'),
+            mentions=_strings(item, 'mentions', name, '@'),
+            domains=[_host(domain) for domain in _strings(item, 'domains', name)],
+            regex=_strings(item, 'regex', name),
+            accounts=[account.lower() for account in _strings(item, 'accounts', name, '@')],
+            action=str(item.get('action', 'route')).lower(),
+            webhooks=_strings(item, 'webhooks', name),
+            roles=_strings(item, 'roles', name, '<@&'),
+            substring=bool(item.get('substring', False))
+        )
+        rule.roles = [role.rstrip('>') for role in rule.roles]
+        if rule.action not in ACTIONS:
+            raise ValueError(f"إجراء غير معروف '{rule.action}' في قاعدة التوجيه '{name}'")
+        if not (rule.keywords or rule.hashtags or rule.mentions or rule.domains or rule.regex):
+            raise ValueError(f"قاعدة التوجيه '{name}' بدون أنماط")
+        if rule.action == 'route' and not (rule.webhooks or rule.roles):
+            raise ValueError(f"قاعدة التوجيه '{name}' بدون webhooks أو roles")
+        for role in rule.roles:
+            if not role.isdigit():
+                raise ValueError(f"معرف رتبة غير صحيح '{role}' في قاعدة التوجيه '{name}'")
+        for pattern in rule.regex:
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                raise ValueError(f"تعبير نمطي غير صحيح في قاعدة التوجيه '{name}': {e}")
+        rules.append(rule)
+    return rules
+
+def load_rules(path: str) -> List[RoutingRule]:
+    """قراءة ملف قواعد التوجيه (JSON)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"ملف قواعد التوجيه {path} غير صالح: {e}")
+    return parse_rules(data)
+
+def _host(domain: str) -> str:
+    domain = domain.lower()
+    return domain[4:] if domain.startswith('www.') else domain
+
+def _is_word(char: str) -> bool:
+    return char.isalnum() or char == '_'
+
+class KeywordMatcher:
+    """مطابق Aho-Corasick: كل الكلمات المفتاحية في مرور واحد على النص
+
+    كل عقدة قاموس انتقالات مع رابط فشل لأطول لاحقة موجودة في الشجرة، ومخرجات العقدة
+    تشمل مخرجات رابط فشلها، فالمطابقة خطية في طول النص مهما كان عدد الكلمات.
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        # لكل كلمة: (الطول، أرقام القواعد، يلزم حد كلمة قبلها، يلزم حد كلمة بعدها)
+        self._keywords: List[Tuple[int, List[int], bool, bool]] = []
+        self._index: Dict[Tuple[str, bool], int] = {}
+
+    def __len__(self) -> int:
+        return len(self._keywords)
+
+    def add(self, keyword: str, rule: int, whole_word: bool = True) -> None:
+        keyword = keyword.casefold()
+        known = self._index.get((keyword, whole_word))
+        if known is not None:
+            self._keywords[known][1].append(rule)
+            return
+        node = 0
+        for char in keyword:
+            child = self._goto[node].get(char)
+            if child is None:
+                child = len(self._goto)
+                self._goto[node][char] = child
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = child
+        self._index[(keyword, whole_word)] = len(self._keywords)
+        self._out[node].append(len(self._keywords))
+        self._keywords.append((len(keyword), [rule], whole_word and _is_word(keyword[0]),
+                               whole_word and _is_word(keyword[-1])))
+
+    def build(self) -> None:
+        """حساب روابط الفشل بالعرض (كل عقدة بعد العقد الأقصر منها)"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[child] = fail
+                if self._out[fail]:
+                    self._out[child] = self._out[child] + self._out[fail]
+
+    def search(self, text: str) -> Set[int]:
+        """أرقام القواعد التي وُجدت إحدى كلماتها في النص (بعد casefold)"""
+        goto, fail, out, keywords = self._goto, self._fail, self._out, self._keywords
+        found: Set[int] = set()
+        node = 0
+        last = len(text) - 1
+        for end, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for keyword in out[node]:
+                length, rules, left, right = keywords[keyword]
+                start = end - length + 1
+                if left and start > 0 and _is_word(text[start - 1]):
+                    continue
+                if right and end < last and _is_word(text[end + 1]):
+                    continue
+                found.update(rules)
+        return found
+
+@dataclass
+class Route:
+    """نتيجة توجيه تغريدة"""
+    drop: bool = False
+    # وجهات القواعد المطابقة (فارغة = وجهات الحساب المعتادة)
+    webhooks: List[str] = field(default_factory=list)
+    roles: List[str] = field(default_factory=list)
+    rules: List[str] = field(default_factory=list)
+
+    def destinations(self, defaults: List[str]) -> List[str]:
+        """روابط Discord التي تُرسل إليها التغريدة"""
+        if self.drop:
+            return []
+        if not self.webhooks:
+            return defaults
+        urls: List[str] = []
+        for url in self.webhooks:
+            for destination in (defaults if url == DEFAULT_DESTINATION else [url]):
+                if destination not in urls:
+                    urls.append(destination)
+        return urls
+
+class Router:
+    """القواعد مجمعة للمطابقة: الكلمات في KeywordMatcher واحد، والهاشتاقات والمنشنات
+    والنطاقات في قواميس، والتعابير النمطية فقط تُفحص واحدة واحدة
+
+    عند تطابق عدة قواعد: drop يستبعد التغريدة، وإلا تُرسل لاتحاد وجهات القواعد
+    المطابقة مع منشن كل رتبها.
+    """
+
+    def __init__(self, rules: Sequence[RoutingRule] = ()):
+        self.rules = list(rules)
+        self._keywords = KeywordMatcher()
+        self._hashtags: Dict[str, List[int]] = {}
+        self._mentions: Dict[str, List[int]] = {}
+        self._domains: Dict[str, List[int]] = {}
+        self._regex: List[Tuple[int, List[Pattern]]] = []
+        for index, rule in enumerate(self.rules):
+            for keyword in rule.keywords:
+                self._keywords.add(keyword, index, not rule.substring)
+            for tag in rule.hashtags:
+                self._hashtags.setdefault(tag.casefold(), []).append(index)
+            for username in rule.mentions:
+                self._mentions.setdefault(username.casefold(), []).append(index)
+            for domain in rule.domains:
+                self._domains.setdefault(domain, []).append(index)
+            if rule.regex:
+                self._regex.append((index, [re.compile(pattern, re.IGNORECASE) for pattern in rule.regex]))
+        self._keywords.build()
+        self._regex_any = self._combine([pattern for _, patterns in self._regex for pattern in patterns])
+
+    @staticmethod
+    def _combine(patterns: List[Pattern]) -> Optional[Pattern]:
+        """تعبير واحد يكفي للتأكد أن أي تعبير نمطي لا يطابق (أغلب التغريدات) بمرور واحد
+
+        التعابير ذات المجموعات لا تُدمج لأن الدمج يغير أرقام مراجعها (\\1).
+        """
+        if not patterns or any(pattern.groups for pattern in patterns):
+            return None
+        try:
+            return re.compile('|'.join(f"(?:{pattern.pattern})" for pattern in patterns), re.IGNORECASE)
+        except re.error:
+            return None
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def _lookup(self, table: Dict[str, List[int]], entities: List[Dict], key: str, found: Set[int]) -> None:
+        for entity in entities:
+            found.update(table.get((entity.get(key) or '').casefold(), ()))
+
+    def match(self, username: str, tweet: Dict) -> List[int]:
+        """أرقام القواعد المطابقة للتغريدة بترتيبها في الملف"""
+        if not self.rules:
+            return []
+        text = tweet.get('text', '')
+        text = clean_tweet_text(text, len(text))
+        found = self._keywords.search(text.casefold()) if len(self._keywords) else set()
+
+        entities = tweet.get('entities') or {}
+        if self._hashtags:
+            self._lookup(self._hashtags, entities.get('hashtags', []), 'tag', found)
+        if self._mentions:
+            self._lookup(self._mentions, entities.get('mentions', []), 'username', found)
+        if self._domains:
+            for item in entities.get('urls', []):
+                host = _host(urlparse(item.get('expanded_url') or item.get('url') or '').hostname or '')
+                parts = host.split('.')
+                # النطاق يطابق نطاقاته الفرعية أيضاً (example.com يطابق shop.example.com)
+                for start in range(len(parts) - 1):
+                    found.update(self._domains.get('.'.join(parts[start:]), ()))
+
+        regex = self._regex if self._regex_any is None or self._regex_any.search(text) else ()
+        for index, patterns in regex:
+            if index not in found and self.rules[index].applies_to(username) and \
+                    any(pattern.search(text) for pattern in patterns):
+                found.add(index)
+        return sorted(index for index in found if self.rules[index].applies_to(username))
+
+    def route(self, username: str, tweet: Dict) -> Route:
+        """قرار التوجيه للتغريدة (Route فارغ إذا لم تطابق أي قاعدة)"""
+        matched = [self.rules[index] for index in self.match(username, tweet)]
+        if not matched:
+            return Route()
+        dropped = [rule.name for rule in matched if rule.action == 'drop']
+        if dropped:
+            return Route(drop=True, rules=dropped)
+        route = Route(rules=[rule.name for rule in matched])
+        for rule in matched:
+            route.webhooks.extend(url for url in rule.webhooks if url not in route.webhooks)
+            route.roles.extend(role for role in rule.roles if role not in route.roles)
+        return route
@@ -107,7 +107,7 @@ def validate_env_file():
     if not env_path.exists():
         return False
     
-    required_vars = ['TWITTER_BEARER_TOKEN', 'DISCORD_WEBHOOK_URL', 'TWITTER_USERNAME']
+    required_vars = ['TWITTER_BEARER_TOKEN', 'DISCORD_WEBHOOK_URL']
     missing_vars = []
     
     try:
@@ -117,6 +117,10 @@ def validate_env_file():
         for var in required_vars:
             if f"{var}=" not in content:
                 missing_vars.append(var)
+        
+        # يكفي أحد المتغيرين: حساب واحد أو قائمة حسابات
+        if "TWITTER_USERNAME=" not in content and "TWITTER_USERNAMES=" not in content:
+            missing_vars.append('TWITTER_USERNAME')
     
     except Exception:
         return False
@@ -168,18 +172,22 @@ def show_help():
   --setup, -s         إعداد ملف .env جديد
   --check, -c         فحص الإعدادات فقط
   --validate, -v      التحقق من صحة ملف .env
+  --profile-startup   عرض الزمن المستغرق في كل مرحلة من مراحل التشغيل
 
 أمثلة:
   python run_bot.py           # تشغيل البوت
   python run_bot.py --setup   # إعداد ملف .env جديد
   python run_bot.py --check   # فحص الإعدادات
+  python run_bot.py --profile-startup  # تشغيل مع قياس زمن مراحل البدء
 """)
 
 def main():
     """الدالة الرئيسية"""
     # معالجة المعاملات
-    if len(sys.argv) > 1:
-        arg = sys.argv[1].lower()
+    args = [arg for arg in sys.argv[1:] if arg.lower() != '--profile-startup']
+    profile_startup = len(args) < len(sys.argv) - 1
+    if args:
+        arg = args[0].lower()
         if arg in ['--help', '-h']:
             show_help()
             return
@@ -197,7 +205,7 @@ def main():
                 from config import load_config
                 config = load_config()
                 print("✅ جميع الإعدادات صحيحة!")
-                print(f"📍 الحساب المراقب: @{config.twitter_username}")
+                print(f"📍 الحسابات المراقبة: {', '.join('@' + u for u in config.twitter_usernames)}")
             except Exception as e:
                 print(f"❌ خطأ في الإعدادات: {e}")
             return
@@ -248,7 +256,7 @@ def main():
     # استيراد وتشغيل البوت الرئيسي
     try:
         from main import main as bot_main
-        asyncio.run(bot_main())
+        asyncio.run(bot_main(profile_startup=profile_startup))
     except KeyboardInterrupt:
         print("\n\n👋 تم إيقاف البوت بواسطة المستخدم")
         print("📊 يمكنك مراجعة السجلات في logs/bot.log")
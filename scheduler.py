@@ -0,0 +1,161 @@
+"""
+مجدول فحص الحسابات
+يحتفظ بـ heap من مواعيد الفحص القادمة ويشغل الفحوصات بالتوازي ضمن حد أقصى
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+class PollScheduler:
+    """مجدول يعتمد على أقرب موعد (deadline heap) مع jitter وحد للتوازي"""
+
+    def __init__(self, poll: Callable[[str], Awaitable[None]], interval_for: Callable[[str], float],
+                 max_concurrency: int = 5, jitter: float = 0.1, error_delay: float = 300,
+                 warm_up: Optional[Callable[[], Awaitable[None]]] = None, prewarm: float = 0):
+        self.poll = poll
+        self.interval_for = interval_for
+        self.jitter = max(0.0, min(jitter, 0.5))
+        self.error_delay = error_delay
+        self.warm_up = warm_up
+        self.prewarm = prewarm
+        self.semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        self._heap: List[Tuple[float, int, str]] = []
+        self._deadlines: Dict[str, Tuple[float, int]] = {}
+        self._running: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._seq = itertools.count()
+        self._last_dispatch = float('-inf')
+        self._wakeup = asyncio.Event()
+        self._stopped = False
+
+    def _now(self) -> float:
+        return asyncio.get_running_loop().time()
+
+    def _jittered(self, delay: float) -> float:
+        """إضافة تذبذب عشوائي لتفادي تزامن الطلبات"""
+        if delay <= 0 or not self.jitter:
+            return max(0.0, delay)
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def schedule(self, key: str, delay: float) -> None:
+        """جدولة (أو إعادة جدولة) فحص مفتاح بعد مدة محددة"""
+        entry = (self._now() + max(0.0, delay), next(self._seq))
+        self._deadlines[key] = entry
+        heapq.heappush(self._heap, (entry[0], entry[1], key))
+        self._wakeup.set()
+
+    def add_all(self, keys: List[str]) -> None:
+        """إضافة مجموعة مفاتيح مع توزيع مواعيدها الأولى على طول الفترة"""
+        count = len(keys)
+        for i, key in enumerate(keys):
+            spread = self.interval_for(key) * i / count if count > 1 else 0
+            self.schedule(key, self._jittered(spread) if spread else 0)
+
+    def tighten(self, max_delay: float) -> None:
+        """تقريب المواعيد الأبعد من max_delay (مثلاً بعد تقليل فترة الفحص)"""
+        now = self._now()
+        for key, (deadline, _) in list(self._deadlines.items()):
+            if deadline - now > max_delay:
+                self.schedule(key, self._jittered(max_delay))
+
+    def remove(self, key: str) -> None:
+        """إزالة مفتاح من الجدول (الإدخال في الـ heap يُتجاهل لاحقاً)"""
+        self._deadlines.pop(key, None)
+
+    def keys(self) -> List[str]:
+        return list(self._deadlines)
+
+    def stop(self) -> None:
+        """إيقاف المجدول وإيقاظه من الانتظار"""
+        self._stopped = True
+        self._wakeup.set()
+
+    def _peek(self) -> Optional[Tuple[float, str]]:
+        """أقرب موعد صالح مع تجاهل الإدخالات الملغاة"""
+        while self._heap:
+            deadline, seq, key = self._heap[0]
+            if self._deadlines.get(key) == (deadline, seq):
+                return deadline, key
+            heapq.heappop(self._heap)
+        return None
+
+    async def _wait(self, timeout: Optional[float]) -> None:
+        """انتظار حتى انتهاء المدة أو حدوث تغيير في الجدول"""
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=min(timeout, 1.0) if timeout is not None else 1.0)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run_poll(self, key: str) -> None:
+        """تنفيذ فحص واحد ثم إعادة جدولته"""
+        delay = None
+        try:
+            async with self.semaphore:
+                await self.poll(key)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"خطأ في فحص @{key}: {e}")
+            delay = self.error_delay
+        finally:
+            self._running.discard(key)
+
+        if self._stopped or key not in self._deadlines:
+            return
+        # قد يكون الفحص أعاد جدولة نفسه (مثلاً تأجيل بسبب Rate Limit)
+        if self._deadlines[key][0] > self._now():
+            return
+        if delay is None:
+            delay = self.interval_for(key)
+        self.schedule(key, self._jittered(delay))
+
+    async def run(self) -> None:
+        """حلقة المجدول الرئيسية"""
+        warmed = False
+        while not self._stopped:
+            nxt = self._peek()
+            if nxt is None:
+                await self._wait(None)
+                continue
+
+            deadline, key = nxt
+            wait = deadline - self._now()
+            if wait > 0:
+                # تجهيز الاتصال مرة واحدة قبل الفحص القادم بعد فترة خمول فقط،
+                # فالاتصالات تبقى مفتوحة تلقائياً عندما تكون الفحوصات متقاربة
+                idle = self._now() - self._last_dispatch
+                if (self.warm_up and self.prewarm and not warmed and
+                        wait <= self.prewarm and idle > self.prewarm):
+                    warmed = True
+                    self._spawn(self.warm_up())
+                await self._wait(wait)
+                continue
+
+            heapq.heappop(self._heap)
+            if key in self._running:
+                # الفحص السابق لم ينتهِ بعد، سيُعاد جدولته عند انتهائه
+                continue
+            warmed = False
+            self._last_dispatch = self._now()
+            self._running.add(key)
+            self._spawn(self._run_poll(key))
+
+        await self.drain()
+
+    def _spawn(self, coro: Awaitable[None]) -> None:
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def drain(self) -> None:
+        """انتظار انتهاء الفحوصات الجارية"""
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
@@ -0,0 +1,420 @@
+"""
+مخازن حالة البوت
+واجهة موحدة لتخزين التغريدات المرسلة مع دعم JSON (القديم) و SQLite
+"""
+
+import json
+import logging
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+# رسالة Discord محفوظة: (الوجهة، معرف الرسالة، المحتوى والـ embeds، تغريداتها)
+StoredMessage = Tuple[str, str, Dict, List[Dict]]
+
+logger = logging.getLogger(__name__)
+
+class StateStore(ABC):
+    """الواجهة الأساسية لمخازن حالة التغريدات المرسلة"""
+
+    # حفظ رسائل Discord لتحديثها لاحقاً (SQLite فقط)
+    TRACKS_MESSAGES = False
+
+    @abstractmethod
+    def contains(self, tweet_id: str, account: str = "") -> bool:
+        """التحقق من وجود التغريدة في المخزن"""
+
+    @abstractmethod
+    def add(self, tweet_id: str, account: str = "") -> None:
+        """إضافة تغريدة مرسلة (قد يتم تأجيل الحفظ الفعلي)"""
+
+    @abstractmethod
+    def count(self) -> int:
+        """عدد التغريدات المخزنة"""
+
+    @abstractmethod
+    def load_recent(self, account: str, limit: int) -> List[int]:
+        """أحدث المعرفات المرسلة للحساب مرتبة تنازلياً"""
+
+    @abstractmethod
+    def get_watermarks(self) -> Dict[str, int]:
+        """الحد الأدنى لكل حساب: أي تغريدة أقدم منه تعتبر مرسلة"""
+
+    @abstractmethod
+    def set_watermark(self, account: str, tweet_id: int) -> None:
+        """رفع الحد الأدنى للحساب وحذف ما تحته من المخزن"""
+
+    @abstractmethod
+    def get_cursors(self) -> Dict[str, int]:
+        """مؤشر since_id لكل حساب: أحدث تغريدة جُلبت وسُلمت لطوابير الإرسال"""
+
+    @abstractmethod
+    def set_cursor(self, account: str, tweet_id: int) -> None:
+        """حفظ مؤشر الحساب (قد يتراجع إذا فشل إرسال تغريدة)"""
+
+    def record_message(self, destination: str, message_id: str, payload: Dict, tweets: List[Dict]) -> None:
+        """حفظ رسالة أُرسلت مع تغريداتها (المعرف، موضع الـ embed، الإحصائيات)"""
+
+    def recent_messages(self, since: float) -> List[StoredMessage]:
+        """الرسائل المرسلة بعد وقت محدد (unix)"""
+        return []
+
+    def update_message(self, destination: str, message_id: str, payload: Dict, tweets: List[Dict]) -> None:
+        """حفظ الرسالة بعد تعديلها"""
+
+    def delete_message(self, destination: str, message_id: str) -> None:
+        """نسيان رسالة حُذفت أو لم تعد موجودة"""
+
+    def prune_messages(self, before: float) -> int:
+        """حذف الرسائل الأقدم من وقت محدد وإرجاع عددها"""
+        return 0
+
+    def flush(self) -> None:
+        """حفظ أي تغييرات معلقة على القرص"""
+
+    def close(self) -> None:
+        """حفظ التغييرات وإغلاق المخزن"""
+        self.flush()
+
+def load_sent_ids(data: Dict) -> Dict[str, Set[int]]:
+    """المعرفات المرسلة من ملف JSON حسب الحساب (القائمة القديمة sent_tweets للحساب "")"""
+    sent = {"": {int(tweet_id) for tweet_id in data.get('sent_tweets', [])}}
+    for account, ids in data.get('accounts', {}).items():
+        sent[account] = {int(tweet_id) for tweet_id in ids}
+    return sent
+
+class JSONStateStore(StateStore):
+    """المخزن القديم: ملف JSON يُعاد كتابته بالكامل عند الحفظ
+
+    المعرفات مفصولة حسب الحساب (ومفتاح الوجهة account#webhook) مثل جدول SQLite،
+    و sent_tweets القديمة بدون حساب تُقرأ كحساب "".
+    """
+
+    def __init__(self, file_path: Path):
+        self.file_path = Path(file_path)
+        self.watermarks: Dict[str, int] = {}
+        self.cursors: Dict[str, int] = {}
+        self.sent_tweets: Dict[str, Set[int]] = self._load()
+        self._dirty = False
+
+    def _load(self) -> Dict[str, Set[int]]:
+        """تحميل التغريدات المرسلة من الملف"""
+        try:
+            if self.file_path.exists():
+                with open(self.file_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                    self.watermarks = {k: int(v) for k, v in data.get('watermarks', {}).items()}
+                    self.cursors = {k: int(v) for k, v in data.get('cursors', {}).items()}
+                    return load_sent_ids(data)
+        except Exception as e:
+            logger.error(f"خطأ في تحميل التغريدات المرسلة: {e}")
+        return {}
+
+    def contains(self, tweet_id: str, account: str = "") -> bool:
+        return int(tweet_id) in self.sent_tweets.get(account, ())
+
+    def add(self, tweet_id: str, account: str = "") -> None:
+        self.sent_tweets.setdefault(account, set()).add(int(tweet_id))
+        self._dirty = True
+        self.flush()
+
+    def count(self) -> int:
+        return sum(len(ids) for ids in self.sent_tweets.values())
+
+    def load_recent(self, account: str, limit: int) -> List[int]:
+        return sorted(self.sent_tweets.get(account, ()), reverse=True)[:limit]
+
+    def get_watermarks(self) -> Dict[str, int]:
+        return dict(self.watermarks)
+
+    def set_watermark(self, account: str, tweet_id: int) -> None:
+        if tweet_id <= self.watermarks.get(account, 0):
+            return
+        self.watermarks[account] = tweet_id
+        # ما تحت الحد الأدنى لم يعد بحاجة للتخزين، فيبقى حجم الملف محدوداً
+        ids = self.sent_tweets.get(account)
+        if ids:
+            ids.difference_update([key for key in ids if key <= tweet_id])
+        self._dirty = True
+
+    def get_cursors(self) -> Dict[str, int]:
+        return dict(self.cursors)
+
+    def set_cursor(self, account: str, tweet_id: int) -> None:
+        self.cursors[account] = tweet_id
+        self._dirty = True
+        self.flush()
+
+    def flush(self) -> None:
+        if not self._dirty:
+            return
+        # الكتابة في ملف مؤقت ثم الاستبدال لتجنب إتلاف الملف عند الانهيار
+        tmp_path = self.file_path.with_suffix('.json.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'sent_tweets': [str(tweet_id) for tweet_id in self.sent_tweets.get("", ())],
+                    'accounts': {
+                        account: [str(tweet_id) for tweet_id in ids]
+                        for account, ids in self.sent_tweets.items() if account and ids
+                    },
+                    'watermarks': self.watermarks,
+                    'cursors': self.cursors
+                }, f, ensure_ascii=False)
+            tmp_path.replace(self.file_path)
+            self._dirty = False
+        except Exception as e:
+            logger.error(f"خطأ في حفظ التغريدات المرسلة: {e}")
+
+class SQLiteStateStore(StateStore):
+    """مخزن SQLite بوضع WAL مع بحث مفهرس وحفظ مجمّع (group commit)
+
+    آمن للمشاركة بين عدة عمليات (وضع WORKERS): WAL يسمح بالقراءة أثناء الكتابة،
+    و busy_timeout يجعل الكاتب ينتظر القفل بدلاً من فشل "database is locked".
+    """
+
+    SCHEMA_VERSION = 4
+    TRACKS_MESSAGES = True
+
+    def __init__(self, db_path: Path, commit_batch: int = 50, commit_interval: float = 1.0,
+                 busy_timeout: float = 30.0):
+        self.db_path = Path(db_path)
+        self.commit_batch = max(1, commit_batch)
+        self.commit_interval = max(0.0, commit_interval)
+        self._pending: List[Tuple[str, int]] = []
+        self._pending_set: Set[Tuple[str, int]] = set()
+        self._first_pending_at = 0.0
+
+        self.conn = sqlite3.connect(str(self.db_path), timeout=busy_timeout)
+        self.conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout * 1000)}")
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate_schema()
+
+    def _migrate_schema(self) -> None:
+        """إنشاء الجداول أو ترقيتها إلى آخر إصدار"""
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= self.SCHEMA_VERSION:
+            return
+
+        with self.conn:
+            # IMMEDIATE يحجز الكتابة فوراً، فإذا بدأت عمليتان معاً تنتظر الثانية ثم تجد الترقية منتهية
+            self.conn.execute("BEGIN IMMEDIATE")
+            version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+            if version >= self.SCHEMA_VERSION:
+                return
+            if version < 2:
+                self._migrate_v2()
+            # الإصدار 3: مؤشرات since_id للجلب التزايدي
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS cursors ("
+                "account TEXT PRIMARY KEY, "
+                "tweet_id INTEGER NOT NULL)"
+            )
+            # الإصدار 4: رسائل Discord المرسلة لتحديث الإحصائيات وحذف التغريدات المحذوفة
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                "destination TEXT NOT NULL, "
+                "message_id TEXT NOT NULL, "
+                "payload TEXT NOT NULL, "
+                "tweets TEXT NOT NULL, "
+                "posted_at REAL NOT NULL, "
+                "PRIMARY KEY (destination, message_id))"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS messages_posted_at ON messages (posted_at)")
+            self.conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+
+    def _migrate_v2(self) -> None:
+        """الإصدار 2: المفتاح أصبح (account, tweet_id) مع جدول الحدود الدنيا"""
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS sent_tweets_v2 ("
+            "account TEXT NOT NULL, "
+            "tweet_id INTEGER NOT NULL, "
+            "sent_at REAL NOT NULL, "
+            "PRIMARY KEY (account, tweet_id)) WITHOUT ROWID"
+        )
+        has_v1 = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sent_tweets'"
+        ).fetchone()
+        if has_v1:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO sent_tweets_v2 (account, tweet_id, sent_at) "
+                "SELECT '', tweet_id, sent_at FROM sent_tweets"
+            )
+            self.conn.execute("DROP TABLE sent_tweets")
+        self.conn.execute("ALTER TABLE sent_tweets_v2 RENAME TO sent_tweets")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS watermarks ("
+            "account TEXT PRIMARY KEY, "
+            "tweet_id INTEGER NOT NULL)"
+        )
+
+    def contains(self, tweet_id: str, account: str = "") -> bool:
+        key = (account, int(tweet_id))
+        if key in self._pending_set:
+            return True
+        row = self.conn.execute(
+            "SELECT 1 FROM sent_tweets WHERE account = ? AND tweet_id = ?", key
+        ).fetchone()
+        return row is not None
+
+    def add(self, tweet_id: str, account: str = "") -> None:
+        key = (account, int(tweet_id))
+        if key in self._pending_set:
+            return
+        if not self._pending:
+            self._first_pending_at = time.monotonic()
+        self._pending.append(key)
+        self._pending_set.add(key)
+
+        # الحفظ عند امتلاء الدفعة أو مرور فترة الحفظ
+        if (len(self._pending) >= self.commit_batch or
+                time.monotonic() - self._first_pending_at >= self.commit_interval):
+            self.flush()
+
+    def count(self) -> int:
+        row = self.conn.execute("SELECT COUNT(*) FROM sent_tweets").fetchone()
+        return row[0] + len(self._pending)
+
+    def load_recent(self, account: str, limit: int) -> List[int]:
+        self.flush()
+        rows = self.conn.execute(
+            "SELECT tweet_id FROM sent_tweets WHERE account = ? ORDER BY tweet_id DESC LIMIT ?",
+            (account, limit)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def get_watermarks(self) -> Dict[str, int]:
+        rows = self.conn.execute("SELECT account, tweet_id FROM watermarks").fetchall()
+        return {account: tweet_id for account, tweet_id in rows}
+
+    def set_watermark(self, account: str, tweet_id: int) -> None:
+        self.flush()
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO watermarks (account, tweet_id) VALUES (?, ?) "
+                "ON CONFLICT(account) DO UPDATE SET tweet_id = MAX(tweet_id, excluded.tweet_id)",
+                (account, tweet_id)
+            )
+            # ما تحت الحد الأدنى لم يعد بحاجة للتخزين
+            self.conn.execute(
+                "DELETE FROM sent_tweets WHERE account = ? AND tweet_id <= ?",
+                (account, tweet_id)
+            )
+
+    def get_cursors(self) -> Dict[str, int]:
+        rows = self.conn.execute("SELECT account, tweet_id FROM cursors").fetchall()
+        return {account: tweet_id for account, tweet_id in rows}
+
+    def set_cursor(self, account: str, tweet_id: int) -> None:
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO cursors (account, tweet_id) VALUES (?, ?) "
+                "ON CONFLICT(account) DO UPDATE SET tweet_id = excluded.tweet_id",
+                (account, tweet_id)
+            )
+
+    def record_message(self, destination: str, message_id: str, payload: Dict, tweets: List[Dict]) -> None:
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO messages (destination, message_id, payload, tweets, posted_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (destination, message_id, json.dumps(payload, ensure_ascii=False), json.dumps(tweets), time.time())
+            )
+
+    def recent_messages(self, since: float) -> List[StoredMessage]:
+        rows = self.conn.execute(
+            "SELECT destination, message_id, payload, tweets FROM messages WHERE posted_at >= ? ORDER BY posted_at",
+            (since,)
+        ).fetchall()
+        return [(destination, message_id, json.loads(payload), json.loads(tweets))
+                for destination, message_id, payload, tweets in rows]
+
+    def update_message(self, destination: str, message_id: str, payload: Dict, tweets: List[Dict]) -> None:
+        with self.conn:
+            self.conn.execute(
+                "UPDATE messages SET payload = ?, tweets = ? WHERE destination = ? AND message_id = ?",
+                (json.dumps(payload, ensure_ascii=False), json.dumps(tweets), destination, message_id)
+            )
+
+    def delete_message(self, destination: str, message_id: str) -> None:
+        with self.conn:
+            self.conn.execute("DELETE FROM messages WHERE destination = ? AND message_id = ?", (destination, message_id))
+
+    def prune_messages(self, before: float) -> int:
+        with self.conn:
+            return self.conn.execute("DELETE FROM messages WHERE posted_at < ?", (before,)).rowcount
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        now = time.time()
+        try:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO sent_tweets (account, tweet_id, sent_at) VALUES (?, ?, ?)",
+                    [(account, key, now) for account, key in self._pending]
+                )
+            logger.debug(f"تم حفظ {len(self._pending)} تغريدة في قاعدة البيانات")
+            self._pending.clear()
+            self._pending_set.clear()
+        except sqlite3.Error as e:
+            logger.error(f"خطأ في حفظ التغريدات المرسلة: {e}")
+
+    def close(self) -> None:
+        self.flush()
+        self.conn.close()
+
+    def migrate_from_json(self, json_path: Path) -> int:
+        """ترحيل لمرة واحدة من ملف sent_tweets.json القديم"""
+        json_path = Path(json_path)
+        if not json_path.exists():
+            return 0
+
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            rows = [(account, tweet_id) for account, ids in load_sent_ids(data).items() for tweet_id in ids]
+            watermarks = {k: int(v) for k, v in data.get('watermarks', {}).items()}
+            cursors = {k: int(v) for k, v in data.get('cursors', {}).items()}
+        except Exception as e:
+            logger.error(f"خطأ في قراءة ملف JSON للترحيل: {e}")
+            return 0
+
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO sent_tweets (account, tweet_id, sent_at) VALUES (?, ?, ?)",
+                [(account, tweet_id, now) for account, tweet_id in rows]
+            )
+            self.conn.executemany(
+                "INSERT INTO watermarks (account, tweet_id) VALUES (?, ?) "
+                "ON CONFLICT(account) DO UPDATE SET tweet_id = MAX(tweet_id, excluded.tweet_id)",
+                list(watermarks.items())
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO cursors (account, tweet_id) VALUES (?, ?)",
+                list(cursors.items())
+            )
+
+        # إعادة تسمية الملف القديم حتى لا يتم الترحيل مرة أخرى
+        json_path.replace(json_path.with_suffix('.json.migrated'))
+        logger.info(f"تم ترحيل {len(rows)} تغريدة من {json_path.name} إلى SQLite")
+        return len(rows)
+
+def create_state_store(backend: str, data_dir: Path, commit_batch: int = 50, commit_interval: float = 1.0) -> StateStore:
+    """إنشاء مخزن الحالة حسب النوع المحدد في الإعدادات"""
+    data_dir = Path(data_dir)
+    json_path = data_dir / "sent_tweets.json"
+
+    if backend == "json":
+        return JSONStateStore(json_path)
+
+    if backend != "sqlite":
+        logger.warning(f"نوع مخزن غير معروف '{backend}'، سيتم استخدام sqlite")
+
+    store = SQLiteStateStore(data_dir / "sent_tweets.db", commit_batch, commit_interval)
+    store.migrate_from_json(json_path)
+    return store
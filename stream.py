@@ -0,0 +1,190 @@
+"""
+جلب التغريدات عبر Filtered Stream من Twitter API v2
+اتصال طويل تصل عبره التغريدات فور نشرها بدلاً من انتظار الفحص الدوري
+"""
+
+import asyncio
+import json
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import aiohttp
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+class StreamError(Exception):
+    """رفض الاتصال من تويتر مع رمز الحالة لاختيار مدة الانتظار المناسبة"""
+
+    def __init__(self, status: int, message: str = ""):
+        super().__init__(f"HTTP {status}: {message}"[:300])
+        self.status = status
+
+class FilteredStream:
+    """إدارة قواعد الـ stream للحسابات المراقبة وقراءة الاتصال مع إعادة الاتصال التلقائية
+
+    on_tweet يُستدعى لكل تغريدة أصلية مع (اسم المستخدم، التغريدة، معلومات الميديا)،
+    و on_connect بعد كل اتصال ناجح (لتعويض ما فات أثناء الانقطاع بفحص عادي).
+    """
+
+    ENDPOINT = "tweets/search/stream"
+    RULE_TAG = "twitter-discord-bridge"
+    # تويتر يرسل سطراً فارغاً كل 20 ثانية، وغيابه يعني اتصالاً معلقاً
+    STALL_TIMEOUT = 30.0
+
+    def __init__(self, api, usernames: Callable[[], List[str]],
+                 on_tweet: Callable[[str, Dict, Dict], Awaitable[None]],
+                 on_connect: Optional[Callable[[], None]] = None, max_rule_length: int = 512):
+        self.api = api
+        self.usernames = usernames
+        self.on_tweet = on_tweet
+        self.on_connect = on_connect
+        self.max_rule_length = max_rule_length
+        self.connected = False
+        self._stopped = False
+        self._response: Optional[aiohttp.ClientResponse] = None
+
+    @property
+    def url(self) -> str:
+        return f"{self.api.base_url}/{self.ENDPOINT}"
+
+    def _rule_values(self) -> List[str]:
+        """قاعدة from:a OR from:b لكل مجموعة حسابات تتسع في حد طول القاعدة"""
+        chunks = self.api.build_search_queries(self.usernames(), self.max_rule_length)
+        return [self.api.search_query(chunk) for chunk in chunks]
+
+    async def _request_rules(self, method: str, payload: Optional[Dict] = None) -> Dict:
+        async with self.api.session.request(method, f"{self.url}/rules", headers=self.api.headers, json=payload) as response:
+            self.api._track_rate_limit(f"{self.ENDPOINT}/rules", response)
+            if response.status not in (200, 201):
+                raise StreamError(response.status, await response.text())
+            return await response.json()
+
+    async def sync_rules(self) -> bool:
+        """مطابقة قواعد الـ stream مع الحسابات الحالية (إضافة الناقص وحذف الزائد فقط)"""
+        try:
+            current = (await self._request_rules('GET')).get('data', [])
+            # قواعد أضافتها تطبيقات أخرى بنفس الـ token لا تُمس
+            ours = {rule['value']: rule['id'] for rule in current if rule.get('tag') == self.RULE_TAG}
+            wanted = self._rule_values()
+
+            stale = [rule_id for value, rule_id in ours.items() if value not in wanted]
+            if stale:
+                await self._request_rules('POST', {'delete': {'ids': stale}})
+            missing = [value for value in wanted if value not in ours]
+            if missing:
+                body = await self._request_rules('POST', {'add': [{'value': value, 'tag': self.RULE_TAG} for value in missing]})
+                for error in body.get('errors', []):
+                    logger.error(f"رفض تويتر قاعدة stream: {error.get('title')} {error.get('value', '')}")
+            if stale or missing:
+                logger.info(f"قواعد الـ stream: +{len(missing)} -{len(stale)} (المجموع {len(wanted)})")
+            return True
+        except Exception as e:
+            logger.error(f"خطأ في تحديث قواعد الـ stream: {e}")
+            return False
+
+    async def _handle_line(self, line: bytes) -> None:
+        """معالجة سطر JSON واحد من الاتصال"""
+        try:
+            message = json.loads(line)
+        except ValueError:
+            logger.warning(f"سطر غير صالح من الـ stream: {line[:200]!r}")
+            return
+
+        tweet = message.get('data')
+        if not tweet:
+            # أخطاء تشغيلية (مثل قطع الاتصال من جهة تويتر) تصل كرسالة errors
+            for error in message.get('errors', []):
+                logger.warning(f"رسالة من الـ stream: {error.get('title')} {error.get('detail', '')}")
+            return
+
+        includes = message.get('includes', {})
+        authors = {user['id']: user['username'].lower() for user in includes.get('users', [])}
+        watched = {username.lower(): username for username in self.usernames()}
+        username = watched.get(authors.get(tweet.get('author_id'), ''))
+        if not username or not self.api._filter_original_tweets([tweet]):
+            return
+        media_info = {media['media_key']: media for media in includes.get('media', [])}
+        await self.on_tweet(username, tweet, media_info)
+
+    async def _consume(self) -> None:
+        """اتصال واحد: قراءة الأسطر تدريجياً حتى انقطاعه"""
+        params = {
+            "tweet.fields": "created_at,text,public_metrics,attachments,in_reply_to_user_id,context_annotations,entities,author_id",
+            "media.fields": "url,type,preview_image_url,width,height,alt_text,variants",
+            "user.fields": "username",
+            "expansions": "author_id,attachments.media_keys"
+        }
+        # لا مهلة كلية للاتصال الطويل، والتعليق يُكشف بغياب نبضات keep-alive
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=self.api.session.timeout.connect)
+        async with self.api.session.get(self.url, headers=self.api.headers, params=params, timeout=timeout) as response:
+            self.api._track_rate_limit(self.ENDPOINT, response)
+            if response.status != 200:
+                raise StreamError(response.status, await response.text())
+
+            self._response = response
+            self.connected = True
+            metrics.STREAM_CONNECTED.set(1)
+            logger.info("✅ تم الاتصال بـ Twitter filtered stream")
+            if self.on_connect:
+                self.on_connect()
+
+            while not self._stopped:
+                line = await asyncio.wait_for(response.content.readline(), self.STALL_TIMEOUT)
+                if not line:
+                    raise ConnectionError("أغلق تويتر الاتصال")
+                line = line.strip()
+                if line:
+                    await self._handle_line(line)
+
+    @staticmethod
+    def _backoff(error: Exception, attempt: int) -> float:
+        """مدة الانتظار قبل إعادة الاتصال حسب إرشادات تويتر لنوع الخطأ"""
+        if isinstance(error, StreamError):
+            if error.status == 429:
+                return min(60.0 * 2 ** attempt, 900.0)
+            return min(5.0 * 2 ** attempt, 320.0)
+        # أخطاء الشبكة: زيادة خطية سريعة
+        return min(0.25 * (attempt + 1), 16.0)
+
+    async def run(self) -> None:
+        """حلقة الاتصال: مزامنة القواعد ثم القراءة مع إعادة الاتصال عند الانقطاع"""
+        attempt = 0
+        while not self._stopped:
+            if not await self.sync_rules():
+                delay = min(5.0 * 2 ** attempt, 320.0)
+            else:
+                try:
+                    # الـ stream مهمة مستقلة لا تحجز مكاناً في حد التوازي، فتنتظر مهما طال الحظر
+                    await self.api.rate_limiter.acquire(self.ENDPOINT, max_wait=None)
+                    await self._consume()
+                    continue
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    if self.connected:
+                        # الاتصال نجح قبل الانقطاع، فالعد يبدأ من جديد
+                        attempt = 0
+                    delay = self._backoff(e, attempt)
+                    if not self._stopped:
+                        logger.warning(f"انقطع الـ stream ({e or type(e).__name__})، إعادة الاتصال بعد {delay:.1f} ثانية")
+                finally:
+                    self._disconnected()
+            if self._stopped:
+                break
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def _disconnected(self) -> None:
+        if self.connected:
+            metrics.STREAM_RECONNECTS.inc()
+        self.connected = False
+        self._response = None
+        metrics.STREAM_CONNECTED.set(0)
+
+    def stop(self) -> None:
+        """إيقاف الحلقة وقطع الاتصال الحالي"""
+        self._stopped = True
+        if self._response is not None:
+            self._response.close()
@@ -0,0 +1,417 @@
+"""
+وضع العمليات المتعددة (WORKERS)
+المشرف يوزع الحسابات على عدة عمليات بـ consistent hashing ويعيد التوزيع عند توقف إحداها،
+وكل عملية تشغل البوت العادي على حصتها مع مخزن تتبع SQLite مشترك
+"""
+
+import asyncio
+import bisect
+import hashlib
+import itertools
+import logging
+import multiprocessing
+import signal
+import time
+from dataclasses import replace
+from datetime import datetime, timezone
+from multiprocessing.connection import Connection
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+import aiohttp
+
+from config import BotConfig, ConfigWatcher, diff_config
+from logpipeline import start_worker_logging
+from main import DiscordWebhook, TwitterDiscordBot
+from storage import create_state_store
+
+logger = logging.getLogger(__name__)
+
+class HashRing:
+    """حلقة consistent hashing: إضافة عملية أو إزالتها تنقل حصتها فقط دون بقية الحسابات"""
+
+    def __init__(self, replicas: int = 64):
+        self.replicas = replicas
+        # (قيمة الـ hash، رقم العملية) مرتبة، مع عدة نقاط لكل عملية لتوزيع متوازن
+        self._points: List[Tuple[int, int]] = []
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.md5(value.encode('utf-8')).digest()[:8], 'big')
+
+    def add(self, node: int) -> None:
+        if node in self.nodes():
+            return
+        for replica in range(self.replicas):
+            bisect.insort(self._points, (self._hash(f"worker-{node}#{replica}"), node))
+
+    def remove(self, node: int) -> None:
+        self._points = [point for point in self._points if point[1] != node]
+
+    def nodes(self) -> List[int]:
+        return sorted({node for _, node in self._points})
+
+    def node_for(self, key: str) -> Optional[int]:
+        """أول عملية بعد موقع المفتاح على الحلقة"""
+        if not self._points:
+            return None
+        index = bisect.bisect_left(self._points, (self._hash(key.lower()), -1))
+        return self._points[index % len(self._points)][1]
+
+    def assign(self, keys: List[str]) -> Dict[int, List[str]]:
+        """حصة كل عملية من المفاتيح (قد تكون فارغة)"""
+        shards: Dict[int, List[str]] = {node: [] for node in self.nodes()}
+        for key in keys:
+            node = self.node_for(key)
+            if node is not None:
+                shards[node].append(key)
+        return shards
+
+def worker_main(index: int, config: BotConfig, conn: Connection, log_queue) -> None:
+    """نقطة دخول العملية الفرعية"""
+    try:
+        asyncio.run(_run_worker(index, config, conn, log_queue))
+    except KeyboardInterrupt:
+        pass
+
+async def _run_worker(index: int, config: BotConfig, conn: Connection, log_queue) -> None:
+    start_worker_logging(log_queue, getattr(logging, config.log_level.upper(), logging.INFO), f"worker-{index}")
+    bot = TwitterDiscordBot(config, worker_index=index)
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, bot.shutdown)
+
+    commands: asyncio.Queue = asyncio.Queue()
+
+    def on_readable():
+        try:
+            while conn.poll():
+                commands.put_nowait(conn.recv())
+        except (EOFError, OSError):
+            # توقف المشرف، فلا أحد يعيد توزيع حسابات هذه العملية
+            loop.remove_reader(conn.fileno())
+            bot.shutdown()
+
+    loop.add_reader(conn.fileno(), on_readable)
+    command_task = asyncio.create_task(_handle_commands(bot, commands, conn))
+    try:
+        await bot.run()
+    finally:
+        command_task.cancel()
+        loop.remove_reader(conn.fileno())
+
+async def _handle_commands(bot: TwitterDiscordBot, commands: asyncio.Queue, conn: Connection) -> None:
+    """تنفيذ أوامر المشرف بالترتيب: assign (حصة وإعدادات جديدة) و stop"""
+    while True:
+        command = await commands.get()
+        if command[0] == 'stop':
+            bot.shutdown()
+        elif command[0] == 'assign':
+            _, seq, config = command
+            # الحصة الجديدة تُطبق بعد اكتمال تشغيل البوت (بعد إنشاء المجدول)
+            while bot.scheduler is None and not bot.shutdown_requested:
+                await asyncio.sleep(0.1)
+            if not bot.shutdown_requested:
+                try:
+                    await bot.assign(config)
+                except Exception as e:
+                    logger.error(f"خطأ في تطبيق الحصة الجديدة: {e}")
+            conn.send(('ack', seq))
+
+class Supervisor:
+    """تشغيل عمليات البوت ومراقبتها وتوزيع الحسابات عليها
+
+    نقل حساب بين عمليتين يتم على مرحلتين: العملية القديمة تتخلى عنه وتحفظ حالتها
+    أولاً، ثم تتسلمه الجديدة وتقرأ حالته من المخزن المشترك، فلا يُفحص من عمليتين معاً.
+    """
+
+    RESTART_DELAY = 5.0
+    MAX_RESTART_DELAY = 300.0
+    # العملية التي تعمل أقل من هذه المدة قبل توقفها تُعاد بتأخير متزايد
+    STABLE_AFTER = 60.0
+    ACK_TIMEOUT = 30.0
+    STOP_TIMEOUT = 30.0
+
+    def __init__(self, config: BotConfig):
+        self.context = multiprocessing.get_context('spawn')
+        # طابور السجلات المشترك: العمليات تكتب فيه وخيط واحد في المشرف يكتب الملفات
+        self.log_queue = self.context.Queue()
+        self.config = self._normalize(config)
+        self.ring = HashRing()
+        self.config_watcher: Optional[ConfigWatcher] = None
+        self.processes: Dict[int, multiprocessing.Process] = {}
+        self.conns: Dict[int, Connection] = {}
+        # آخر حصة أرسلت لكل عملية
+        self.shards: Dict[int, List[str]] = {}
+        self._started_at: Dict[int, float] = {}
+        self._restart_delays: Dict[int, float] = {}
+        self._restart_tasks: Dict[int, asyncio.Task] = {}
+        self._exited: Dict[int, asyncio.Future] = {}
+        self._retiring: Set[int] = set()
+        self._acks: Dict[int, Tuple[int, asyncio.Future]] = {}
+        self._seq = itertools.count(1)
+        self._lock = asyncio.Lock()
+        self._stopping = False
+        self._stopped: Optional[asyncio.Event] = None
+
+    def _normalize(self, config: BotConfig) -> BotConfig:
+        """الإعدادات التي لا تعمل مع عدة عمليات"""
+        if config.state_backend != 'sqlite':
+            logger.warning("وضع WORKERS يحتاج مخزن sqlite مشتركاً، سيتم استخدامه بدلاً من json")
+            config = replace(config, state_backend='sqlite')
+        if config.ingestion_mode == 'stream':
+            # تويتر يسمح باتصال stream واحد وقواعد مشتركة لكل تطبيق
+            logger.warning("وضع stream يحتاج اتصالاً واحداً، سيتم استخدام timeline مع WORKERS")
+            config = replace(config, ingestion_mode='timeline')
+        return config
+
+    def _worker_config(self, index: int, shard: List[str]) -> BotConfig:
+        """إعدادات عملية واحدة: حصتها من الحسابات ومنفذ مقاييس خاص بها"""
+        return replace(
+            self.config,
+            twitter_usernames=list(shard),
+            twitter_username=shard[0] if shard else "",
+            metrics_port=self.config.metrics_port + index if self.config.metrics_port else 0,
+            workers=1
+        )
+
+    def _plan(self) -> Dict[int, List[str]]:
+        return self.ring.assign(self.config.twitter_usernames)
+
+    def _start(self, index: int, shard: List[str]) -> None:
+        loop = asyncio.get_running_loop()
+        parent, child = self.context.Pipe()
+        process = self.context.Process(
+            target=worker_main,
+            args=(index, self._worker_config(index, shard), child, self.log_queue),
+            name=f"worker-{index}"
+        )
+        process.start()
+        child.close()
+        self.processes[index] = process
+        self.conns[index] = parent
+        self.shards[index] = list(shard)
+        self._started_at[index] = time.monotonic()
+        self._exited[index] = loop.create_future()
+        loop.add_reader(parent.fileno(), self._on_message, index)
+        loop.add_reader(process.sentinel, self._on_exit, index)
+        logger.info(f"تم تشغيل العملية {index} (PID {process.pid}) مع {len(shard)} حساب")
+
+    def _on_message(self, index: int) -> None:
+        conn = self.conns.get(index)
+        if conn is None:
+            return
+        try:
+            while conn.poll():
+                message = conn.recv()
+                if message[0] == 'ack':
+                    entry = self._acks.pop(message[1], None)
+                    if entry and not entry[1].done():
+                        entry[1].set_result(True)
+        except (EOFError, OSError):
+            asyncio.get_running_loop().remove_reader(conn.fileno())
+
+    def _on_exit(self, index: int) -> None:
+        """توقف عملية: إعادة توزيع حصتها ثم إعادة تشغيلها بعد تأخير"""
+        loop = asyncio.get_running_loop()
+        process = self.processes.pop(index)
+        loop.remove_reader(process.sentinel)
+        process.join()
+        conn = self.conns.pop(index)
+        loop.remove_reader(conn.fileno())
+        conn.close()
+        self.shards.pop(index, None)
+        for seq, (owner, future) in list(self._acks.items()):
+            if owner == index:
+                del self._acks[seq]
+                if not future.done():
+                    future.set_result(False)
+        if not self._exited[index].done():
+            self._exited[index].set_result(process.exitcode)
+
+        if self._stopping or index in self._retiring:
+            self._retiring.discard(index)
+            return
+        logger.error(f"توقفت العملية {index} بشكل غير متوقع (رمز الخروج {process.exitcode})، إعادة توزيع حساباتها")
+        self.ring.remove(index)
+        self._restart_tasks[index] = asyncio.ensure_future(self._recover(index))
+
+    async def _recover(self, index: int) -> None:
+        try:
+            await self.rebalance()
+            uptime = time.monotonic() - self._started_at.get(index, 0)
+            delay = self.RESTART_DELAY
+            if uptime < self.STABLE_AFTER:
+                delay = min(self._restart_delays.get(index, self.RESTART_DELAY / 2) * 2, self.MAX_RESTART_DELAY)
+            self._restart_delays[index] = delay
+            logger.info(f"إعادة تشغيل العملية {index} بعد {delay:.0f} ثانية")
+            await asyncio.sleep(delay)
+            if not self._stopping and index < self.config.workers:
+                await self._join(index)
+        finally:
+            self._restart_tasks.pop(index, None)
+
+    async def _join(self, index: int) -> None:
+        """إضافة عملية للحلقة وتشغيلها بحصتها بعد تخلي الباقين عنها"""
+        self.ring.add(index)
+        await self.rebalance(joining=index)
+
+    async def _send(self, assignments: Dict[int, List[str]]) -> None:
+        """إرسال الحصص وانتظار تأكيد كل عملية"""
+        loop = asyncio.get_running_loop()
+        waits = []
+        for index, shard in assignments.items():
+            conn = self.conns.get(index)
+            if conn is None:
+                continue
+            seq = next(self._seq)
+            future = loop.create_future()
+            self._acks[seq] = (index, future)
+            try:
+                conn.send(('assign', seq, self._worker_config(index, shard)))
+            except OSError:
+                del self._acks[seq]
+                continue
+            self.shards[index] = list(shard)
+            waits.append((index, future))
+        for index, future in waits:
+            try:
+                await asyncio.wait_for(future, self.ACK_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning(f"العملية {index} لم تؤكد حصتها الجديدة خلال {self.ACK_TIMEOUT:.0f} ثانية")
+
+    async def rebalance(self, joining: Optional[int] = None, force: bool = False) -> None:
+        """مطابقة حصص العمليات مع الحلقة (force لإرسال الإعدادات الجديدة للجميع)"""
+        async with self._lock:
+            if self._stopping:
+                return
+            plan = self._plan()
+            live = [index for index in self.processes if index != joining]
+            # المرحلة الأولى: التخلي عن الحسابات التي خرجت من الحصة
+            release = {index: [account for account in self.shards[index] if account in plan.get(index, [])]
+                       for index in live}
+            await self._send({index: shard for index, shard in release.items()
+                              if force or shard != self.shards.get(index)})
+            # المرحلة الثانية: تسلم الحسابات الجديدة
+            if joining is not None and joining not in self.processes:
+                self._start(joining, plan.get(joining, []))
+            await self._send({index: plan.get(index, []) for index in live
+                              if index in self.shards and plan.get(index, []) != self.shards[index]})
+            moved = sum(len(set(plan.get(index, [])) - set(release.get(index, []))) for index in live)
+            if moved:
+                logger.info(f"تم نقل {moved} حساب بين العمليات ({len(self.processes)} عملية تعمل)")
+
+    async def _retire(self, index: int) -> None:
+        """إيقاف عملية زائدة بعد تقليل WORKERS"""
+        self.ring.remove(index)
+        self._retiring.add(index)
+        task = self._restart_tasks.pop(index, None)
+        if task:
+            task.cancel()
+        if index in self.processes:
+            await self._stop_worker(index)
+
+    async def _stop_worker(self, index: int) -> None:
+        process = self.processes.get(index)
+        if process is None:
+            return
+        try:
+            self.conns[index].send(('stop',))
+        except OSError:
+            process.terminate()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._exited[index]), self.STOP_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"العملية {index} لم تتوقف خلال {self.STOP_TIMEOUT:.0f} ثانية، إنهاؤها")
+            process.terminate()
+            await self._exited[index]
+
+    async def apply_config(self, new_config: BotConfig) -> None:
+        """تطبيق الإعدادات المعدلة: إرسالها لكل العمليات وتعديل عددها إذا تغير WORKERS"""
+        new_config = self._normalize(new_config)
+        changes = diff_config(self.config, new_config)
+        if not changes:
+            return
+        self.config = new_config
+        if 'log_level' in changes:
+            logging.getLogger().setLevel(getattr(logging, new_config.log_level.upper(), logging.INFO))
+        if 'config_reload_interval' in changes and self.config_watcher:
+            self.config_watcher.interval = new_config.config_reload_interval
+
+        for index in [index for index in self.ring.nodes() if index >= new_config.workers]:
+            await self._retire(index)
+        await self.rebalance(force=True)
+        for index in range(new_config.workers):
+            if index not in self.processes and index not in self._restart_tasks:
+                await self._join(index)
+        if 'workers' in changes:
+            logger.info(f"عدد العمليات الآن {len(self.processes)}")
+
+    async def _announce(self, embed: Dict) -> None:
+        """رسالة حالة واحدة لكل وجهة (بدلاً من رسالة من كل عملية)"""
+        timeout = aiohttp.ClientTimeout(total=self.config.http_timeout, connect=self.config.http_connect_timeout)
+        try:
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                await asyncio.gather(*(
+                    DiscordWebhook(url, session=session).deliver({"embeds": [embed]})
+                    for url in self.config.all_webhooks()
+                ))
+        except Exception as e:
+            logger.warning(f"تعذر إرسال رسالة الحالة: {e}")
+
+    def _status_embed(self, title: str, description: str, color: int, footer: str) -> Dict:
+        return {
+            "title": title,
+            "description": description,
+            "color": color,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "footer": {
+                "text": f"Twitter Bridge Bot • {footer}",
+                "icon_url": "https://abs.twimg.com/icons/apple-touch-icon-192x192.png"
+            }
+        }
+
+    def stop(self) -> None:
+        logger.info("تم طلب إيقاف البوت...")
+        self._stopping = True
+        if self._stopped:
+            self._stopped.set()
+
+    async def run(self) -> None:
+        """تشغيل العمليات والبقاء حتى طلب الإيقاف"""
+        loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, self.stop)
+        if self.config_watcher and hasattr(signal, 'SIGHUP'):
+            loop.add_signal_handler(signal.SIGHUP, self.config_watcher.request_reload)
+
+        # ترقية مخطط المخزن وترحيل JSON مرة واحدة قبل أن تفتحه العمليات معاً
+        Path(self.config.data_dir).mkdir(parents=True, exist_ok=True)
+        create_state_store('sqlite', self.config.data_dir).close()
+
+        for index in range(self.config.workers):
+            self.ring.add(index)
+        plan = self._plan()
+        for index in range(self.config.workers):
+            self._start(index, plan[index])
+        await self._announce(self._status_embed(
+            "🤖 تم تشغيل البوت بنجاح",
+            f"بدأت مراقبة {len(self.config.twitter_usernames)} حساب موزعة على {self.config.workers} عملية",
+            0x00FF00, "متصل"
+        ))
+
+        reload_task = asyncio.create_task(self.config_watcher.watch(self.apply_config)) if self.config_watcher else None
+        try:
+            await self._stopped.wait()
+        finally:
+            if reload_task:
+                reload_task.cancel()
+            for task in list(self._restart_tasks.values()):
+                task.cancel()
+            await asyncio.gather(*(self._stop_worker(index) for index in list(self.processes)))
+            await self._announce(self._status_embed(
+                "⏸️ تم إيقاف البوت",
+                f"توقفت مراقبة {len(self.config.twitter_usernames)} حساب",
+                0xFF0000, "متوقف"
+            ))